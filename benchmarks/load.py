@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+
+"""\
+Load generator for the local HTTP API(task-tracker serve). A number of client
+threads send requests over keep-alive connections for a fixed duration and
+the requests per second and latency percentiles are reported.
+
+Usage examples:
+    # Against a running server
+    python benchmarks/load.py --url http://127.0.0.1:8765 --clients 8
+    # Start a server over a temporary store of 10000 tasks, poll with ETags
+    python benchmarks/load.py --spawn 10000 --conditional
+    # Mix in 10% of writes(mark requests)
+    python benchmarks/load.py --spawn 10000 --write-ratio 0.1
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.client import HTTPConnection
+from math import ceil
+from pathlib import Path
+from typing import List
+from urllib.parse import urlsplit
+
+source_dir = Path(__file__).parent.parent.resolve() / "src"
+sys.path.append(str(source_dir))
+
+from tasktracker.actions import ActionAdd
+from tasktracker.tasks import TaskStore
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    if not sorted_values:
+        return 0.0
+    rank = max(ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def client(host: str, port: int, args: argparse.Namespace, deadline: float,
+           latencies: List[float], statuses: Counter, lock: threading.Lock):
+    conn = HTTPConnection(host, port)
+    path = "/tasks" + ("?status={}".format(args.status) if args.status else "")
+    etag = None
+    local_latencies = []
+    local_statuses: Counter = Counter()
+    rng = random.Random()
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        if rng.random() < args.write_ratio:
+            body = json.dumps({"status": rng.choice(["todo", "in_progress", "done"])})
+            conn.request("PATCH", "/tasks/{}".format(rng.randint(1, max(args.spawn, 1))), body)
+        else:
+            headers = {"If-None-Match": etag} if args.conditional and etag else {}
+            conn.request("GET", path, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        local_latencies.append(time.perf_counter() - start)
+        local_statuses[response.status] += 1
+        if response.getheader("ETag") and response.status in (200, 304):
+            etag = response.getheader("ETag")
+    conn.close()
+    with lock:
+        latencies.extend(local_latencies)
+        statuses.update(local_statuses)
+
+
+def spawn_server(num_tasks: int, port: int, tmpdir: str) -> subprocess.Popen:
+    """Creates a store with num_tasks tasks and starts a server over it in a
+    separate process."""
+    data_fname = os.path.join(tmpdir, "tasks.json")
+    store = TaskStore(data_fname, test_mode=True)
+    with store.transaction():
+        for idx in range(num_tasks):
+            store.add(ActionAdd(["Task number {}".format(idx + 1)]))
+    code = ("from tasktracker.server import serve\n"
+            "from tasktracker.tasks import TaskStore\n"
+            "serve(TaskStore({!r}, test_mode=True), {})".format(data_fname, port))
+    env = dict(os.environ, PYTHONPATH=str(source_dir))
+    server = subprocess.Popen([sys.executable, "-c", code], env=env,
+                              stdout=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            conn = HTTPConnection("127.0.0.1", port)
+            conn.request("GET", "/tasks/1")
+            conn.getresponse().read()
+            conn.close()
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("the server did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8765", help="address of the server")
+    parser.add_argument("--clients", type=int, default=4, help="number of client threads")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds to run")
+    parser.add_argument("--status", default="", help="status filter of the list requests")
+    parser.add_argument("--conditional", action="store_true",
+                        help="send If-None-Match with the last ETag")
+    parser.add_argument("--write-ratio", type=float, default=0.0,
+                        help="fraction of the requests that mark a random task")
+    parser.add_argument("--spawn", type=int, default=0, metavar="N",
+                        help="start a server over a temporary store of N tasks")
+    args = parser.parse_args()
+
+    url = urlsplit(args.url)
+    host, port = url.hostname or "127.0.0.1", url.port or 8765
+    server = None
+    with tempfile.TemporaryDirectory() as tmpdir:
+        if args.spawn:
+            server = spawn_server(args.spawn, port, tmpdir)
+        try:
+            latencies: List[float] = []
+            statuses: Counter = Counter()
+            lock = threading.Lock()
+            deadline = time.perf_counter() + args.duration
+            threads = [threading.Thread(target=client,
+                                        args=(host, port, args, deadline, latencies, statuses, lock))
+                       for _ in range(args.clients)]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+    latencies.sort()
+    print("clients: {}, requests: {}, elapsed: {:.2f}s".format(args.clients, len(latencies), elapsed))
+    print("requests/s: {:.1f}".format(len(latencies) / elapsed))
+    print("statuses: {}".format(", ".join("{}: {}".format(code, count)
+                                          for code, count in sorted(statuses.items()))))
+    print("latency ms: p50 {:.2f}, p90 {:.2f}, p99 {:.2f}, max {:.2f}".format(
+        *(1000 * percentile(latencies, pct) for pct in (50, 90, 99, 100))))
+
+
+if __name__ == "__main__":
+    main()
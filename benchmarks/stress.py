@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+
+"""\
+Contention and durability stress harness. For each concurrency level N
+worker processes issue random add/update/mark/delete requests against the
+same data file through TasksManager, exactly like N concurrent CLI
+invocations. Afterwards the final data file is checked for:
+
+- corruption   : the file cannot be parsed or has inconsistent entries.
+- duplicate tids: two adds were given the same task id.
+- lost adds    : an added task is missing although no later update or delete
+                 of the same task completed.
+- lost updates : an update is not visible although no later update or delete
+                 of the same task completed.
+- lost deletes : a deleted task is still present.
+
+The throughput(ops/second) and the latency percentiles of each level are
+reported together with the number of anomalies and of the operations that
+failed because the store could not be loaded or written(like when a worker
+reads the file while another one is writing it).
+
+Usage examples:
+    python benchmarks/stress.py --workers 1,4,16 --ops 200
+    python benchmarks/stress.py --workers 32 --ops 100 --seed-tasks 1000
+"""
+
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from contextlib import redirect_stdout
+from math import ceil
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+source_dir = Path(__file__).parent.parent.resolve() / "src"
+sys.path.append(str(source_dir))
+
+from tasktracker.actions import ActionAdd, ActionDelete, ActionMark, ActionUpdate
+from tasktracker.columnar import TaskColumns
+from tasktracker.recovery import verify
+from tasktracker.tasks import TaskStore, TasksManager
+
+_statuses = ["todo", "in_progress", "done"]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    if not sorted_values:
+        return 0.0
+    rank = max(ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def worker(idx: int, data_fname: str, num_ops: int, max_tid: int,
+           start: Any, results: Any):
+    """
+    Issues num_ops random operations through TasksManager and sends back the
+    log of the operations as (kind, task id, description, completion time,
+    latency, error) tuples. Every add and update uses a unique description so
+    that its effect can be found in the final data file.
+    """
+    rng = random.Random(idx)
+    log = []
+    start.wait()
+    for op in range(num_ops):
+        kind = rng.choices(["add", "update", "mark", "delete"], [4, 3, 2, 1])[0]
+        tid = rng.randint(1, max_tid)
+        description = "w{}-op{}".format(idx, op)
+        if kind == "add":
+            action: Any = ActionAdd([description])
+        elif kind == "update":
+            action = ActionUpdate([str(tid), description])
+        elif kind == "mark":
+            action = ActionMark([str(tid), rng.choice(_statuses)])
+        else:
+            action = ActionDelete([str(tid)])
+        began = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            manager = TasksManager(data_fname)
+            # The manager loads the store on first use, so the task id of
+            # the target is checked on the loaded store before executing.
+            existed = not manager.error and not manager.store.error and \
+                tid in manager.store.columns()
+            manager.execute(action)
+        latency = time.perf_counter() - began
+        # Failures to load or write the store, not missing task ids.
+        error = manager.error or manager.store.error
+        if kind == "add" and not error:
+            # The task id given to the added task in this process' view.
+            tid = manager.store.columns().descriptions.index(description)
+        elif kind != "add" and not existed:
+            kind = "miss"
+        log.append((kind, tid, description, time.time(), latency, error))
+    results.put((idx, log))
+
+
+def check(data_fname: str, logs: List[List[Tuple]]) -> Dict[str, int]:
+    """Checks the final data file against the logs of the workers and returns
+    the number of each kind of anomaly."""
+    anomalies = Counter({"corruption": 0, "duplicate tids": 0, "lost adds": 0,
+                         "lost updates": 0, "lost deletes": 0})
+    try:
+        # Damaged records(bad checksums, invalid JSON or task fields).
+        anomalies["corruption"] += len(verify(data_fname)["damaged"])
+        with open(data_fname, "r") as fp:
+            columns = TaskColumns.load(fp)
+    except Exception:
+        anomalies["corruption"] += 1
+        return anomalies
+    if columns.meta.get("next_tid", 0) <= max(columns.rows(), default=0):
+        anomalies["corruption"] += 1
+
+    ops = sorted((op for log in logs for op in log if not op[5]),
+                 key=lambda op: op[3])
+    added_tids = Counter(op[1] for op in ops if op[0] == "add")
+    anomalies["duplicate tids"] = sum(count - 1 for count in added_tids.values() if count > 1)
+    # The last successful change of each task id, the only one whose effect
+    # must be visible: a later change is checked on its own.
+    last_change: Dict[int, Tuple] = {}
+    for op in ops:
+        if op[0] in ("add", "update", "delete"):
+            last_change[op[1]] = op
+    for op in ops:
+        kind, tid, description = op[0], op[1], op[2]
+        present = tid in columns
+        if kind == "add" and last_change.get(tid) is op and \
+                (not present or columns.descriptions[tid] != description):
+            anomalies["lost adds"] += 1
+        elif kind == "update" and last_change.get(tid) is op and \
+                (not present or columns.descriptions[tid] != description):
+            anomalies["lost updates"] += 1
+        elif kind == "delete" and last_change.get(tid) is op and present:
+            anomalies["lost deletes"] += 1
+    return anomalies
+
+
+def run_level(num_workers: int, args: argparse.Namespace) -> Dict[str, Any]:
+    """Runs the stress test with num_workers processes on a fresh store."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        data_fname = os.path.join(tmpdir, "tasks.json")
+        store = TaskStore(data_fname, test_mode=True)
+        with store.transaction():
+            for idx in range(args.seed_tasks):
+                store.add(ActionAdd(["Seed task {}".format(idx + 1)]))
+        # Target ids cover the seed tasks and the tasks added during the run.
+        max_tid = args.seed_tasks + num_workers * args.ops // 2 + 1
+
+        context = multiprocessing.get_context()
+        start = context.Event()
+        results = context.Queue()
+        processes = [context.Process(target=worker,
+                                     args=(idx, data_fname, args.ops, max_tid, start, results))
+                     for idx in range(num_workers)]
+        for process in processes:
+            process.start()
+        began = time.perf_counter()
+        start.set()
+        logs = [results.get()[1] for _ in processes]
+        elapsed = time.perf_counter() - began
+        for process in processes:
+            process.join()
+        anomalies = check(data_fname, logs)
+
+    latencies = sorted(op[4] for log in logs for op in log)
+    errors = sum(op[5] for log in logs for op in log)
+    return {"workers": num_workers, "ops": len(latencies), "elapsed": elapsed,
+            "ops/s": len(latencies) / elapsed, "errors": errors,
+            "p50": percentile(latencies, 50), "p90": percentile(latencies, 90),
+            "p99": percentile(latencies, 99), "max": percentile(latencies, 100),
+            **anomalies}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,4,16",
+                        help="comma separated concurrency levels(number of processes)")
+    parser.add_argument("--ops", type=int, default=100, help="operations per worker")
+    parser.add_argument("--seed-tasks", type=int, default=100,
+                        help="number of tasks in the store before the run")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.workers.split(",")]
+    header = ["workers", "ops", "ops/s", "p50 ms", "p90 ms", "p99 ms", "max ms", "errors",
+              "corruption", "duplicate tids", "lost adds", "lost updates", "lost deletes"]
+    print("  ".join(header))
+    for level in levels:
+        result = run_level(level, args)
+        row = [str(result["workers"]), str(result["ops"]), "{:.1f}".format(result["ops/s"])] + \
+            ["{:.2f}".format(1000 * result[key]) for key in ("p50", "p90", "p99", "max")] + \
+            [str(result[key]) for key in header[7:]]
+        print("  ".join(value.rjust(len(name)) for value, name in zip(row, header)))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,10 +5,18 @@ Collection of classes for representing the different actions to perform that
 correspond to each user sub-command
 """
 
+from datetime import datetime
 from enum import Enum
-from typing import override
+from typing import override, cast, Dict, Tuple
 from tasktracker.status import Status, get_status_from_str, get_status_names
 from tasktracker.formatting import fmt_list_of_strings
+from tasktracker.formats import latest_version, versions
+from tasktracker.metrics import metrics_formats
+from tasktracker.multilist import is_valid_list_name
+from tasktracker.output import output_formats, pipe_format
+from tasktracker.query import Query, parse_query, query_fields, sort_fields
+from tasktracker.selection import IdRanges, TaskFilter, parse_date
+from tasktracker.selection import parse_id_ranges
 
 program_name = 'task-tracker'
 
@@ -19,8 +27,133 @@ class ActionType(Enum):
     DELETE = 3
     LIST = 4
     MARK = 5
+    STATS = 6
+    QUERY = 7
+    SYNC_EXPORT = 8
+    SYNC_IMPORT = 9
+    SERVE = 10
+    NEXT = 11
+    BLOCK = 12
+    UNBLOCK = 13
+    MIGRATE = 14
+    METRICS = 15
+    VERIFY = 16
+    SALVAGE = 17
     UNKNOWN = 100
 
+def _parse_options(args: list[str], options: Dict[str, bool]) \
+        -> Tuple[list[str], Dict[str, str | bool]] | None:
+    """\
+    Splits the arguments of a sub-command into positional arguments and
+    "--name value" style options.
+
+    Keyword arguments:
+    args    : the sub-command arguments.
+    options : dictionary with the option names as keys (including the leading
+              "--") and a boolean value telling whether the option takes a
+              value. Options that do not take a value are flags.
+
+    returns a tuple of (positional arguments, parsed options) or None if an
+    unknown option is found or if an option is missing its value. Both
+    "--name value" and "--name=value" forms are accepted. The arguments after
+    a "--" argument are positional even if they start with "--".
+    """
+    positional: list[str] = []
+    parsed: Dict[str, str | bool] = {}
+    idx = 0
+    while idx < len(args):
+        arg = args[idx]
+        idx += 1
+        if arg == "--":
+            positional.extend(args[idx:])
+            break
+        if not arg.startswith("--"):
+            positional.append(arg)
+            continue
+        name, sep, value = arg.partition("=")
+        if name not in options:
+            return None
+        if not options[name]:
+            if sep:
+                return None
+            parsed[name] = True
+            continue
+        if not sep:
+            if idx == len(args):
+                return None
+            value = args[idx]
+            idx += 1
+        parsed[name] = value
+    return positional, parsed
+
+# Options accepted by the actions that select tasks using filters.
+_filter_options = {"--status": True, "--updated-before": True,
+                   "--updated-after": True}
+
+_filter_usage = "[--status <status>] [--updated-before <date>] [--updated-after <date>]"
+
+# Options of add and update that set the optional task fields.
+_task_field_options = {"--priority": True, "--due": True}
+
+# Range of the task priorities, higher is more urgent.
+max_priority = 9
+
+def _parse_task_fields(options: Dict[str, str | bool], allow_clear: bool) \
+        -> Tuple[int | None, datetime | None, bool] | None:
+    """\
+    Returns a tuple of (priority, due date, whether to clear the due date)
+    from the options in _task_field_options, None for the fields that are not
+    given. None is returned if a value is invalid. The due date can be
+    cleared with "--due none" if allow_clear is True.
+    """
+    priority = None
+    due = None
+    clear_due = False
+    if "--priority" in options:
+        try:
+            priority = int(cast(str, options["--priority"]))
+        except ValueError:
+            return None
+        if not 0 <= priority <= max_priority:
+            return None
+    if "--due" in options:
+        if allow_clear and options["--due"] == "none":
+            clear_due = True
+        else:
+            due = parse_date(cast(str, options["--due"]))
+            if due is None:
+                return None
+    return priority, due, clear_due
+
+def _print_task_fields_help():
+    print("Where p is the priority from 0 (none) to {}, higher is more urgent".format(max_priority))
+    print("and date is like YYYY-MM-DD or YYYY-MM-DDTHH:MM[:SS] in local time.")
+
+def _parse_task_filter(options: Dict[str, str | bool]) -> TaskFilter | None:
+    """\
+    Builds a TaskFilter from the parsed filter options(see _filter_options).
+    Returns None if any of the option values is invalid.
+    """
+    task_filter = TaskFilter()
+    if "--status" in options:
+        _status = get_status_from_str(cast(str, options["--status"]))
+        if _status is None:
+            return None
+        task_filter.status = _status
+    for name, attr in (("--updated-before", "updated_before"),
+                       ("--updated-after", "updated_after")):
+        if name in options:
+            date = parse_date(cast(str, options[name]))
+            if date is None:
+                return None
+            setattr(task_filter, attr, date)
+    return task_filter
+
+def _print_selection_help():
+    print("Where task_ids is a comma separated list of task ids or ranges like 1-500,612")
+    print("or, instead of task_ids, the tasks can be selected by filters where dates are")
+    print("like YYYY-MM-DD or YYYY-MM-DDTHH:MM[:SS] in local time.")
+
 class ActionBase:
     """Base class of all action classes"""
     atype: ActionType = ActionType.UNKNOWN
@@ -33,75 +166,208 @@ class ActionBase:
 class ActionAdd(ActionBase):
     """Action that corresponds to the creation of a new task"""
     task_description: str = ''
+    # Priority(0 to 9) and due date of the new task, None if not given.
+    priority: int | None = None
+    due: datetime | None = None
     valid = False
 
     def __init__(self, args: list[str]):
         super().__init__(ActionType.ADD)
-        if len(args) != 1:
+        parsed = _parse_options(args, _task_field_options)
+        if parsed is None:
+            return
+        positional, options = parsed
+        if len(positional) != 1:
+            return
+        fields = _parse_task_fields(options, allow_clear=False)
+        if fields is None:
             return
+        self.priority, self.due, _ = fields
         self.valid = True
-        self.task_description = args[0]
+        self.task_description = positional[0]
 
     @override
     def help(self):
-        print("Subcommand usage:\n{} add <task_description>".format(program_name))
+        print("Subcommand usage:\n{} add <task_description> [--priority <p:integer>] [--due <date>]"
+              .format(program_name))
+        _print_task_fields_help()
+        print("Put \"--\" before a task_description that starts with \"--\".")
 
 class ActionUpdate(ActionBase):
     """Action that corresponds to the updation of an existing task"""
-    task_description: str = ''
+    # New description, None to keep the description.
+    task_description: str | None = None
     task_id: int = -1
+    # New priority and due date, None to keep them.
+    priority: int | None = None
+    due: datetime | None = None
+    # Whether to remove the due date.
+    clear_due = False
     valid = False
 
     def __init__(self, args: list[str]) -> None:
         super().__init__(ActionType.UPDATE)
-        if len(args) != 2:
+        parsed = _parse_options(args, _task_field_options)
+        if parsed is None:
+            return
+        positional, options = parsed
+        if len(positional) not in (1, 2) or (len(positional) == 1 and not options):
             return
         try:
-            self.task_id = int(args[0])
+            self.task_id = int(positional[0])
         except ValueError:
             return
-        self.task_description = args[1]
+        fields = _parse_task_fields(options, allow_clear=True)
+        if fields is None:
+            return
+        self.priority, self.due, self.clear_due = fields
+        if len(positional) == 2:
+            self.task_description = positional[1]
         self.valid = True
 
     @override
     def help(self):
-        print("Subcommand usage:\n{} update <task_id:integer> <task_description>".format(program_name))
+        print("Subcommand usage:\n{} update <task_id:integer> [task_description] [--priority <p:integer>]"
+              " [--due <date> | --due none]".format(program_name))
+        _print_task_fields_help()
+        print("At least one of the description, the priority or the due date must be given")
+        print("Put \"--\" before a task_description that starts with \"--\".")
 
 
 class ActionDelete(ActionBase):
-    """Action that corresponds to the deletion of an existing task"""
+    """Action that corresponds to the deletion of one or more existing tasks"""
     task_id: int = -1
+    # Selected task ids, empty if the tasks are selected by task_filter.
+    task_ids: IdRanges = IdRanges()
+    task_filter: TaskFilter | None = None
     valid = False
 
     def __init__(self, args: list[str]) -> None:
         super().__init__(ActionType.DELETE)
-        if len(args) != 1:
+        parsed = _parse_options(args, _filter_options)
+        if parsed is None:
             return
-        try:
-            self.task_id = int(args[0])
-        except ValueError:
+        positional, options = parsed
+        if len(options):
+            if len(positional) != 0:
+                return
+            self.task_filter = _parse_task_filter(options)
+            if self.task_filter is None:
+                return
+            self.valid = True
+            return
+        if len(positional) != 1:
             return
+        task_ids = parse_id_ranges(positional[0])
+        if task_ids is None:
+            return
+        self.task_ids = task_ids
+        self.task_id = task_ids[0]
         self.valid = True
 
     @override
     def help(self):
-        pass
+        print("Subcommand usage:\n{} delete <task_ids>".format(program_name))
+        print("{} delete {}".format(program_name, _filter_usage))
+        _print_selection_help()
 
 
 class ActionList(ActionBase):
     """Action that corresponds to the listing of existing tasks"""
     status: Status = Status.UNKNOWN
+    # Requested output format, None means automatic selection.
+    output_format: str | None = None
+    # Whether to show the table one window at a time.
+    paged = False
+    # Whether to keep showing the table and redraw it when the store changes.
+    watch = False
+    # Seconds between the checks for changes in watch mode.
+    interval = 1.0
+    # Maximum number of tasks to show, 0 means all.
+    limit = 0
+    # Whether to read the data file incrementally instead of loading it.
+    stream = False
+    # Whether to list only the tasks that are not blocked by open tasks.
+    ready = False
+    # The compiled --where and --sort expressions, None if neither is given.
+    query: Query | None = None
+    # Whether to show the plan of the query instead of the tasks.
+    explain = False
+    # Why the --where or --sort expression is invalid, if it is.
+    error: str | None = None
     valid = False
 
     def __init__(self, args: list[str]) -> None:
         super().__init__(ActionType.LIST)
-        if len(args) == 0:
+        parsed = _parse_options(args, {"--format": True, "--page": False,
+                                       "--watch": False, "--interval": True,
+                                       "--limit": True, "--stream": False,
+                                       "--ready": False, "--where": True,
+                                       "--sort": True, "--explain": False})
+        if parsed is None:
+            return
+        positional, options = parsed
+        if "--format" in options:
+            if options["--format"] not in output_formats:
+                return
+            self.output_format = cast(str, options["--format"])
+        if "--page" in options:
+            if self.output_format not in (None, "table"):
+                return
+            self.paged = True
+        if "--watch" in options:
+            if self.output_format not in (None, "table") or self.paged:
+                return
+            self.watch = True
+        if "--interval" in options:
+            if not self.watch:
+                return
+            try:
+                self.interval = float(cast(str, options["--interval"]))
+            except ValueError:
+                return
+            if not self.interval > 0:
+                return
+        if "--limit" in options:
+            try:
+                self.limit = int(cast(str, options["--limit"]))
+            except ValueError:
+                return
+            if self.limit < 1:
+                return
+        if "--stream" in options:
+            if self.paged or self.watch:
+                return
+            self.stream = True
+        if "--ready" in options:
+            # The blockers of a task are not known while streaming.
+            if self.stream:
+                return
+            self.ready = True
+        if "--where" in options or "--sort" in options or \
+                "--explain" in options:
+            # The columns needed by the planner are not there while
+            # streaming.
+            if self.stream:
+                return
+            try:
+                self.query = parse_query(
+                    cast(str | None, options.get("--where")),
+                    cast(str | None, options.get("--sort")))
+            except ValueError as e:
+                self.error = str(e)
+                return
+        if "--explain" in options:
+            if self.paged or self.watch:
+                return
+            self.explain = True
+        if len(positional) == 0:
             self.valid = True
             return
-        if len(args) != 1:
+        if len(positional) != 1:
             return
 
-        _status = get_status_from_str(args[0])
+        _status = get_status_from_str(positional[0])
         if _status is None:
             return
         self.status = _status
@@ -109,33 +375,414 @@ class ActionList(ActionBase):
 
     @override
     def help(self):
-        print("Subcommand usage:\n{} list [status]".format(program_name))
+        print("Subcommand usage:\n{} list [status] [--format <format> | --page | --watch [--interval <seconds>]]"
+              " [--limit <n:integer>] [--stream | --ready] [--where <filter>] [--sort <keys>] [--explain]"
+              .format(program_name))
+        if self.error:
+            print("Invalid query: {}".format(self.error))
         print("Where status is one of {}".format(fmt_list_of_strings(get_status_names())))
+        print("and format is one of {}".format(fmt_list_of_strings(output_formats)))
+        print("(default: table on a terminal, {} otherwise)".format(pipe_format))
+        print("--page shows the table one screenful at a time")
+        print("--watch keeps showing the table and updates it when the tasks change, checking every")
+        print("        <seconds> seconds (default: 1)")
+        print("--limit shows only the first n tasks")
+        print("--stream reads the data file incrementally with bounded memory, the tasks are listed in")
+        print("         task id order unless --limit is given (required for the table format)")
+        print("--ready lists only the tasks that are not done and not blocked by a task that is not done")
+        print("--where lists only the tasks matching a filter like 'status=todo and updated>2026-09-01 and")
+        print("        description~deploy': comparisons of the fields {}".format(fmt_list_of_strings(list(query_fields))))
+        print("        with =, !=, <, <=, >, >= or ~ (contains), combined with and, or, not and parentheses")
+        print("--sort orders the tasks by comma separated keys like 'priority desc, due', the keys are")
+        print("       {} each optionally followed by asc or desc".format(fmt_list_of_strings(sort_fields)))
+        print("--explain shows the plan chosen to select the tasks and the rows examined instead of the tasks")
 
 
 class ActionMark(ActionBase):
-    """"ActionMark represent the user request to update the status of an existing task"""
+    """"ActionMark represent the user request to update the status of one or
+    more existing tasks"""
     task_id: int = -1
+    # Selected task ids, empty if the tasks are selected by task_filter.
+    task_ids: IdRanges = IdRanges()
+    task_filter: TaskFilter | None = None
     new_status: Status = Status.UNKNOWN
     valid = False
 
     def __init__(self, args: list[str]) -> None:
         super().__init__(ActionType.MARK)
-        if len(args) != 2:
+        parsed = _parse_options(args, _filter_options)
+        if parsed is None:
+            return
+        positional, options = parsed
+        if len(options):
+            if len(positional) != 1:
+                return
+            self.task_filter = _parse_task_filter(options)
+            if self.task_filter is None:
+                return
+        else:
+            if len(positional) != 2:
+                return
+            task_ids = parse_id_ranges(positional[0])
+            if task_ids is None:
+                return
+            self.task_ids = task_ids
+            self.task_id = task_ids[0]
+        _status = get_status_from_str(positional[-1])
+        if _status is None:
             return
+        self.new_status = _status
+        self.valid = True
+
+    @override
+    def help(self):
+        print("Subcommand usage:\n{} mark <task_ids> <status>".format(program_name))
+        print("{} mark {} <status>".format(program_name, _filter_usage))
+        print("Where status is one of {}".format(fmt_list_of_strings(get_status_names())))
+        _print_selection_help()
+
+
+class ActionStats(ActionBase):
+    """ActionStats represents the user request to show aggregate statistics of
+    the tasks"""
+    days: int = 14
+    # Whether to read the data file incrementally instead of loading it.
+    stream = False
+    valid = False
 
+    def __init__(self, args: list[str]) -> None:
+        super().__init__(ActionType.STATS)
+        parsed = _parse_options(args, {"--days": True, "--stream": False})
+        if parsed is None:
+            return
+        positional, options = parsed
+        if len(positional) != 0:
+            return
+        if "--days" in options:
+            try:
+                self.days = int(cast(str, options["--days"]))
+            except ValueError:
+                return
+            if self.days < 1:
+                return
+        self.stream = "--stream" in options
+        self.valid = True
+
+    @override
+    def help(self):
+        print("Subcommand usage:\n{} stats [--days <n:integer>] [--stream]".format(program_name))
+        print("Where n is the number of recent days shown in the throughput table (default 14)")
+        print("--stream reads the data file incrementally with bounded memory")
+
+
+class ActionQuery(ActionBase):
+    """ActionQuery represents the user request to list the tasks of many task
+    lists at once"""
+    status: Status = Status.UNKNOWN
+    # Names of the lists to query, empty means all lists.
+    list_names: list[str] = []
+    output_format: str | None = None
+    max_workers: int | None = None
+    use_threads = False
+    valid = False
+
+    def __init__(self, args: list[str]) -> None:
+        super().__init__(ActionType.QUERY)
+        parsed = _parse_options(args, {"--lists": True, "--workers": True,
+                                       "--threads": False, "--format": True})
+        if parsed is None:
+            return
+        positional, options = parsed
+        if len(positional) > 1:
+            return
+        if len(positional) == 1:
+            _status = get_status_from_str(positional[0])
+            if _status is None:
+                return
+            self.status = _status
+        if "--lists" in options:
+            names = [name.strip() for name in cast(str, options["--lists"]).split(",")]
+            if not all(is_valid_list_name(name) for name in names):
+                return
+            self.list_names = names
+        if "--workers" in options:
+            try:
+                self.max_workers = int(cast(str, options["--workers"]))
+            except ValueError:
+                return
+            if self.max_workers < 1:
+                return
+        if "--format" in options:
+            if options["--format"] not in output_formats:
+                return
+            self.output_format = cast(str, options["--format"])
+        self.use_threads = "--threads" in options
+        self.valid = True
+
+    @override
+    def help(self):
+        print("Subcommand usage:\n{} query [status] [--lists <names>] [--workers <n:integer>] [--threads]"
+              " [--format <format>]".format(program_name))
+        print("Where status is one of {}".format(fmt_list_of_strings(get_status_names())))
+        print("names is a comma separated list of task list names (default: all lists)")
+        print("and format is one of {}".format(fmt_list_of_strings(output_formats)))
+        print("The lists are loaded in parallel by a pool of n worker processes, or threads with --threads.")
+
+
+class ActionSyncExport(ActionBase):
+    """ActionSyncExport represents the user request to export the changes of
+    the store after a given sequence number for another replica"""
+    # Only changes with a greater sequence number are exported, 0 exports all
+    # tasks.
+    since: int = 0
+    valid = False
+
+    def __init__(self, args: list[str]) -> None:
+        super().__init__(ActionType.SYNC_EXPORT)
+        parsed = _parse_options(args, {"--since": True})
+        if parsed is None:
+            return
+        positional, options = parsed
+        if len(positional) != 0:
+            return
+        if "--since" in options:
+            try:
+                self.since = int(cast(str, options["--since"]))
+            except ValueError:
+                return
+            if self.since < 0:
+                return
+        self.valid = True
+
+    @override
+    def help(self):
+        print("Subcommand usage:\n{} sync-export [--since <seq:integer>]".format(program_name))
+        print("Writes the changes with a sequence number greater than seq (default 0, all tasks)")
+        print("to the standard output")
+
+
+class ActionSyncImport(ActionBase):
+    """ActionSyncImport represents the user request to apply the changes
+    exported by another replica of the store"""
+    # Path of the file with the exported changes, "-" for the standard input.
+    fname: str = "-"
+    valid = False
+
+    def __init__(self, args: list[str]) -> None:
+        super().__init__(ActionType.SYNC_IMPORT)
+        if len(args) > 1:
+            return
+        if len(args) == 1:
+            if args[0].startswith("--"):
+                return
+            self.fname = args[0]
+        self.valid = True
+
+    @override
+    def help(self):
+        print("Subcommand usage:\n{} sync-import [file]".format(program_name))
+        print("Applies the changes written by sync-export of another replica, read from file")
+        print("or from the standard input if no file is given")
+
+
+class ActionServe(ActionBase):
+    """ActionServe represents the user request to serve the tasks over a local
+    HTTP API"""
+    port: int = 8765
+    # Whether to log every request.
+    verbose = False
+    valid = False
+
+    def __init__(self, args: list[str]) -> None:
+        super().__init__(ActionType.SERVE)
+        parsed = _parse_options(args, {"--port": True, "--verbose": False})
+        if parsed is None:
+            return
+        positional, options = parsed
+        if len(positional) != 0:
+            return
+        if "--port" in options:
+            try:
+                self.port = int(cast(str, options["--port"]))
+            except ValueError:
+                return
+            if not 0 <= self.port <= 65535:
+                return
+        self.verbose = "--verbose" in options
+        self.valid = True
+
+    @override
+    def help(self):
+        print("Subcommand usage:\n{} serve [--port <port:integer>] [--verbose]".format(program_name))
+        print("Serves the tasks as a JSON API on http://127.0.0.1:<port>/tasks (default port 8765)")
+        print("--verbose logs every request")
+
+
+class ActionNext(ActionBase):
+    """ActionNext represents the user request to show the tasks to work on
+    next"""
+    # Number of tasks to show.
+    count: int = 1
+    valid = False
+
+    def __init__(self, args: list[str]) -> None:
+        super().__init__(ActionType.NEXT)
+        if len(args) > 1:
+            return
+        if len(args) == 1:
+            try:
+                self.count = int(args[0])
+            except ValueError:
+                return
+            if self.count < 1:
+                return
+        self.valid = True
+
+    @override
+    def help(self):
+        print("Subcommand usage:\n{} next [n:integer]".format(program_name))
+        print("Shows the n (default 1) todo tasks to work on next: by priority, then by due date")
+        print("(tasks without a due date last) and then by creation time")
+
+
+class ActionBlock(ActionBase):
+    """ActionBlock represents the user request to record that a task is
+    blocked by other tasks, that is it cannot be worked on before they are
+    done"""
+    task_id: int = -1
+    # Task ids of the blockers.
+    blocker_ids: IdRanges = IdRanges()
+    valid = False
+
+    def __init__(self, args: list[str], atype: ActionType = ActionType.BLOCK) -> None:
+        super().__init__(atype)
+        if len(args) != 2:
+            return
         try:
             self.task_id = int(args[0])
         except ValueError:
             return
-        _status = get_status_from_str(args[1])
-        if _status is None:
+        blocker_ids = parse_id_ranges(args[1])
+        if not blocker_ids:
             return
-        self.new_status = _status
+        self.blocker_ids = blocker_ids
         self.valid = True
 
     @override
     def help(self):
-        print("Subcommand usage:\n{} mark <task_id:integer> <status>".format(program_name))
-        print("Where status is one of {}".format(fmt_list_of_strings(get_status_names())))
+        print("Subcommand usage:\n{} block <task_id:integer> <blocker_ids>".format(program_name))
+        print("Records that the task cannot be worked on before the blocker tasks are done")
+        print("Where blocker_ids is a comma separated list of task ids and ranges like 1-5,8")
+
+
+class ActionUnblock(ActionBlock):
+    """ActionUnblock represents the user request to remove blockers of a
+    task"""
+
+    def __init__(self, args: list[str]) -> None:
+        super().__init__(args, ActionType.UNBLOCK)
+
+    @override
+    def help(self):
+        print("Subcommand usage:\n{} unblock <task_id:integer> <blocker_ids>".format(program_name))
+        print("Removes the given blockers of the task")
+        print("Where blocker_ids is a comma separated list of task ids and ranges like 1-5,8")
+
 
+class ActionMigrate(ActionBase):
+    """ActionMigrate represents the user request to convert the data file to
+    another layout version"""
+    # Layout version to convert to.
+    version: int = latest_version
+    valid = False
+
+    def __init__(self, args: list[str]) -> None:
+        super().__init__(ActionType.MIGRATE)
+        parsed = _parse_options(args, {"--to": True})
+        if parsed is None:
+            return
+        positional, options = parsed
+        if len(positional):
+            return
+        if "--to" in options:
+            try:
+                self.version = int(cast(str, options["--to"]))
+            except ValueError:
+                return
+            if self.version not in versions:
+                return
+        self.valid = True
+
+    @override
+    def help(self):
+        print("Subcommand usage:\n{} migrate [--to <version:integer>]".format(program_name))
+        print("Converts the data file to another layout version (default: {}), where version is one of:"
+              .format(latest_version))
+        for version, description in versions.items():
+            print("  {}: {}".format(version, description))
+        print("An interrupted migration resumes from its last checkpoint when run again")
+
+
+class ActionMetrics(ActionBase):
+    """ActionMetrics represents the user request to show the recorded
+    operation metrics"""
+    output_format: str = metrics_formats[0]
+    valid = False
+
+    def __init__(self, args: list[str]) -> None:
+        super().__init__(ActionType.METRICS)
+        parsed = _parse_options(args, {"--format": True})
+        if parsed is None:
+            return
+        positional, options = parsed
+        if len(positional):
+            return
+        if "--format" in options:
+            if options["--format"] not in metrics_formats:
+                return
+            self.output_format = cast(str, options["--format"])
+        self.valid = True
+
+    @override
+    def help(self):
+        print("Subcommand usage:\n{} metrics [--format <format>]".format(program_name))
+        print("Shows the latency and outcome metrics recorded for the actions on the task list")
+        print("Where format is one of {} (default: {})".format(
+            fmt_list_of_strings(metrics_formats), metrics_formats[0]))
+        print("Use the prometheus format for the textfile collector of the node exporter")
+
+
+class ActionVerify(ActionBase):
+    """ActionVerify represents the user request to check the data file for
+    damaged records"""
+    valid = False
+
+    def __init__(self, args: list[str]) -> None:
+        super().__init__(ActionType.VERIFY)
+        if len(args):
+            return
+        self.valid = True
+
+    @override
+    def help(self):
+        print("Subcommand usage:\n{} verify".format(program_name))
+        print("Checks every record of the data file and lists the damaged ones, with layout version 3 only")
+        print("the checksums of the records are checked")
+
+
+class ActionSalvage(ActionBase):
+    """ActionSalvage represents the user request to recover the intact tasks
+    of a damaged data file"""
+    valid = False
+
+    def __init__(self, args: list[str]) -> None:
+        super().__init__(ActionType.SALVAGE)
+        if len(args):
+            return
+        self.valid = True
+
+    @override
+    def help(self):
+        print("Subcommand usage:\n{} salvage".format(program_name))
+        print("Loads the intact tasks of a damaged data file, moves the damaged records to <data file>.quarantine")
+        print("and rewrites the data file with the recovered tasks and a rebuilt next task id")
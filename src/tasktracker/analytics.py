@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+
+"""\
+Aggregate statistics over the tasks. The task fields needed for the
+statistics are loaded into compact columnar arrays (stdlib array module) so
+that the aggregates can be computed in a few passes over flat arrays of
+numbers instead of over Task objects. If NumPy is installed it is used as a
+fast path over the very same arrays (zero copy).
+"""
+
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from itertools import compress
+from math import ceil
+from operator import not_
+from typing import Any, Dict, Iterable, List, Tuple
+
+from tasktracker.status import Status
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional.
+    np = None
+
+_SECONDS_PER_DAY = 86400
+_MICROS = 1e-6
+
+# Percentiles shown for the lead time of the tasks that are done.
+lead_time_percentiles = [50, 75, 90, 95, 99]
+
+# Upper bounds(exclusive, in seconds) and labels of the lead time histogram.
+lead_time_buckets: List[Tuple[float, str]] = [
+        (3600, "< 1 hour"),
+        (_SECONDS_PER_DAY, "< 1 day"),
+        (7 * _SECONDS_PER_DAY, "< 1 week"),
+        (30 * _SECONDS_PER_DAY, "< 30 days"),
+        (float("inf"), ">= 30 days")]
+
+
+class TaskArrays:
+    """
+    Columnar representation of the fields of a set of tasks that are needed
+    for the statistics. Row i of every array corresponds to the same task.
+
+    status     : array of status enum values (signed char).
+    created_at : array of creation timestamps in seconds (double).
+    updated_at : array of last update timestamps in seconds (double).
+    """
+
+    def __init__(self) -> None:
+        self.status = array("b")
+        self.created_at = array("d")
+        self.updated_at = array("d")
+
+    @staticmethod
+    def from_tasks(tasks: Iterable[Any]) -> "TaskArrays":
+        """Builds the arrays from an iterable of Task instances."""
+        arrays = TaskArrays()
+        for task in tasks:
+            arrays.status.append(task.status.value)
+            arrays.created_at.append(task.created_at.timestamp())
+            arrays.updated_at.append(task.updated_at.timestamp())
+        return arrays
+
+    @staticmethod
+    def from_columns(columns: Any) -> "TaskArrays":
+        """Builds the arrays from the live rows of a TaskColumns instance
+        without creating any Task instances."""
+        arrays = TaskArrays()
+        live = bytes(map(not_, columns.tombstones))
+        arrays.status = array("b", compress(columns.status, live))
+        arrays.created_at = array("d", map(_MICROS.__mul__, compress(columns.created_at, live)))
+        arrays.updated_at = array("d", map(_MICROS.__mul__, compress(columns.updated_at, live)))
+        return arrays
+
+    def __len__(self) -> int:
+        return len(self.status)
+
+
+def _local_day_offset() -> float:
+    """Returns the offset of the local timezone from UTC in seconds."""
+    offset = datetime.now().astimezone().utcoffset()
+    return offset.total_seconds() if offset is not None else 0.0
+
+
+def status_counts(arrays: TaskArrays) -> Dict[Status, int]:
+    """Returns the number of tasks in each status."""
+    if np is not None and len(arrays):
+        counts = np.bincount(np.frombuffer(arrays.status, dtype=np.int8))
+        return {status: int(counts[status.value]) if status.value < len(counts) else 0
+                for status in Status if status != Status.UNKNOWN}
+    return {status: arrays.status.count(status.value)
+            for status in Status if status != Status.UNKNOWN}
+
+
+def _day_histogram(timestamps: Iterable[float], first_day: int) -> Counter:
+    """Counts the timestamps that fall on or after first_day per local day
+    number (days since epoch)."""
+    offset = _local_day_offset()
+    low = first_day * _SECONDS_PER_DAY - offset
+    days = (int((ts + offset) // _SECONDS_PER_DAY) for ts in timestamps if ts >= low)
+    return Counter(days)
+
+
+def throughput_per_day(arrays: TaskArrays, days: int) -> List[Tuple[datetime, int, int]]:
+    """
+    Returns a list of (day, number of tasks added, number of tasks done) for
+    each of the last "days" days including today. A task counts as done on
+    the day it was last updated.
+    """
+    offset = _local_day_offset()
+    now = datetime.now(tz=timezone.utc).timestamp()
+    today = int((now + offset) // _SECONDS_PER_DAY)
+    first_day = today - days + 1
+    if np is not None and len(arrays):
+        low = first_day * _SECONDS_PER_DAY - offset
+        status = np.frombuffer(arrays.status, dtype=np.int8)
+        created = np.frombuffer(arrays.created_at, dtype=np.float64)
+        updated = np.frombuffer(arrays.updated_at, dtype=np.float64)
+        created = created[created >= low]
+        updated = updated[(status == Status.DONE.value) & (updated >= low)]
+        added_bins = np.bincount(((created + offset) // _SECONDS_PER_DAY).astype(np.int64) - first_day,
+                                 minlength=days)
+        done_bins = np.bincount(((updated + offset) // _SECONDS_PER_DAY).astype(np.int64) - first_day,
+                                minlength=days)
+        added = Counter({first_day + idx: int(count) for idx, count in enumerate(added_bins[:days])})
+        done = Counter({first_day + idx: int(count) for idx, count in enumerate(done_bins[:days])})
+    else:
+        added = _day_histogram(arrays.created_at, first_day)
+        done_mask = map(Status.DONE.value.__eq__, arrays.status)
+        done = _day_histogram(compress(arrays.updated_at, done_mask), first_day)
+    epoch = datetime(1970, 1, 1)
+    return [(epoch + timedelta(days=day), added[day], done[day])
+            for day in range(first_day, today + 1)]
+
+
+def _done_lead_times(arrays: TaskArrays) -> Any:
+    """Returns the sorted lead times(updated_at - created_at, in seconds) of
+    the tasks that are done."""
+    if np is not None and len(arrays):
+        status = np.frombuffer(arrays.status, dtype=np.int8)
+        done = status == Status.DONE.value
+        created = np.frombuffer(arrays.created_at, dtype=np.float64)[done]
+        updated = np.frombuffer(arrays.updated_at, dtype=np.float64)[done]
+        return np.sort(updated - created)
+    done_mask = list(map(Status.DONE.value.__eq__, arrays.status))
+    leads = array("d", map(float.__sub__,
+                           compress(arrays.updated_at, done_mask),
+                           compress(arrays.created_at, done_mask)))
+    return array("d", sorted(leads))
+
+
+def lead_time_summary(arrays: TaskArrays) -> Dict[str, float]:
+    """
+    Returns a dictionary with the minimum, mean, maximum and the percentiles
+    (nearest-rank method) listed in lead_time_percentiles of the lead times of
+    the done tasks. The dictionary is empty if there are no done tasks.
+    """
+    leads = _done_lead_times(arrays)
+    num = len(leads)
+    if num == 0:
+        return {}
+    summary = {"min": float(leads[0]),
+               "mean": float(sum(leads) / num),
+               "max": float(leads[num - 1])}
+    for pct in lead_time_percentiles:
+        rank = max(ceil(pct / 100 * num), 1)
+        summary["p{}".format(pct)] = float(leads[rank - 1])
+    return summary
+
+
+def lead_time_histogram(arrays: TaskArrays) -> List[Tuple[str, int]]:
+    """Returns the number of done tasks in each of lead_time_buckets."""
+    leads = _done_lead_times(arrays)
+    if np is not None and not isinstance(leads, array):
+        positions = np.searchsorted(leads, [bound for bound, _ in lead_time_buckets]).tolist()
+    else:
+        positions = [bisect_left(leads, bound) for bound, _ in lead_time_buckets]
+    histogram = []
+    previous = 0
+    for (_, label), position in zip(lead_time_buckets, positions):
+        histogram.append((label, position - previous))
+        previous = position
+    return histogram
+
+
+def fmt_duration(seconds: float) -> str:
+    """Formats a duration in seconds like "2d 03:04:05"."""
+    seconds = int(round(seconds))
+    days, rest = divmod(seconds, _SECONDS_PER_DAY)
+    hours, rest = divmod(rest, 3600)
+    minutes, secs = divmod(rest, 60)
+    hms = "{:02d}:{:02d}:{:02d}".format(hours, minutes, secs)
+    return "{}d {}".format(days, hms) if days else hms
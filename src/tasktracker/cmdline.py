@@ -4,13 +4,26 @@
 
 from tasktracker.formatting import fmt_list_of_strings
 from tasktracker.actions import *
+from tasktracker.multilist import is_valid_list_name
 
 _action_map = {
               "add" : ActionAdd,
               "update" : ActionUpdate,
               "delete" : ActionDelete,
               "list" : ActionList,
-              "mark" : ActionMark }
+              "mark" : ActionMark,
+              "stats" : ActionStats,
+              "query" : ActionQuery,
+              "sync-export" : ActionSyncExport,
+              "sync-import" : ActionSyncImport,
+              "serve" : ActionServe,
+              "next" : ActionNext,
+              "block" : ActionBlock,
+              "unblock" : ActionUnblock,
+              "migrate" : ActionMigrate,
+              "metrics" : ActionMetrics,
+              "verify" : ActionVerify,
+              "salvage" : ActionSalvage }
 
 def get_action(args: list[str], show_help=False) -> ActionBase | None:
     """\
@@ -33,12 +46,38 @@ def get_action(args: list[str], show_help=False) -> ActionBase | None:
         action.help()
     return None if not action.valid else action
 
+def split_list_option(args: list[str]) -> tuple[str | None, list[str]] | None:
+    """\
+    Extracts the global "--list <name>" option that selects the task list
+    when it is passed before the sub-command.
+
+    Keyword arguments:
+    args: list of command-line arguments. Typically sys.args is passed.
+
+    returns a tuple of (list name or None if not given, the remaining
+    arguments) or None if the list name is missing or invalid.
+    """
+    if len(args) < 2 or args[1].partition("=")[0] not in ("--list", "-l"):
+        return None, args
+    _, sep, value = args[1].partition("=")
+    if sep:
+        rest = args[2:]
+    elif len(args) > 2:
+        value = args[2]
+        rest = args[3:]
+    else:
+        return None
+    if not is_valid_list_name(value):
+        return None
+    return value, [args[0]] + rest
+
 def _get_action_names():
-    return [action.name.lower() for action in ActionType if action != ActionType.UNKNOWN]
+    return [action.name.lower().replace("_", "-") for action in ActionType if action != ActionType.UNKNOWN]
 
 def show_usage():
     """Displays general command-line usage help"""
-    print("\nGeneral Usage: task-tracker <action> <action-arguments...>")
+    print("\nGeneral Usage: task-tracker [--list <list-name>] <action> <action-arguments...>")
     print("\nWhere action can be one of {}".format(fmt_list_of_strings(_get_action_names())))
+    print("and list-name selects a named task list (default: tasks)")
     return
 
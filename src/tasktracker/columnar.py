@@ -0,0 +1,639 @@
+#!/usr/bin/env python
+
+"""\
+Columnar in-memory engine for tasks. Instead of a dictionary of Task
+instances keyed by stringified task ids, the task fields are held in parallel
+arrays indexed directly by the task id. Scans, filters and sorts run over
+these flat arrays and Task instances are built only for the rows that are
+actually needed, for example the rows being displayed.
+"""
+
+from array import array
+from copy import deepcopy
+from datetime import datetime, timedelta, timezone
+import heapq
+import json
+import re
+from itertools import compress
+from operator import not_
+from typing import Any, Dict, Generator, Iterable, Iterator, List, Set, TextIO
+
+from tasktracker.formats import check_records, decode_line, detect_version
+from tasktracker.formats import encode_line, header, versions
+from tasktracker.model import Task, TaskDecoder, TaskEncoder
+from tasktracker.status import Status, status_map
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Display names of the status enum values.
+_status_names = {status.value: name for name, status in status_map.items()}
+
+# Keys of a serialized task that have a dedicated column. The rest of the keys
+# (if any) are kept as they are in the extras column.
+_column_keys = {"__class__", "tid", "description", "status", "created_at",
+                "updated_at", "uid", "seq", "priority", "due", "blocked_by"}
+
+# Maps the status enum values(and 0 of the rows without a task) to the ready
+# flag of a task without open blockers, see TaskColumns.ready.
+_ready_table = bytes(int(value not in (0, Status.DONE.value))
+                     for value in range(256))
+
+# Start of the line of a task in the JSON lines layouts, group 1 is its id.
+_tid_re = re.compile(r'\{"__class__": "Task", "tid": (\d+)[,}]')
+
+
+def to_micros(dt: datetime) -> int:
+    """Returns the number of microseconds since epoch of a datetime."""
+    delta = dt - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+def _from_micros(micros: int) -> datetime:
+    """Returns the UTC datetime for a number of microseconds since epoch."""
+    return _EPOCH + timedelta(microseconds=micros)
+
+
+class TaskColumns:
+    """
+    TaskColumns holds the tasks in parallel columns where row i holds the task
+    with task id i. Rows without a live task(never used or deleted) are
+    marked in the tombstones column.
+
+    tids        : array of task ids (int64), 0 for rows without a task.
+    status      : array of status enum values (signed char), 0 for rows
+                  without a task so that status scans skip them.
+    created_at  : array of creation times in microseconds since epoch (int64).
+    updated_at  : array of last update times in microseconds since epoch
+                  (int64).
+    descriptions: list of task descriptions.
+    uids        : list of the task identifiers shared by all the replicas of
+                  the store, empty if not set.
+    seq         : array of the sequence numbers of the last change of each
+                  task (int64), 0 if not set.
+    priority    : array of task priorities (signed char), 0 if not set.
+    due         : array of due times in microseconds since epoch (int64), 0
+                  if not set.
+    blocked_by  : list of the lists of the task ids that block each task, None
+                  if there are none.
+    extras      : list of dictionaries with the serialized task fields that
+                  have no dedicated column, None if there are none.
+    tombstones  : one byte per row, 1 if the row has no live task.
+    ready       : one byte per row, 1 if the row holds a task that is not done
+                  and none of its blockers is an open(live and not done)
+                  task. It is derived from the other columns, computed once on
+                  load and maintained incrementally by put() and remove()
+                  through an index of the tasks blocked by each task.
+    meta        : the bookkeeping entries of the store like "next_tid",
+                  "generation"(incremented on each write of the store) and
+                  "version"(of the layout of the data file, see formats.py,
+                  only set for versions after 1).
+    """
+
+    def __init__(self) -> None:
+        self.tids = array("q")
+        self.status = array("b")
+        self.created_at = array("q")
+        self.updated_at = array("q")
+        self.descriptions: List[str] = []
+        self.uids: List[str] = []
+        self.seq = array("q")
+        self.priority = array("b")
+        self.due = array("q")
+        self.blocked_by: List[List[int] | None] = []
+        self.extras: List[Dict[str, Any] | None] = []
+        self.tombstones = bytearray()
+        self.ready = bytearray()
+        self.meta: Dict[str, Any] = {"next_tid": 1}
+        self._live = 0
+        # Task ids of the tasks blocked by each task id.
+        self._dependents: Dict[int, Set[int]] = {}
+        # Task id of the live task whose last change has each sequence
+        # number, see changed_rows(). None until it is first needed.
+        self._changes: Dict[int, int] | None = None
+
+    def __len__(self) -> int:
+        """Returns the number of live tasks."""
+        return self._live
+
+    def __contains__(self, tid: int) -> bool:
+        return 0 <= tid < len(self.tombstones) and not self.tombstones[tid]
+
+    def _grow(self, size: int):
+        """Extends the columns with empty rows so that there are size rows."""
+        extra = size - len(self.tombstones)
+        if extra <= 0:
+            return
+        zeros = bytes(8 * extra)
+        self.tids.frombytes(zeros)
+        self.status.frombytes(zeros[:extra])
+        self.created_at.frombytes(zeros)
+        self.updated_at.frombytes(zeros)
+        self.descriptions.extend([""] * extra)
+        self.uids.extend([""] * extra)
+        self.seq.frombytes(zeros)
+        self.priority.frombytes(zeros[:extra])
+        self.due.frombytes(zeros)
+        self.blocked_by.extend([None] * extra)
+        self.extras.extend([None] * extra)
+        self.tombstones.extend(b"\x01" * extra)
+        self.ready.extend(bytes(extra))
+
+    def _set_row(self, tid: int, description: str, status: int,
+                 created_at: int, updated_at: int, uid: str, seq: int,
+                 priority: int, due: int, blocked_by: List[int] | None,
+                 extras: Dict[str, Any] | None):
+        """Stores the given field values in the row of the task id."""
+        if tid <= 0:
+            raise ValueError("invalid task id {}".format(tid))
+        self._grow(tid + 1)
+        self.tids[tid] = tid
+        self.status[tid] = status
+        self.created_at[tid] = created_at
+        self.updated_at[tid] = updated_at
+        self.descriptions[tid] = description
+        self.uids[tid] = uid
+        self.seq[tid] = seq
+        self.priority[tid] = priority
+        self.due[tid] = due
+        self.blocked_by[tid] = blocked_by
+        self.extras[tid] = extras
+        if self.tombstones[tid]:
+            self.tombstones[tid] = 0
+            self._live += 1
+
+    def put(self, task: Task):
+        """Inserts the task or replaces the task with the same task id. Task
+        instances returned by the columns are copies, a modified task must be
+        put back."""
+        encoded = task.__dict__
+        extras = {key: value for key, value in encoded.items()
+                  if key not in _column_keys} or None
+        tid = task.tid
+        was_open = self._is_open(tid)
+        old_blockers = self.blocked_by[tid] if tid in self else None
+        if self._changes is not None:
+            self._unindex_change(tid)
+            if task.seq:
+                self._changes[task.seq] = tid
+        self._set_row(tid, task.description, task.status.value,
+                      to_micros(task.created_at), to_micros(task.updated_at),
+                      task.uid, task.seq, task.priority,
+                      to_micros(task.due) if task.due else 0,
+                      list(task.blocked_by) or None, extras)
+        self._link(tid, old_blockers, self.blocked_by[tid])
+        self._update_ready(tid)
+        if self._is_open(tid) != was_open:
+            self._update_dependents(tid)
+
+    def _is_open(self, tid: int) -> bool:
+        """Returns whether the task id is a live task that is not done, an
+        open task blocks the tasks that depend on it."""
+        return tid in self and self.status[tid] != Status.DONE.value
+
+    def _update_ready(self, tid: int):
+        """Recomputes the ready flag of a row from its status and blockers."""
+        blockers = self.blocked_by[tid]
+        self.ready[tid] = self._is_open(tid) and \
+            not (blockers and any(map(self._is_open, blockers)))
+
+    def _update_dependents(self, tid: int):
+        """Recomputes the ready flags of the tasks blocked by a task id whose
+        open state changed."""
+        for dependent in self._dependents.get(tid, ()):
+            if dependent in self:
+                self._update_ready(dependent)
+
+    def _link(self, tid: int, old_blockers: List[int] | None,
+              new_blockers: List[int] | None):
+        """Updates the index of the tasks blocked by each task id after the
+        blockers of a task changed."""
+        for blocker in old_blockers or ():
+            if not new_blockers or blocker not in new_blockers:
+                dependents = self._dependents.get(blocker)
+                if dependents is not None:
+                    dependents.discard(tid)
+                    if not dependents:
+                        del self._dependents[blocker]
+        for blocker in new_blockers or ():
+            self._dependents.setdefault(blocker, set()).add(tid)
+
+    def depends_on(self, tid: int, other: int) -> bool:
+        """Returns whether the task id is blocked by the other task id
+        directly or through a chain of blockers."""
+        seen = {tid}
+        stack = [tid]
+        while stack:
+            for blocker in self.blocked_by[stack.pop()] or ():
+                if blocker == other:
+                    return True
+                if blocker not in seen and blocker in self:
+                    seen.add(blocker)
+                    stack.append(blocker)
+        return False
+
+    def remove(self, tid: int) -> bool:
+        """Deletes the task with the given task id. Returns False if there is no
+        such task. The row is kept as a tombstone, the task ids are never
+        reused."""
+        if tid not in self:
+            return False
+        was_open = self._is_open(tid)
+        self._link(tid, self.blocked_by[tid], None)
+        if self._changes is not None:
+            self._unindex_change(tid)
+        self.tids[tid] = 0
+        self.status[tid] = 0
+        self.descriptions[tid] = ""
+        self.uids[tid] = ""
+        self.seq[tid] = 0
+        self.priority[tid] = 0
+        self.due[tid] = 0
+        self.blocked_by[tid] = None
+        self.extras[tid] = None
+        self.tombstones[tid] = 1
+        self.ready[tid] = 0
+        self._live -= 1
+        if was_open:
+            # A deleted blocker does not block anymore.
+            self._update_dependents(tid)
+        return True
+
+    def task(self, row: int) -> Task:
+        """Builds the Task instance for a row that holds a live task."""
+        task = Task()
+        extras = self.extras[row]
+        if extras:
+            task.__dict__.update(deepcopy(extras))
+        task.tid = self.tids[row]
+        task.description = self.descriptions[row]
+        task.status = Status(self.status[row])
+        task.created_at = _from_micros(self.created_at[row])
+        task.updated_at = _from_micros(self.updated_at[row])
+        if self.uids[row]:
+            task.uid = self.uids[row]
+        if self.seq[row]:
+            task.seq = self.seq[row]
+        if self.priority[row]:
+            task.priority = self.priority[row]
+        if self.due[row]:
+            task.due = _from_micros(self.due[row])
+        if self.blocked_by[row]:
+            task.blocked_by = list(self.blocked_by[row])
+        return task
+
+    def get(self, tid: int) -> Task | None:
+        """Returns the Task instance for a task id or None if there is no such
+        task."""
+        return self.task(tid) if tid in self else None
+
+    def tasks(self, rows: Iterable[int]) -> Generator[Task, None, None]:
+        """Builds the Task instances for the given rows lazily."""
+        return (self.task(row) for row in rows)
+
+    def rows(self, status: Status = Status.UNKNOWN) -> List[int]:
+        """
+        Returns the rows of all live tasks or those with the given status in
+        task id order.
+        """
+        if status == Status.UNKNOWN:
+            mask = map(not_, self.tombstones)
+        else:
+            # Rows without a task have status 0 and never match.
+            mask = map(status.value.__eq__, self.status)
+        return list(compress(range(len(self.tombstones)), mask))
+
+    def ready_rows(self, status: Status = Status.UNKNOWN) -> List[int]:
+        """
+        Returns the rows of the ready tasks(see the ready column) or those
+        with the given status in task id order.
+        """
+        rows = compress(range(len(self.ready)), self.ready)
+        if status == Status.UNKNOWN:
+            return list(rows)
+        return [row for row in rows if self.status[row] == status.value]
+
+    def _unindex_change(self, tid: int):
+        """Drops the last change of a task from the index of the changes."""
+        changes = self._changes
+        if changes is not None and tid in self and \
+                changes.get(self.seq[tid]) == tid:
+            del changes[self.seq[tid]]
+
+    def changed_rows(self, since: int) -> List[int]:
+        """
+        Returns the rows of the live tasks whose last change has a sequence
+        number greater than since(up to the "seq" bookkeeping entry), in task
+        id order. The rows are looked up by sequence number in an index of
+        the changes, so the cost depends on the number of changes after
+        since and not on the size of the store. The index is built by the
+        first call and then maintained by put() and remove().
+        """
+        if self._changes is None:
+            # Rows without a task have sequence number 0 and are skipped.
+            rows = compress(range(len(self.seq)), self.seq)
+            self._changes = {self.seq[row]: row for row in rows}
+        changes = self._changes
+        last = self.meta.get("seq", 0)
+        return sorted(changes[seq] for seq in range(since + 1, last + 1)
+                      if seq in changes)
+
+    def sort_rows(self, rows: List[int]) -> List[int]:
+        """
+        Sorts the rows in place in the order defined by Task.__lt__: by
+        status and for the same status by the last updated time in
+        descending order. Returns the sorted rows.
+        """
+        # Two stable sorts keyed directly by the columns, no Task instances.
+        rows.sort(key=self.updated_at.__getitem__, reverse=True)
+        rows.sort(key=self.status.__getitem__)
+        return rows
+
+    def iter_sorted_rows(self, rows: List[int]) -> Iterator[int]:
+        """
+        Yields the rows in the order of sort_rows() lazily: the sort keys are
+        heapified(in linear time) and popped as the rows are consumed, so the
+        first k rows cost O(n + k log n) instead of a full sort. A full sort
+        is faster when all the rows are consumed.
+        """
+        status = self.status
+        updated_at = self.updated_at
+        # Each key packs the status, the negated last update time(as an
+        # unsigned 64 bits offset) and the row in a single integer, which
+        # compares much faster than a tuple. The row breaks the ties in task
+        # id order like the stable sorts.
+        top = (1 << 63) - 1
+        heap = [(((status[row] << 64) | (top - updated_at[row])) << 40) | row
+                for row in rows]
+        heapq.heapify(heap)
+        mask = (1 << 40) - 1
+        while heap:
+            yield heapq.heappop(heap) & mask
+
+    def status_counts(self) -> Dict[Status, int]:
+        """Returns the number of live tasks with each status."""
+        return {status: self.status.count(status.value)
+                for status in Status if status != Status.UNKNOWN}
+
+    def copy(self) -> "TaskColumns":
+        """Returns an independent copy of the columns."""
+        columns = TaskColumns()
+        columns.tids = array("q", self.tids)
+        columns.status = array("b", self.status)
+        columns.created_at = array("q", self.created_at)
+        columns.updated_at = array("q", self.updated_at)
+        columns.descriptions = self.descriptions.copy()
+        columns.uids = self.uids.copy()
+        columns.seq = array("q", self.seq)
+        columns.priority = array("b", self.priority)
+        columns.due = array("q", self.due)
+        columns.blocked_by = [list(blockers) if blockers else None
+                              for blockers in self.blocked_by]
+        columns.extras = [deepcopy(extras) if extras else None
+                          for extras in self.extras]
+        columns.tombstones = bytearray(self.tombstones)
+        columns.ready = bytearray(self.ready)
+        columns.meta = deepcopy(self.meta)
+        columns._live = self._live
+        columns._dependents = {tid: set(dependents) for tid, dependents
+                               in self._dependents.items()}
+        return columns
+
+    def _index_dependencies(self):
+        """Builds the index of the tasks blocked by each task id and the ready
+        column from the other columns."""
+        self._dependents = {}
+        blocked = [tid for tid, blockers in enumerate(self.blocked_by)
+                   if blockers]
+        for tid in blocked:
+            for blocker in self.blocked_by[tid] or ():
+                self._dependents.setdefault(blocker, set()).add(tid)
+        self.ready = bytearray(self.status.tobytes().translate(_ready_table))
+        for tid in blocked:
+            self._update_ready(tid)
+
+    def _serialize(self, row: int) -> Dict[str, Any]:
+        """Returns the representation of the task of a row as written by
+        TaskEncoder."""
+        if self.extras[row]:
+            return TaskEncoder().default(self.task(row))
+        d = {"__class__": "Task",
+             "tid": self.tids[row],
+             "description": self.descriptions[row],
+             "status": _status_names[self.status[row]],
+             "created_at": str(self.created_at[row] / 1000000),
+             "updated_at": str(self.updated_at[row] / 1000000)}
+        if self.uids[row]:
+            d["uid"] = self.uids[row]
+        if self.seq[row]:
+            d["seq"] = self.seq[row]
+        if self.priority[row]:
+            d["priority"] = self.priority[row]
+        if self.due[row]:
+            d["due"] = str(self.due[row] / 1000000)
+        if self.blocked_by[row]:
+            d["blocked_by"] = self.blocked_by[row]
+        return d
+
+    def records(self, rows: Iterable[int]) -> List[Dict[str, Any]]:
+        """Returns the representations of the tasks of the given rows as
+        written by TaskEncoder(plain values, cheap to pickle), see
+        TaskDecoder.from_dict()."""
+        return [self._serialize(row) for row in rows]
+
+    def dump(self, fp: TextIO, fingerprints: Dict[int, int] | None = None):
+        """
+        Writes the bookkeeping entries and the tasks in the format of
+        TaskStore data files(see TaskEncoder) with the layout of the version
+        of the store(see formats.py). If a fingerprints dictionary is given,
+        the fingerprints of the written lines are added to it(see load()).
+        """
+        version = self.meta.get("version", 1)
+        rows = self.rows()
+        store = header(self.meta, version, len(rows))
+        if version > 1:
+            fp.write(encode_line(json.dumps(store), version))
+            for row in rows:
+                line = encode_line(json.dumps(self._serialize(row)), version)
+                if fingerprints is not None:
+                    fingerprints[row] = hash(line)
+                fp.write(line)
+            return
+        for row in rows:
+            store[str(row)] = self._serialize(row)
+        json.dump(store, fp, cls=TaskEncoder)
+
+    @staticmethod
+    def load(fp: TextIO, fingerprints: Dict[int, int] | None = None) \
+            -> "TaskColumns":
+        """
+        Builds the columns directly from a JSON data file in the format
+        written by TaskStore(TaskEncoder) with any layout version. No Task
+        instances are created. The decoded fields are collected as they are
+        parsed and then converted and stored column by column. ValueError is
+        raised for an unknown layout version, a damaged line or a number of
+        task lines that differs from the one in the header(see recovery.py
+        to load the intact tasks of a damaged file).
+
+        If a fingerprints dictionary is given and the layout has a line per
+        task(version 2 and later), the hash of the line of each task is added
+        to it keyed by task id, see apply_changes().
+        """
+        parsed: List[Dict[str, Any]] = []
+
+        def object_hook(d: Dict[str, Any]) -> Any:
+            if d.get("__class__") != "Task":
+                return d
+            parsed.append(d)
+            return None
+
+        version = detect_version(fp)
+        if version not in versions:
+            raise ValueError("unknown data file version {}".format(version))
+        if version > 1:
+            store = json.loads(decode_line(fp.readline(), version))
+            del store["format"]
+            lines = (line for line in fp if line.strip())
+            if fingerprints is not None:
+                lines = _fingerprinted(lines, version, fingerprints)
+            # Parsed at once as a JSON array, much faster than line by line.
+            json.loads("[{}]".format(",".join(
+                decode_line(line, version) for line in lines)),
+                object_hook=object_hook)
+            check_records(store, len(parsed))
+        else:
+            store = json.load(fp, object_hook=object_hook)
+        return TaskColumns.build(store, parsed)
+
+    def apply_changes(self, fp: TextIO, fingerprints: Dict[int, int]) \
+            -> int | None:
+        """
+        Brings the columns up to date with a data file that was written by
+        another process since the columns were loaded or dumped with the
+        given fingerprints(see load()). Only the lines whose fingerprint
+        changed are decoded and put, the tasks whose line is gone are
+        removed, the bookkeeping entries are replaced and the fingerprints
+        are updated.
+
+        Returns the number of tasks added, changed or removed, None if the
+        layout has no line per task(version 1). ValueError is raised for an
+        unknown layout version, a damaged line or a number of task lines that
+        differs from the one in the header. The columns are not changed
+        if None is returned or an exception is raised.
+        """
+        version = detect_version(fp)
+        if version not in versions:
+            raise ValueError("unknown data file version {}".format(version))
+        if version == 1:
+            return None
+        store = json.loads(decode_line(fp.readline(), version))
+        del store["format"]
+        current: Dict[int, int] = {}
+        changed: List[Task] = []
+        for line in fp:
+            if not line.strip():
+                continue
+            match = _tid_re.match(line)
+            d = None
+            if match is None:
+                d = json.loads(decode_line(line, version))
+                tid = int(d["tid"])
+            else:
+                tid = int(match.group(1))
+            current[tid] = hash(line)
+            if fingerprints.get(tid) == current[tid]:
+                continue
+            if d is None:
+                d = json.loads(decode_line(line, version))
+            if not isinstance(d, dict) or d.get("__class__") != "Task":
+                raise ValueError("not a task")
+            changed.append(TaskDecoder.from_dict(d))
+        check_records(store, len(current))
+
+        # Everything is decoded, the columns can be changed safely.
+        removed = [tid for tid in fingerprints if tid not in current]
+        for tid in removed:
+            self.remove(tid)
+        for task in changed:
+            self.put(task)
+        self.meta = {key: value for key, value in store.items()
+                     if value is not None}
+        fingerprints.clear()
+        fingerprints.update(current)
+        return len(removed) + len(changed)
+
+    @staticmethod
+    def build(store: Dict[str, Any], parsed: List[Dict[str, Any]]) \
+            -> "TaskColumns":
+        """
+        Builds the columns from the bookkeeping entries of a data file and
+        its serialized tasks(as written by TaskEncoder, decoded as plain
+        dictionaries).
+        """
+        columns = TaskColumns()
+        columns.meta = {key: value for key, value in store.items()
+                        if value is not None}
+        if not parsed:
+            return columns
+
+        tids = [int(d["tid"]) for d in parsed]
+        status_values = {name: status.value
+                         for name, status in status_map.items()}
+        status = array("b", [status_values[d["status"]] for d in parsed])
+        created_at = array("q", map(round, map(1e6.__mul__, map(
+            float, [d["created_at"] for d in parsed]))))
+        updated_at = array("q", map(round, map(1e6.__mul__, map(
+            float, [d["updated_at"] for d in parsed]))))
+        descriptions = [d["description"] for d in parsed]
+        uids = [d.get("uid", "") for d in parsed]
+        seq = array("q", [int(d.get("seq", 0)) for d in parsed])
+        priority = array("b", [int(d.get("priority", 0)) for d in parsed])
+        due = array("q", [round(float(d["due"]) * 1e6) if "due" in d else 0
+                          for d in parsed])
+        blocked_by = [d.get("blocked_by") or None for d in parsed]
+        extras = [None if d.keys() <= _column_keys else _extras(d)
+                  for d in parsed]
+
+        if tids == list(range(1, len(tids) + 1)):
+            # Common case of no deleted tasks: the rows are already in place.
+            columns.tids = array("q", [0]) + array("q", tids)
+            columns.status = array("b", [0]) + status
+            columns.created_at = array("q", [0]) + created_at
+            columns.updated_at = array("q", [0]) + updated_at
+            columns.descriptions = [""] + descriptions
+            columns.uids = [""] + uids
+            columns.seq = array("q", [0]) + seq
+            columns.priority = array("b", [0]) + priority
+            columns.due = array("q", [0]) + due
+            columns.blocked_by = [None] + blocked_by
+            columns.extras = [None] + extras
+            columns.tombstones = bytearray(b"\x01") + bytearray(len(tids))
+            columns._live = len(tids)
+        else:
+            for idx, tid in enumerate(tids):
+                columns._set_row(tid, descriptions[idx], status[idx],
+                                 created_at[idx], updated_at[idx], uids[idx],
+                                 seq[idx], priority[idx], due[idx],
+                                 blocked_by[idx], extras[idx])
+        columns._index_dependencies()
+        return columns
+
+
+def _fingerprinted(lines: Iterable[str], version: int,
+                   fingerprints: Dict[int, int]) \
+        -> Generator[str, None, None]:
+    """Yields the lines of the tasks of a data file with a JSON lines layout
+    and adds their fingerprints to the dictionary, see TaskColumns.load()."""
+    for line in lines:
+        match = _tid_re.match(line)
+        tid = int(match.group(1)) if match is not None else \
+            int(json.loads(decode_line(line, version))["tid"])
+        fingerprints[tid] = hash(line)
+        yield line
+
+
+def _extras(d: Dict[str, Any]) -> Dict[str, Any] | None:
+    """Returns the decoded fields of a serialized task that have no dedicated
+    column."""
+    decoded = TaskDecoder.from_dict(d).__dict__
+    return {key: value for key, value in decoded.items()
+            if key not in _column_keys} or None
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+
+"""\
+Versions of the layout of the data files. Every layout holds the same
+bookkeeping entries(like "next_tid") and the same serialized tasks(see
+TaskEncoder), only the way they are laid out in the file differs:
+
+1: a single JSON object with the bookkeeping entries first and then each task
+   keyed by its stringified task id. Files without a header are version 1.
+2: JSON lines. The first line is the header: a JSON object with the format
+   name, the version and the bookkeeping entries. Every following line holds
+   one task. A task can be read or written without parsing the others.
+3: JSON lines like version 2, every line(the header too) ends with a space
+   and the CRC-32 of the JSON text in 8 hexadecimal digits. A damaged record
+   is detected without parsing it and without trusting the other records,
+   see recovery.py.
+
+The header of the JSON lines layouts also holds the number of task lines that
+follow it("records"), so that a file cut at a line boundary is detected.
+Files written before it was added have no "records" entry and are not
+checked.
+
+The header of the versions after 1 starts with the format name and the
+version, so that the version of a file is known from its first bytes.
+"""
+
+import re
+import zlib
+from typing import Any, Dict, TextIO
+from uuid import uuid4
+
+# Value of the "format" entry of the headers.
+store_format = "task-tracker"
+
+# Description of each version of the layout.
+versions = {
+    1: "single JSON object",
+    2: "JSON lines, one task per line after a header line",
+    3: "JSON lines with a checksum at the end of every line"}
+
+# Version of the layout of new data files.
+default_version = 3
+
+# Newest version of the layout.
+latest_version = max(versions)
+
+_header_re = re.compile(r'^\{"format": "' + store_format +
+                        r'", "version": (\d+)')
+
+# Number of characters read from the start of a data file to find the version.
+_header_size = 64
+
+
+def header(meta: Dict[str, Any], version: int,
+           records: int | None = None) -> Dict[str, Any]:
+    """
+    Returns the bookkeeping entries in the order they are written in a data
+    file of the given version: the format name and the version for versions
+    after 1, then the "generation" and the "write_id"(so that they can be
+    read cheaply, see watch.py), the number of task lines("records", only
+    for versions after 1 and if given) and then the rest of the entries.
+    """
+    entries: Dict[str, Any] = {}
+    if version > 1:
+        entries["format"] = store_format
+        entries["version"] = version
+    for key in ("generation", "write_id"):
+        if key in meta:
+            entries[key] = meta[key]
+    if version > 1 and records is not None:
+        entries["records"] = records
+    entries.update((key, value) for key, value in meta.items()
+                   if key not in ("format", "version", "records"))
+    return entries
+
+
+def check_records(entries: Dict[str, Any], count: int):
+    """
+    Checks the number of task lines read from a data file against the
+    "records" entry of its header(removed from the entries). ValueError is
+    raised if they differ, like when the end of the file is missing.
+    """
+    records = entries.pop("records", None)
+    if records is not None and records != count:
+        raise ValueError("{} task records instead of {}, the data file is"
+                         " truncated or damaged".format(count, records))
+
+
+def next_generation(meta: Dict[str, Any]):
+    """
+    Increments the "generation" of the bookkeeping entries before a write of
+    the data file and draws a new random "write_id". Two processes that
+    loaded the same generation write the same next generation, their write
+    ids tell the two writes apart.
+    """
+    meta["generation"] = meta.get("generation", 0) + 1
+    meta["write_id"] = uuid4().hex[:16]
+
+
+def version_of(text: str) -> int:
+    """Returns the version of the layout of a data file from its first
+    characters."""
+    match = _header_re.match(text)
+    return int(match.group(1)) if match else 1
+
+
+def has_checksums(version: int) -> bool:
+    """Returns whether the lines of a layout version end with a checksum."""
+    return version >= 3
+
+
+def checksum(text: str) -> str:
+    """Returns the checksum of the JSON text of a line. The JSON texts are
+    ASCII(json.dumps() escapes the rest) so they are their own encoding."""
+    return "{:08x}".format(zlib.crc32(text.encode()))
+
+
+def encode_line(text: str, version: int) -> str:
+    """Returns a line of a JSON lines layout holding the given JSON text."""
+    if has_checksums(version):
+        return "{} {}\n".format(text, checksum(text))
+    return text + "\n"
+
+
+def decode_line(line: str, version: int) -> str:
+    """
+    Returns the JSON text held by a line of a JSON lines layout. ValueError
+    is raised if the checksum of the line is missing or does not match.
+    """
+    line = line.rstrip("\r\n")
+    if not has_checksums(version):
+        return line
+    # Compared as integers, formatting the checksum is slower.
+    text = line[:-9]
+    try:
+        valid = line[-9:-8] == " " and \
+            int(line[-8:], 16) == zlib.crc32(text.encode())
+    except ValueError:
+        valid = False
+    if not valid:
+        raise ValueError("checksum mismatch")
+    return text
+
+
+def detect_version(fp: TextIO) -> int:
+    """Returns the version of the layout of an open data file. The file must
+    be seekable, it is positioned back at its start."""
+    version = version_of(fp.read(_header_size))
+    fp.seek(0)
+    return version
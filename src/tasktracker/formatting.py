@@ -5,3 +5,15 @@
 def fmt_list_of_strings(strlst: list[str]) -> str:
     """Formats a list of strings such that there are no quotation marks around the items."""
     return "[{}]".format(', '.join(strlst))
+
+def fmt_id_ranges(ids: list[int]) -> str:
+    """Formats a list of integer ids compactly by collapsing consecutive ids to
+    ranges, for example [1, 2, 3, 7] is formatted as "1-3, 7"."""
+    parts = []
+    for tid in sorted(ids):
+        if parts and parts[-1][1] == tid - 1:
+            parts[-1][1] = tid
+        else:
+            parts.append([tid, tid])
+    return ", ".join(str(low) if low == high else "{}-{}".format(low, high)
+                     for low, high in parts)
@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+
+"""\
+Persistent operation metrics. Each executed action records its latency, its
+outcome and a few numbers about the store in a small metrics file next to the
+data file(<list>.metrics). The file holds aggregates only(counters and
+histogram buckets), so its size does not grow with the number of
+invocations and updating it costs one small read and one small write. It is
+replaced atomically, so a reader never sees a partially written file, and the
+updates hold an exclusive lock on a lock file next to it(<list>.metrics.lock)
+so that concurrent invocations do not lose each other's counts.
+
+The metrics are exported in the OpenMetrics text format or in the Prometheus
+text format(for the textfile collector of the node exporter).
+"""
+
+import json
+import os
+import tempfile
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows.
+    fcntl = None
+
+# Supported values of the --format option of the metrics sub-command.
+metrics_formats = ["openmetrics", "prometheus"]
+
+# Upper bounds in seconds of the buckets of the latency histograms.
+duration_buckets = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                    1.0, 2.5, 5.0, 10.0]
+
+# Prefix of the names of the metrics.
+_prefix = "tasktracker_"
+
+
+def metrics_file(data_fname: str) -> Path:
+    """Returns the path of the metrics file of a data file."""
+    return Path(data_fname).with_suffix(".metrics")
+
+
+def lock_file(fname: Path) -> Path:
+    """Returns the path of the lock file of a metrics file."""
+    return fname.with_name(fname.name + ".lock")
+
+
+@contextmanager
+def _locked(fname: Path) -> Iterator[None]:
+    """Holds an exclusive lock on the lock file of a metrics file. Without
+    fcntl(or if the lock file cannot be opened) the metrics file is updated
+    unlocked and concurrent updates may lose counts."""
+    if fcntl is None:
+        yield
+        return
+    try:
+        fp = open(lock_file(fname), "a")
+    except OSError:
+        yield
+        return
+    with fp:
+        fcntl.flock(fp.fileno(), fcntl.LOCK_EX)
+        yield
+
+
+def _histogram() -> Dict[str, Any]:
+    """Returns an empty histogram, the buckets hold the number of
+    observations per bucket(not cumulative), the last one is +Inf."""
+    return {"count": 0, "sum": 0.0, "buckets": [0] * (len(duration_buckets) + 1)}
+
+
+def _observe(histogram: Dict[str, Any], value: float):
+    histogram["count"] += 1
+    histogram["sum"] += value
+    histogram["buckets"][bisect_left(duration_buckets, value)] += 1
+
+
+def load_metrics(fname: Path) -> Dict[str, Any]:
+    """Returns the metrics recorded in a metrics file, empty metrics if the
+    file does not exist or cannot be read."""
+    try:
+        with open(fname, "r") as fp:
+            metrics = json.load(fp)
+    except (OSError, ValueError):
+        metrics = None
+    if not isinstance(metrics, dict) or \
+            metrics.get("buckets") != duration_buckets:
+        metrics = {"buckets": duration_buckets, "actions": {},
+                   "load": _histogram(), "written_bytes": 0}
+    return metrics
+
+
+def record(fname: Path, action: str, duration: float, error: bool,
+           load_seconds: float | None = None, written_bytes: int = 0,
+           store_bytes: int | None = None, tasks: int | None = None):
+    """
+    Adds the outcome of an action to the metrics file.
+
+    Keyword arguments:
+    action       : the name of the action.
+    duration     : the latency of the action in seconds.
+    error        : whether the action failed.
+    load_seconds : the time taken to load the store, None if not loaded.
+    written_bytes: the number of bytes written to the data file.
+    store_bytes  : the size of the data file after the action, None if
+                   unknown.
+    tasks        : the number of tasks after the action, None if unknown.
+
+    Metrics are best effort: errors writing the metrics file are ignored so
+    that they never fail the action. The metrics file is read and replaced
+    under the lock of _locked().
+    """
+    with _locked(fname):
+        _record(fname, action, duration, error, load_seconds, written_bytes,
+                store_bytes, tasks)
+
+
+def _record(fname: Path, action: str, duration: float, error: bool,
+            load_seconds: float | None, written_bytes: int,
+            store_bytes: int | None, tasks: int | None):
+    """Helper function of record() that updates the metrics file."""
+    metrics = load_metrics(fname)
+    stats = metrics["actions"].setdefault(
+        action, {"errors": 0, "duration": _histogram()})
+    _observe(stats["duration"], duration)
+    if error:
+        stats["errors"] += 1
+    if load_seconds is not None:
+        _observe(metrics["load"], load_seconds)
+    metrics["written_bytes"] += written_bytes
+    if store_bytes is not None:
+        metrics["store_bytes"] = store_bytes
+    if tasks is not None:
+        metrics["tasks"] = tasks
+    metrics["last_action_at"] = time.time()
+    try:
+        fd, tmp_fname = tempfile.mkstemp(dir=fname.parent, prefix=fname.name,
+                                         suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as fp:
+                json.dump(metrics, fp)
+            os.replace(tmp_fname, fname)
+        except BaseException:
+            os.remove(tmp_fname)
+            raise
+    except OSError:
+        pass
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    """Formats the labels of a sample."""
+    escaped = (value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+               for value in labels.values())
+    return "{" + ",".join("{}=\"{}\"".format(name, value)
+                          for name, value in zip(labels, escaped)) + "}"
+
+
+class _Family:
+    """Collects the text lines of a metric family."""
+
+    def __init__(self, lines: List[str], fmt: str, name: str, mtype: str,
+                 text: str) -> None:
+        self.lines = lines
+        self.name = _prefix + name
+        # Prometheus names counters with their _total sample name.
+        family = self.name
+        if mtype == "counter" and fmt == "prometheus":
+            family += "_total"
+        lines.append("# HELP {} {}".format(family, text))
+        lines.append("# TYPE {} {}".format(family, mtype))
+
+    def sample(self, suffix: str, labels: Dict[str, str], value: Any):
+        self.lines.append("{}{}{} {}".format(self.name, suffix,
+                                             _labels(labels), value))
+
+    def histogram(self, labels: Dict[str, str], histogram: Dict[str, Any]):
+        cumulative = 0
+        for bound, count in zip(duration_buckets + [None], histogram["buckets"]):
+            cumulative += count
+            le = "+Inf" if bound is None else repr(bound)
+            self.sample("_bucket", dict(labels, le=le), cumulative)
+        self.sample("_count", labels, histogram["count"])
+        self.sample("_sum", labels, repr(float(histogram["sum"])))
+
+
+def render(metrics: Dict[str, Any], list_name: str, fmt: str = "openmetrics") -> str:
+    """Returns the metrics of a task list in the given text format(one of
+    metrics_formats)."""
+    lines: List[str] = []
+    labels = {"list": list_name}
+    actions = sorted(metrics["actions"].items())
+
+    family = _Family(lines, fmt, "action_duration_seconds", "histogram",
+                     "Latency of the executed actions.")
+    for action, stats in actions:
+        family.histogram(dict(labels, action=action), stats["duration"])
+    family = _Family(lines, fmt, "action_errors", "counter",
+                     "Number of actions that failed.")
+    for action, stats in actions:
+        family.sample("_total", dict(labels, action=action), stats["errors"])
+    family = _Family(lines, fmt, "store_load_duration_seconds", "histogram",
+                     "Time taken to load the task store.")
+    family.histogram(labels, metrics["load"])
+    family = _Family(lines, fmt, "store_written_bytes", "counter",
+                     "Number of bytes written to the data file.")
+    family.sample("_total", labels, metrics["written_bytes"])
+    for name, key, text in (
+            ("store_size_bytes", "store_bytes",
+             "Size of the data file after the last action."),
+            ("store_tasks", "tasks",
+             "Number of tasks after the last action that loaded the store."),
+            ("last_action_timestamp_seconds", "last_action_at",
+             "Time of the last action.")):
+        if key in metrics:
+            _Family(lines, fmt, name, "gauge", text).sample("", labels, metrics[key])
+    if fmt == "openmetrics":
+        lines.append("# EOF")
+    return "\n".join(lines) + "\n"
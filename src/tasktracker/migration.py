@@ -0,0 +1,254 @@
+#!/usr/bin/env python
+
+"""\
+Streaming and resumable migration of a data file from one layout version to
+another(see formats.py). The data file is never loaded at once: the tasks are
+read, converted and written one at a time.
+
+The converted file is written next to the data file(<data file>.migrating).
+Every checkpoint_interval tasks it is flushed to disk and a checkpoint
+(<data file>.checkpoint) records the number of tasks converted, the size of
+the converted file and the running checksum of the tasks. A migration that
+was interrupted resumes after its last checkpoint when it is started again,
+as long as the data file was not changed in the meantime.
+
+When all the tasks are converted, a verification pass reads the converted
+file back and compares its bookkeeping entries, its number of tasks and the
+checksum of its tasks with those of the data file(and the number of tasks
+with the one in the header of the data file, if it has one). Only then the
+converted file replaces the data file with os.replace(), so the data file is
+never partially written.
+"""
+
+import hashlib
+import json
+import os
+from itertools import islice
+from typing import Any, BinaryIO, Callable, Dict, Iterator, TextIO
+
+from tasktracker.formats import decode_line, detect_version, encode_line
+from tasktracker.formats import header, next_generation, versions
+from tasktracker.streaming import iter_entries
+from tasktracker.watch import file_signature
+
+# Number of tasks converted between two checkpoints.
+checkpoint_interval = 10000
+
+_checksum_mask = (1 << 64) - 1
+
+
+def task_checksum(d: Dict[str, Any]) -> int:
+    """Returns a 64 bits checksum of a serialized task that does not depend on
+    the layout(the order of the keys or the spacing)."""
+    data = json.dumps(d, sort_keys=True).encode()
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big")
+
+
+def _read_meta(fname: str, version: int) -> Dict[str, Any]:
+    """Returns the bookkeeping entries of a data file without the format name
+    and the version, the number of tasks of the JSON lines layouts is kept
+    ("records", see formats.py). The tasks are skipped without decoding
+    them."""
+    with open(fname, "r") as fp:
+        if version > 1:
+            meta = json.loads(decode_line(fp.readline(), version))
+        else:
+            meta = dict(iter_entries(fp, select=lambda key: not key.isdigit()))
+    meta.pop("format", None)
+    meta.pop("version", None)
+    return meta
+
+
+def _iter_tasks(fp: TextIO, version: int, skip: int = 0) \
+        -> Iterator[Dict[str, Any]]:
+    """Yields the serialized tasks of a data file in file order after the
+    first skip tasks, which are not decoded."""
+    if version > 1:
+        fp.readline()
+        lines = (line for line in fp if line.strip())
+        for line in islice(lines, skip, None):
+            yield json.loads(decode_line(line, version))
+        return
+    skipped = 0
+
+    def select(key: str) -> bool:
+        nonlocal skipped
+        if not key.isdigit():
+            return False
+        if skipped < skip:
+            skipped += 1
+            return False
+        return True
+
+    for _, value in iter_entries(fp, select=select):
+        yield value
+
+
+class _Writer:
+    """Writes a data file of a layout version one task at a time."""
+
+    def __init__(self, out: BinaryIO, version: int, resumed: bool) -> None:
+        self.out = out
+        self.version = version
+        # Separator of the entries of the JSON object of version 1, the
+        # bookkeeping entries are already written when resuming.
+        self.separator = ", " if resumed else ""
+
+    def _write(self, text: str):
+        self.out.write(text.encode())
+
+    def begin(self, meta: Dict[str, Any], records: int | None = None):
+        """Writes the bookkeeping entries and the number of tasks if known."""
+        entries = header(meta, self.version, records)
+        if self.version > 1:
+            self._write(encode_line(json.dumps(entries), self.version))
+            return
+        self._write("{")
+        for key, value in entries.items():
+            self._write("{}{}: {}".format(self.separator, json.dumps(key),
+                                          json.dumps(value)))
+            self.separator = ", "
+
+    def task(self, d: Dict[str, Any]):
+        """Writes a serialized task."""
+        if self.version > 1:
+            self._write(encode_line(json.dumps(d), self.version))
+            return
+        self._write("{}{}: {}".format(self.separator,
+                                      json.dumps(str(d["tid"])),
+                                      json.dumps(d)))
+        self.separator = ", "
+
+    def end(self):
+        if self.version == 1:
+            self._write("}")
+
+
+def _load_checkpoint(fname: str) -> Dict[str, Any] | None:
+    try:
+        with open(fname, "r") as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_checkpoint(fname: str, state: Dict[str, Any]):
+    """Writes the checkpoint atomically."""
+    with open(fname + ".new", "w") as fp:
+        json.dump(state, fp)
+        fp.flush()
+        os.fsync(fp.fileno())
+    os.replace(fname + ".new", fname)
+
+
+def _remove(*fnames: str):
+    for fname in fnames:
+        try:
+            os.remove(fname)
+        except FileNotFoundError:
+            pass
+
+
+def migrate(fname: str, to_version: int,
+            interval: int = checkpoint_interval,
+            progress: Callable[[int], None] | None = None) -> Dict[str, int]:
+    """
+    Converts the data file fname to the layout version to_version, resuming
+    an interrupted migration if there is one. progress is called with the
+    number of tasks converted after each checkpoint. The generation of the
+    data file is incremented, so that watchers(see watch.py) notice it.
+
+    Returns a dictionary with the "from" and "to" versions, the number of
+    "tasks", the number of tasks converted by an interrupted migration that
+    were not converted again("resumed") and the "checksum" of the tasks.
+
+    ValueError is raised if a version is unknown, if the data file already
+    has the requested version, if the data file was changed during the
+    migration or if the verification fails. OSError is raised if a file
+    cannot be read or written. The data file is unchanged in these cases.
+    """
+
+    if to_version not in versions:
+        raise ValueError("unknown data file version {}".format(to_version))
+    with open(fname, "r") as fp:
+        from_version = detect_version(fp)
+    if from_version not in versions:
+        raise ValueError("unknown data file version {}".format(from_version))
+    if from_version == to_version:
+        raise ValueError("the data file already has version {}".format(to_version))
+
+    converted_fname = fname + ".migrating"
+    checkpoint_fname = fname + ".checkpoint"
+    signature = list(file_signature(fname) or ())
+    state = _load_checkpoint(checkpoint_fname)
+    if state is None or state.get("source") != signature or \
+            state.get("from") != from_version or state.get("to") != to_version \
+            or not os.path.isfile(converted_fname):
+        state = {"source": signature, "from": from_version, "to": to_version,
+                 "tasks": 0, "offset": 0, "checksum": 0}
+    resumed = state["tasks"]
+
+    meta = _read_meta(fname, from_version)
+    records = meta.pop("records", None)
+    next_generation(meta)
+    if resumed and "write_id" in state:
+        # The header was written by the interrupted run.
+        meta["write_id"] = state["write_id"]
+    state["write_id"] = meta["write_id"]
+    count = resumed
+    checksum = state["checksum"]
+    with open(fname, "r") as fp, \
+            open(converted_fname, "r+b" if resumed else "wb") as out:
+        writer = _Writer(out, to_version, resumed > 0)
+        if resumed:
+            out.truncate(state["offset"])
+            out.seek(state["offset"])
+        else:
+            writer.begin(meta, records)
+        for d in _iter_tasks(fp, from_version, resumed):
+            writer.task(d)
+            checksum = (checksum + task_checksum(d)) & _checksum_mask
+            count += 1
+            if count % interval == 0:
+                out.flush()
+                os.fsync(out.fileno())
+                state.update(tasks=count, offset=out.tell(), checksum=checksum)
+                _save_checkpoint(checkpoint_fname, state)
+                if progress is not None:
+                    progress(count)
+        writer.end()
+        out.flush()
+        os.fsync(out.fileno())
+
+    # Verification pass over the converted file.
+    with open(converted_fname, "r") as fp:
+        converted_version = detect_version(fp)
+        converted_count = 0
+        converted_checksum = 0
+        for d in _iter_tasks(fp, converted_version):
+            converted_count += 1
+            converted_checksum = (converted_checksum + task_checksum(d)) \
+                & _checksum_mask
+    converted_meta = _read_meta(converted_fname, to_version)
+    converted_records = converted_meta.pop("records", None)
+    if records is not None and records != count:
+        _remove(converted_fname, checkpoint_fname)
+        raise ValueError("{} tasks in the data file instead of {}, it is"
+                         " truncated or damaged".format(count, records))
+    if converted_version != to_version or converted_meta != meta or \
+            converted_records != (records if to_version > 1 else None) or \
+            converted_count != count or converted_checksum != checksum:
+        _remove(converted_fname, checkpoint_fname)
+        raise ValueError("verification of the converted data file failed"
+                         " ({} tasks with checksum {:016x} instead of {} with"
+                         " checksum {:016x})".format(
+                             converted_count, converted_checksum, count,
+                             checksum))
+    if list(file_signature(fname) or ()) != signature:
+        _remove(converted_fname, checkpoint_fname)
+        raise ValueError("the data file was changed during the migration,"
+                         " run it again")
+    os.replace(converted_fname, fname)
+    _remove(checkpoint_fname)
+    return {"from": from_version, "to": to_version, "tasks": count,
+            "resumed": resumed, "checksum": checksum}
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+
+"""\
+Defines the Task class representing a single task and the JSON encoder and
+decoder used to persist tasks.
+"""
+
+from datetime import datetime, timezone
+import json
+from typing import override, Any, Dict, List
+
+from tasktracker.formatting import fmt_id_ranges
+from tasktracker.status import Status, status_map
+
+
+class Task:
+    """
+    Task represents a single task with id(tid), a short
+    description(description), its status and two datetime fields to represent
+    when it was created and when it was updated last both in UTC timezone.
+    For synchronization between store replicas a task also has an identifier
+    that is the same in all replicas(uid) and the sequence number of its last
+    change in the store(seq), both unset(empty and 0) for tasks that were
+    never changed since synchronization support was added. The priority(0 to
+    9, higher is more urgent, 0 if not set) and the due datetime(None if not
+    set) are optional. blocked_by holds the ids of the tasks that must be done
+    before this one, empty if there are none.
+    """
+
+    tid = -1
+    description = ""
+    status = Status.UNKNOWN
+    created_at = datetime(1970, 1, 1, 0, 0, 0, tzinfo=timezone.utc)
+    updated_at = datetime(1970, 1, 1, 0, 0, 0, tzinfo=timezone.utc)
+    uid = ""
+    seq = 0
+    priority = 0
+    due: datetime | None = None
+    blocked_by: List[int] = []
+
+    def __lt__(self, other):
+        """
+        When sorting a list of tasks, order by status. For tasks of same
+        status, order by last updated time in descending order.
+        """
+        if self.status.value < other.status.value:
+            return True
+        if self.status.value > other.status.value:
+            return False
+        if self.updated_at < other.updated_at:
+            return False
+        return True
+
+    def to_dict(self) -> Dict[str, str]:
+        fmt_str = "%d %b %Y %H:%M:%S"
+        return {
+                "ID": str(self.tid),
+                "Description": self.description,
+                "Status": self.status.name.lower(),
+                "Updated@": self.updated_at.astimezone().strftime(fmt_str),
+                "Created@": self.created_at.astimezone().strftime(fmt_str),
+                "Priority": str(self.priority) if self.priority else "",
+                "Due": self.due.astimezone().strftime(fmt_str) if self.due else "",
+                "Blocked by": fmt_id_ranges(self.blocked_by)}
+
+    def to_record(self) -> Dict[str, Any]:
+        """
+        Returns the task as a record for the machine-readable output formats.
+        The datetimes are represented in ISO 8601 format in UTC.
+        """
+        return {
+                "id": self.tid,
+                "description": self.description,
+                "status": self.status.name.lower(),
+                "created_at": self.created_at.isoformat(),
+                "updated_at": self.updated_at.isoformat(),
+                "priority": self.priority,
+                "due": self.due.isoformat() if self.due else None}
+
+    @staticmethod
+    def column_names() -> List[str]:
+        return ["ID", "Description", "Status", "Updated@", "Created@"]
+
+
+class TaskEncoder(json.JSONEncoder):
+    """
+    A custom JSON encoder for Task instances. The status is represented by
+    lower case strings. The created_at and updated_at datetimes are represented
+    as timestamps. Task is represented as a dictionary with a special key value
+    pair of <"__class__" : "Task"> as a cue to the decoder (TaskDecoder). The
+    uid, seq, priority, due and blocked_by keys are present only if they are
+    set.
+    """
+    @override
+    def default(self, o):
+        if not isinstance(o, Task):
+            return super().default(o)
+        d = {
+                "__class__": "Task",
+                "tid": o.tid,
+                "description": o.description,
+                "status": o.status.name.lower(),
+                "created_at": str(o.created_at.timestamp()),
+                "updated_at": str(o.updated_at.timestamp())}
+        if o.uid:
+            d["uid"] = o.uid
+        if o.seq:
+            d["seq"] = o.seq
+        if o.priority:
+            d["priority"] = o.priority
+        if o.due:
+            d["due"] = str(o.due.timestamp())
+        if o.blocked_by:
+            d["blocked_by"] = list(o.blocked_by)
+        return d
+
+
+class TaskDecoder(json.JSONDecoder):
+    """
+    A custom JSON decoder for importing Task instances from JSON. This reverses
+    the convertions done in TaskEncoder to read dictionaries representing a
+    task to a Task instance.
+    """
+    def __init__(self):
+        json.JSONDecoder.__init__(self, object_hook=TaskDecoder.from_dict)
+
+    @staticmethod
+    def from_dict(d):
+        if d.get("__class__") != "Task":
+            return d
+        task = Task()
+        task.tid = int(d["tid"])
+        task.description = d["description"]
+        task.status = status_map[d["status"]]
+        task.created_at = datetime.fromtimestamp(
+                float(d["created_at"]), tz=timezone.utc)
+        task.updated_at = datetime.fromtimestamp(
+                float(d["updated_at"]), tz=timezone.utc)
+        if "uid" in d:
+            task.uid = d["uid"]
+        if "seq" in d:
+            task.seq = int(d["seq"])
+        if "priority" in d:
+            task.priority = int(d["priority"])
+        if "due" in d:
+            task.due = datetime.fromtimestamp(float(d["due"]), tz=timezone.utc)
+        if "blocked_by" in d:
+            task.blocked_by = list(d["blocked_by"])
+        return task
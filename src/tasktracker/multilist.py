@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+
+"""\
+Support for multiple named task lists. Each list is a separate JSON data file
+named <list-name>.json inside the data directory, the default list being
+"tasks" (tasks.json). Queries across many lists load and filter the list files
+in parallel using a pool of worker processes(or threads) and merge the results
+in the same order as a single list.
+"""
+
+import heapq
+import re
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple, cast
+
+from tasktracker.columnar import TaskColumns
+from tasktracker.model import Task, TaskDecoder
+from tasktracker.status import Status
+
+# A selected task sent back by a worker as (status value, negated last update
+# time in microseconds, serialized task), the first two being its sort key.
+_Selected = Tuple[int, int, Dict[str, Any]]
+
+# Name of the list used when no list is specified.
+default_list_name = "tasks"
+
+_list_name_re = re.compile(r"^[A-Za-z0-9_][A-Za-z0-9_.-]*$")
+
+
+def is_valid_list_name(name: str) -> bool:
+    """Returns True if the name can be used as a list name. List names are
+    made of letters, digits, "_", "-" and "." and cannot start with "." or
+    "-"."""
+    return _list_name_re.match(name) is not None
+
+
+def list_file(data_dir: Path, name: str) -> Path:
+    """Returns the path of the data file of the named list."""
+    return data_dir / "{}.json".format(name)
+
+
+def list_names(data_dir: Path) -> List[str]:
+    """Returns the sorted names of all the lists in the data directory."""
+    return sorted(path.stem for path in data_dir.glob("*.json")
+                  if path.is_file() and is_valid_list_name(path.stem))
+
+
+def _load_list(name: str, fname: str, status: Status) \
+        -> Tuple[str, List[_Selected] | None]:
+    """
+    Loads a list file and selects the tasks with the given status(all tasks
+    for UNKNOWN) sorted in the list order. This runs in the worker processes,
+    so it returns only the selected tasks as plain values(see _Selected)
+    instead of the whole columns or Task instances, the cost of sending them
+    back does not depend on the size of the file. The tasks are None if the
+    file cannot be loaded.
+    """
+    try:
+        with open(fname, "r") as fp:
+            columns = TaskColumns.load(fp)
+    except Exception:
+        return name, None
+    rows = columns.sort_rows(columns.rows(status))
+    return name, [(columns.status[row], -columns.updated_at[row], record)
+                  for row, record in zip(rows, columns.records(rows))]
+
+
+def _merge(results: List[Tuple[str, List[_Selected]]]) \
+        -> Iterator[Tuple[str, Task]]:
+    """
+    Merges the already sorted tasks of many lists into a single stream of
+    (list name, Task) pairs in the order defined by Task.__lt__. Task
+    instances are built only as the merged stream is consumed.
+    """
+    def keyed(idx: int, selected: List[_Selected]):
+        return ((status, updated, idx, pos)
+                for pos, (status, updated, _) in enumerate(selected))
+
+    streams = [keyed(idx, selected)
+               for idx, (_, selected) in enumerate(results)]
+    for _, _, idx, pos in heapq.merge(*streams):
+        name, selected = results[idx]
+        yield name, cast(Task, TaskDecoder.from_dict(selected[pos][2]))
+
+
+def query_lists(files: Dict[str, Path], status: Status = Status.UNKNOWN,
+                max_workers: int | None = None, use_threads: bool = False) \
+        -> Tuple[Iterator[Tuple[str, Task]], List[str]]:
+    """
+    Loads and filters the given list files in parallel and returns a tuple of
+    an iterator over the merged (list name, Task) pairs and the names of the
+    lists that could not be loaded.
+
+    Keyword arguments:
+    files       : dictionary with list names as keys and paths of the list
+                  data files as values.
+    status      : (Optional) only tasks with this status are selected, all
+                  tasks are selected by default.
+    max_workers : (Optional) size of the worker pool, by default decided by
+                  the executor.
+    use_threads : (Optional) use a thread pool instead of a process pool.
+                  Parsing JSON holds the GIL, so processes scale better with
+                  the number of lists while threads avoid the process startup
+                  and transfer costs for a few small lists.
+    """
+    if not files:
+        return iter(()), []
+    executor: Executor
+    if use_threads or len(files) == 1:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+    else:
+        executor = ProcessPoolExecutor(max_workers=max_workers)
+    names = list(files.keys())
+    with executor:
+        loaded = list(executor.map(_load_list, names,
+                                   [str(files[name]) for name in names],
+                                   [status] * len(names)))
+    failed = [name for name, selected in loaded if selected is None]
+    results = [(name, selected) for name, selected in loaded
+               if selected is not None]
+    return _merge(results), failed
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+
+"""\
+Writers for the machine-readable output formats of the list of tasks. The
+records are written to the output stream one at a time as they are produced
+so that none of the table rendering work(column widths, trimming, borders) is
+done for scripts consuming the output.
+"""
+
+import csv
+import json
+import os
+import sys
+from typing import Any, Dict, Iterable, List, TextIO
+
+# Supported values of the --format option of the list sub-command.
+output_formats = ["table", "json", "jsonl", "csv", "tsv"]
+
+# Format used when the output is not a terminal and no format was requested.
+pipe_format = "tsv"
+
+# Field names of each record in the machine-readable formats.
+record_fields = ["id", "description", "status", "created_at", "updated_at",
+                 "priority", "due"]
+
+
+def resolve_format(fmt: str | None, stream: TextIO) -> str:
+    """
+    Returns the output format to be used. If no format was requested(fmt is
+    None) the pretty table is used for terminals and pipe_format otherwise.
+    """
+    if fmt is not None:
+        return fmt
+    try:
+        is_tty = stream.isatty()
+    except (AttributeError, ValueError):
+        is_tty = False
+    return "table" if is_tty else pipe_format
+
+
+def _write_json(records: Iterable[Dict[str, Any]], stream: TextIO):
+    """Writes the records as a JSON array, one element at a time."""
+    stream.write("[")
+    separator = "\n"
+    for record in records:
+        stream.write(separator)
+        stream.write(json.dumps(record))
+        separator = ",\n"
+    stream.write("\n]\n" if separator != "\n" else "]\n")
+
+
+def _write_jsonl(records: Iterable[Dict[str, Any]], stream: TextIO):
+    """Writes the records as JSON lines, one record per line."""
+    for record in records:
+        stream.write(json.dumps(record))
+        stream.write("\n")
+
+
+def _write_delimited(records: Iterable[Dict[str, Any]], stream: TextIO,
+                     delimiter: str, fields: List[str]):
+    """Writes the records as CSV or TSV(if delimiter is a tab) with a header."""
+    writer = csv.DictWriter(stream, fieldnames=fields,
+                            delimiter=delimiter, lineterminator="\n")
+    writer.writeheader()
+    for record in records:
+        writer.writerow(record)
+
+
+def write_records(records: Iterable[Dict[str, Any]], fmt: str,
+                  stream: TextIO | None = None,
+                  fields: List[str] = record_fields):
+    """
+    Writes the records(dictionaries with the keys in fields) in the
+    given machine-readable format to the stream.
+
+    Keyword arguments:
+    records : an iterable of records, consumed lazily.
+    fmt     : one of output_formats other than "table".
+    stream  : the output stream (default stdout).
+    fields  : the field names of the records (default record_fields), they
+              are the columns of the CSV and TSV formats.
+    """
+    if stream is None:
+        stream = sys.stdout
+    try:
+        if fmt == "json":
+            _write_json(records, stream)
+        elif fmt == "jsonl":
+            _write_jsonl(records, stream)
+        elif fmt == "csv":
+            _write_delimited(records, stream, ",", fields)
+        elif fmt == "tsv":
+            _write_delimited(records, stream, "\t", fields)
+        else:
+            raise ValueError("unsupported output format {}".format(fmt))
+        stream.flush()
+    except BrokenPipeError:
+        _silence_broken_pipe(stream)
+
+
+def write_json(obj: Any, stream: TextIO | None = None):
+    """Writes a JSON document followed by a newline to the stream (default
+    stdout)."""
+    if stream is None:
+        stream = sys.stdout
+    try:
+        json.dump(obj, stream)
+        stream.write("\n")
+        stream.flush()
+    except BrokenPipeError:
+        _silence_broken_pipe(stream)
+
+
+def _silence_broken_pipe(stream: TextIO):
+    """Called when the consumer(like "head") has stopped reading, silences the
+    error python would report when flushing stdout at exit."""
+    if stream is sys.stdout:
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
@@ -0,0 +1,548 @@
+#!/usr/bin/env python
+
+"""\
+A small filter and sort expression language for listing tasks, compiled once
+into a query and planned against the columns of a store(see columnar.py).
+
+A filter expression combines comparisons with "and", "or", "not" and
+parentheses, like:
+
+    status=todo and updated>2026-09-01 and description~deploy
+
+A comparison is <field> <operator> <value> where field is one of the keys of
+query_fields and operator one of =, !=, <, <=, >, >= and ~(the description
+contains the value, ignoring case). Values with spaces are quoted with single
+or double quotes. Dates are in local time in one of the date_formats of
+selection.py and stand for the whole day(or minute, or second) they name, so
+"updated>2026-09-01" selects the tasks updated after that day and
+"due=2026-09-01" those due during that day. "due=none" selects the tasks
+without a due date, the other comparisons on due never select them.
+
+A sort expression is a comma separated list of fields, each optionally
+followed by "asc"(the default) or "desc", like "priority desc, due". Ties are
+kept in task id order.
+
+The planner chooses how the rows are read(the access path) among a full scan
+of the live rows, a scan of the status column, a scan of the ready column and
+a range of task ids, whichever is the cheapest for the top level "and" terms
+of the filter. The cost of an access path is the number of rows it scans(all
+the rows of the store for the column scans, which test one byte per row) plus
+the number of rows it reads for the filters. The other terms are then applied
+over the columns, cheapest first, before any Task instance is built.
+"""
+
+import re
+from datetime import datetime, timedelta
+from itertools import compress
+from operator import not_
+from sys import maxsize
+from typing import Any, Callable, List, Tuple
+
+from tasktracker.columnar import TaskColumns, to_micros
+from tasktracker.selection import date_formats
+from tasktracker.status import Status, get_status_from_str, get_status_names
+
+# Fields of the filter expressions and their type.
+query_fields = {"id": "int", "status": "status", "description": "text",
+                "created": "time", "updated": "time", "priority": "int",
+                "due": "time", "ready": "bool"}
+
+# Fields of the sort expressions.
+sort_fields = ["id", "status", "description", "created", "updated",
+               "priority", "due"]
+
+# Operators accepted for each type of field.
+_operators = {"int": ["=", "!=", "<", "<=", ">", ">="],
+              "status": ["=", "!="],
+              "text": ["=", "!=", "~"],
+              "time": ["=", "!=", "<", "<=", ">", ">="],
+              "bool": ["=", "!="]}
+
+# Length of the period named by a date in each of the date formats.
+_date_periods = [timedelta(days=1), timedelta(minutes=1), timedelta(seconds=1)]
+
+_bool_values = {"yes": True, "true": True, "no": False, "false": False}
+
+_token_re = re.compile(r'\s*(?:([()])|(<=|>=|!=|=|<|>|~)|"([^"]*)"|'
+                       r"'([^']*)'|([^\s()<>=!~\"']+))")
+
+# Values that can be written without quotes.
+_word_re = re.compile(r"[^\s()<>=!~\"']+")
+
+# Names of the columns of each field(id is the row itself).
+_columns = {"status": "status", "description": "descriptions",
+            "created": "created_at", "updated": "updated_at",
+            "priority": "priority", "due": "due", "ready": "ready"}
+
+RowTest = Callable[[int], bool]
+
+
+def _parse_time(value: str) -> Tuple[int, int]:
+    """Returns the start and the end(excluded) in microseconds since epoch of
+    the period named by a date."""
+    for fmt, period in zip(date_formats, _date_periods):
+        try:
+            start = datetime.strptime(value, fmt).astimezone()
+        except ValueError:
+            continue
+        return to_micros(start), to_micros(start + period)
+    raise ValueError("invalid date {!r}, expected one of the formats {}".
+                     format(value, ", ".join(date_formats)))
+
+
+class _Comparison:
+    """A comparison of a field with a value."""
+
+    def __init__(self, field: str, op: str, value: str) -> None:
+        if field not in query_fields:
+            raise ValueError("unknown field {!r}, expected one of {}".
+                             format(field, ", ".join(query_fields)))
+        ftype = query_fields[field]
+        if op not in _operators[ftype]:
+            raise ValueError("operator {} cannot be used with {}".
+                             format(op, field))
+        self.field = field
+        self.op = op
+        self.text = value
+        self.value: Any = value
+        if ftype == "int":
+            try:
+                self.value = int(value)
+            except ValueError:
+                raise ValueError("invalid {} {!r}".format(field, value))
+        elif ftype == "status":
+            status = get_status_from_str(value)
+            if status is None:
+                raise ValueError("invalid status {!r}, expected one of {}".
+                                 format(value, ", ".join(get_status_names())))
+            self.value = status.value
+        elif ftype == "bool":
+            if value.lower() not in _bool_values:
+                raise ValueError("invalid {} {!r}, expected yes or no".
+                                 format(field, value))
+            self.value = _bool_values[value.lower()]
+        elif ftype == "time":
+            if value.lower() == "none":
+                if field != "due" or op not in ("=", "!="):
+                    raise ValueError("{} {} none is not supported".
+                                     format(field, op))
+                self.value = None
+            else:
+                self.value = _parse_time(value)
+        elif op == "~":
+            self.value = value.casefold()
+
+    def __str__(self) -> str:
+        text = self.text
+        if not _word_re.fullmatch(text) or \
+                text.lower() in ("and", "or", "not"):
+            text = '"{}"'.format(text)
+        return "{} {} {}".format(self.field, self.op, text)
+
+    # Relative cost of evaluating the comparison for one row.
+    @property
+    def cost(self) -> int:
+        return 2 if self.field == "description" else 1
+
+    def conjuncts(self) -> List["_Comparison"]:
+        return [self]
+
+    def bind(self, columns: TaskColumns) -> RowTest:
+        """Returns a function telling whether a row matches, reading the
+        columns directly."""
+        op = self.op
+        if self.field == "id":
+            column: Any = None
+        else:
+            column = getattr(columns, _columns[self.field])
+        if query_fields[self.field] == "time":
+            if self.value is None:
+                # Rows without a due date have 0 in the due column.
+                return column.__getitem__ if op == "!=" else \
+                    lambda row: not column[row]
+            start, end = self.value
+            test = {"=": lambda v: start <= v < end,
+                    "!=": lambda v: not start <= v < end,
+                    "<": start.__gt__, "<=": end.__gt__,
+                    ">": end.__le__, ">=": start.__le__}[op]
+            if self.field == "due":
+                return lambda row: column[row] != 0 and test(column[row])
+            return lambda row: test(column[row])
+        value = self.value
+        if op == "~":
+            return lambda row: value in column[row].casefold()
+        if query_fields[self.field] == "bool":
+            return (lambda row: bool(column[row]) == value) if op == "=" \
+                else (lambda row: bool(column[row]) != value)
+        test = {"=": value.__eq__, "!=": value.__ne__, "<": value.__gt__,
+                "<=": value.__ge__, ">": value.__lt__,
+                ">=": value.__le__}[op]
+        if column is None:
+            return test
+        return lambda row: test(column[row])
+
+
+class _And:
+    def __init__(self, terms: List[Any]) -> None:
+        self.terms = terms
+
+    def __str__(self) -> str:
+        return " and ".join(_group(term, _Or) for term in self.terms)
+
+    @property
+    def cost(self) -> int:
+        return sum(term.cost for term in self.terms)
+
+    def conjuncts(self) -> List[Any]:
+        return [conjunct for term in self.terms
+                for conjunct in term.conjuncts()]
+
+    def bind(self, columns: TaskColumns) -> RowTest:
+        tests = [term.bind(columns) for term in self.terms]
+        return lambda row: all(test(row) for test in tests)
+
+
+class _Or(_And):
+    def __str__(self) -> str:
+        return " or ".join(str(term) for term in self.terms)
+
+    def conjuncts(self) -> List[Any]:
+        return [self]
+
+    def bind(self, columns: TaskColumns) -> RowTest:
+        tests = [term.bind(columns) for term in self.terms]
+        return lambda row: any(test(row) for test in tests)
+
+
+class _Not:
+    def __init__(self, term: Any) -> None:
+        self.term = term
+
+    def __str__(self) -> str:
+        return "not " + _group(self.term, (_And, _Or))
+
+    @property
+    def cost(self) -> int:
+        return self.term.cost
+
+    def conjuncts(self) -> List[Any]:
+        return [self]
+
+    def bind(self, columns: TaskColumns) -> RowTest:
+        test = self.term.bind(columns)
+        return lambda row: not test(row)
+
+
+def _group(term: Any, types: Any) -> str:
+    """Returns the text of a term, in parentheses if it is of the given
+    types."""
+    return "({})".format(term) if isinstance(term, types) else str(term)
+
+
+class _Parser:
+    """Recursive descent parser of the filter expressions:
+
+    expression := term ("or" term)*
+    term       := factor ("and" factor)*
+    factor     := "not" factor | "(" expression ")" | field operator value
+    """
+
+    def __init__(self, text: str) -> None:
+        # Tokens as (kind, text) with kind one of "(", "op", "word" and
+        # "quoted"(words that are never keywords).
+        self.tokens: List[Tuple[str, str]] = []
+        pos = 0
+        text = text.strip()
+        while pos < len(text):
+            match = _token_re.match(text, pos)
+            if match is None:
+                raise ValueError("unexpected {!r} at offset {}".
+                                 format(text[pos:].strip()[:10], pos))
+            paren, op, dquoted, squoted, word = match.groups()
+            if paren:
+                self.tokens.append(("(", paren))
+            elif op:
+                self.tokens.append(("op", op))
+            elif word is not None:
+                self.tokens.append(("word", word))
+            else:
+                self.tokens.append(("quoted", dquoted if dquoted is not None
+                                    else squoted))
+            pos = match.end()
+        self.pos = 0
+
+    def _peek(self) -> Tuple[str, str] | None:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _keyword(self, keyword: str) -> bool:
+        token = self._peek()
+        if token and token[0] == "word" and token[1].lower() == keyword:
+            self.pos += 1
+            return True
+        return False
+
+    def _next(self, expected: str) -> Tuple[str, str]:
+        token = self._peek()
+        if token is None:
+            raise ValueError("expected {} at the end".format(expected))
+        self.pos += 1
+        return token
+
+    def parse(self) -> Any:
+        expression = self._expression()
+        token = self._peek()
+        if token is not None:
+            raise ValueError("unexpected {!r}".format(token[1]))
+        return expression
+
+    def _expression(self) -> Any:
+        terms = [self._term()]
+        while self._keyword("or"):
+            terms.append(self._term())
+        return terms[0] if len(terms) == 1 else _Or(terms)
+
+    def _term(self) -> Any:
+        factors = [self._factor()]
+        while self._keyword("and"):
+            factors.append(self._factor())
+        return factors[0] if len(factors) == 1 else _And(factors)
+
+    def _factor(self) -> Any:
+        if self._keyword("not"):
+            return _Not(self._factor())
+        kind, text = self._next("a comparison")
+        if kind == "(" and text == "(":
+            expression = self._expression()
+            if self._next("')'") != ("(", ")"):
+                raise ValueError("expected ')'")
+            return expression
+        if kind != "word":
+            raise ValueError("expected a field name instead of {!r}".
+                             format(text))
+        field = text.lower()
+        kind, op = self._next("an operator after " + field)
+        if kind != "op":
+            raise ValueError("expected an operator after {} instead of {!r}".
+                             format(field, op))
+        kind, value = self._next("a value after {} {}".format(field, op))
+        if kind not in ("word", "quoted"):
+            raise ValueError("expected a value after {} {} instead of {!r}".
+                             format(field, op, value))
+        return _Comparison(field, op, value)
+
+
+def _sort_key(columns: TaskColumns, field: str) -> Callable[[int], Any]:
+    if field == "id":
+        return int
+    if field == "description":
+        descriptions = columns.descriptions
+        return lambda row: descriptions[row].casefold()
+    if field == "due":
+        # Tasks without a due date sort as the latest.
+        due = columns.due
+        return lambda row: due[row] or maxsize
+    return getattr(columns, _columns[field]).__getitem__
+
+
+class _Access:
+    """An access path: how the candidate rows are read from the columns."""
+
+    def __init__(self, name: str, scanned: int, estimate: int,
+                 read: Callable[[], List[int]], used: List[Any]) -> None:
+        self.name = name
+        # Number of rows examined: all the rows of the store for the scans of
+        # the byte columns, all the rows of the range for an id range.
+        self.scanned = scanned
+        # Number of rows read for the filters(at most, for an id range).
+        self.estimate = estimate
+        self.read = read
+        # Terms of the filter answered by the access path.
+        self.used = used
+
+    def __str__(self) -> str:
+        terms = " and ".join(str(term) for term in self.used)
+        return "{}{}".format(self.name, ": " + terms if terms else "")
+
+    @property
+    def cost(self) -> int:
+        return self.scanned + self.estimate
+
+
+class Plan:
+    """
+    The plan of a query over the columns of a store, see Query.plan(). After
+    rows() is called, examined holds the number of rows examined by the
+    access path, read the number of rows it read and each filter step the
+    number of rows left after it.
+    """
+
+    def __init__(self, columns: TaskColumns, access: _Access,
+                 candidates: List[_Access], filters: List[Any],
+                 sort: List[Tuple[str, bool]]) -> None:
+        self.columns = columns
+        self.access = access
+        self.candidates = candidates
+        self.filters = filters
+        self.sort = sort
+        self.examined = 0
+        self.read = 0
+        self.counts: List[int] = []
+
+    def rows(self) -> List[int]:
+        """Returns the matching rows in the requested order."""
+        columns = self.columns
+        rows = self.access.read()
+        self.examined = self.access.scanned
+        self.read = len(rows)
+        self.counts = []
+        for term in self.filters:
+            test = term.bind(columns)
+            rows = [row for row in rows if test(row)]
+            self.counts.append(len(rows))
+        # All the access paths read the rows in task id order.
+        if not self.sort:
+            columns.sort_rows(rows)
+        elif self.sort == [("id", True)]:
+            rows.reverse()
+        elif self.sort != [("id", False)]:
+            for field, descending in reversed(self.sort):
+                rows.sort(key=_sort_key(columns, field), reverse=descending)
+        return rows
+
+    def explain(self, returned: int | None = None) -> List[str]:
+        """Returns the lines describing the plan and the number of rows of
+        each step of its last execution. returned is the number of rows
+        actually returned, if they were limited."""
+        lines = ["Query plan:"]
+        step = 1
+        lines.append("  {}. access {} ({} rows scanned, {} read)".format(
+            step, self.access, self.examined, self.read))
+        count = self.read
+        for term, left in zip(self.filters, self.counts):
+            step += 1
+            lines.append("  {}. filter {} ({} -> {} rows)".format(
+                step, term, count, left))
+            count = left
+        step += 1
+        if not self.sort:
+            lines.append("  {}. sort by status, updated desc".format(step))
+        elif self.sort == [("id", False)]:
+            lines.append("  {}. sort by id (rows already in id order)".
+                         format(step))
+        else:
+            lines.append("  {}. sort by {}".format(step, ", ".join(
+                field + (" desc" if descending else "")
+                for field, descending in self.sort)))
+        if returned is not None and returned < count:
+            step += 1
+            lines.append("  {}. limit {}".format(step, returned))
+            count = returned
+        lines.append("Access paths considered: {}".format(", ".join(
+            "{} cost {}".format(candidate.name, candidate.cost)
+            for candidate in self.candidates)))
+        lines.append("Rows examined: {}, rows returned: {}".format(
+            self.examined, count))
+        return lines
+
+
+class Query:
+    """
+    A compiled filter and sort expression, see parse_query(). It does not
+    depend on a store and is planned against the columns of a store each time
+    it runs.
+    """
+
+    def __init__(self, where: Any = None,
+                 sort: List[Tuple[str, bool]] | None = None) -> None:
+        self.where = where
+        # Sort keys as (field, descending).
+        self.sort = sort or []
+
+    def __str__(self) -> str:
+        return str(self.where) if self.where is not None else ""
+
+    def plan(self, columns: TaskColumns, status: Status = Status.UNKNOWN,
+             ready: bool = False) -> Plan:
+        """
+        Returns the cheapest plan of the query over the given columns. The
+        status and ready arguments(of list) are added to the filter.
+        """
+        conjuncts = self.where.conjuncts() if self.where is not None else []
+        if status != Status.UNKNOWN:
+            conjuncts.append(_Comparison("status", "=", status.name.lower()))
+        if ready:
+            conjuncts.append(_Comparison("ready", "=", "yes"))
+
+        size = len(columns.tombstones)
+        # Row 0 never holds a task.
+        scanned = max(size - 1, 0)
+        candidates: List[_Access] = []
+        low, high = 1, size - 1
+        ids = []
+        for term in conjuncts:
+            if not isinstance(term, _Comparison):
+                continue
+            if term.field == "status" and term.op == "=":
+                value = term.value
+                candidates.append(_Access(
+                    "status column", scanned, columns.status.count(value),
+                    lambda value=value: list(compress(
+                        range(size), map(value.__eq__, columns.status))),
+                    [term]))
+            elif term.field == "ready" and term.op == "=" and term.value:
+                candidates.append(_Access(
+                    "ready column", scanned, columns.ready.count(1),
+                    lambda: list(compress(range(size), columns.ready)),
+                    [term]))
+            elif term.field == "id" and term.op != "!=":
+                ids.append(term)
+                if term.op in ("=", ">="):
+                    low = max(low, term.value)
+                if term.op in ("=", "<="):
+                    high = min(high, term.value)
+                if term.op == ">":
+                    low = max(low, term.value + 1)
+                if term.op == "<":
+                    high = min(high, term.value - 1)
+        if ids:
+            candidates.append(_Access(
+                "id range", max(0, high - low + 1), max(0, high - low + 1),
+                lambda: [row for row in range(low, high + 1)
+                         if not columns.tombstones[row]], ids))
+        candidates.append(_Access(
+            "full scan", scanned, len(columns),
+            lambda: list(compress(range(size), map(not_, columns.tombstones))),
+            []))
+        # The first of the cheapest ones, full scan is the last resort.
+        access = min(candidates, key=lambda candidate: candidate.cost)
+        filters = sorted((term for term in conjuncts
+                          if not any(term is used for used in access.used)),
+                         key=lambda term: term.cost)
+        return Plan(columns, access, candidates, filters, self.sort)
+
+
+def parse_sort(text: str) -> List[Tuple[str, bool]]:
+    """Parses a sort expression into a list of (field, descending). Raises
+    ValueError if it is invalid."""
+    keys = []
+    for part in text.split(","):
+        words = part.split()
+        if not words or len(words) > 2 or words[0].lower() not in sort_fields:
+            raise ValueError("invalid sort key {!r}, expected one of {}"
+                             " optionally followed by asc or desc".
+                             format(part.strip(), ", ".join(sort_fields)))
+        order = words[1].lower() if len(words) == 2 else "asc"
+        if order not in ("asc", "desc"):
+            raise ValueError("invalid sort order {!r}, expected asc or desc".
+                             format(words[1]))
+        keys.append((words[0].lower(), order == "desc"))
+    return keys
+
+
+def parse_query(where: str | None = None, sort: str | None = None) -> Query:
+    """
+    Compiles a filter expression and a sort expression(both optional) into a
+    Query. Raises ValueError with the reason if one of them is invalid.
+    """
+    expression = _Parser(where).parse() if where is not None else None
+    return Query(expression, parse_sort(sort) if sort is not None else None)
@@ -0,0 +1,309 @@
+#!/usr/bin/env python
+
+"""\
+Verification and salvage of damaged data files. A data file that cannot be
+loaded at once(see TaskColumns.load) is read one record at a time instead: a
+record is the header(the bookkeeping entries) or a serialized task.
+
+With the JSON lines layouts(see formats.py) every line is a record. With
+version 3 a damaged line is found by its checksum alone, so verify() does not
+even parse the JSON of the tasks. When the number of task lines differs from
+the one in the header(like when the end of the file is missing), a damaged
+record without text is reported at the end of the file.
+
+With version 1 the records are found by scanning the text for the start of
+the tasks('"<tid>": {"__class__": "Task"', with any whitespace so that
+pretty-printed or hand-edited files are read too) and decoding each one on
+its own, so a damaged task does not hide the ones after it.
+
+salvage() loads the intact records in one pass, appends the damaged ones
+verbatim to a quarantine file next to the data file(<data file>.quarantine)
+so that nothing is lost, rebuilds the "next_tid" and "seq" counters from the
+recovered tasks and replaces the data file atomically with the recovered
+store in the default layout version(with checksums). A damaged file of which
+no task could be recovered is left unchanged.
+"""
+
+import json
+import os
+import re
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, TextIO, Tuple
+
+from tasktracker.columnar import TaskColumns
+from tasktracker.formats import decode_line, default_version, detect_version
+from tasktracker.formats import has_checksums, next_generation, versions
+from tasktracker.model import TaskDecoder
+
+# Start of a serialized task in the version 1 layout, group 1 is its key.
+_task_re = re.compile(r'"(\d+)"\s*:\s*(?=\{\s*"__class__"\s*:\s*"Task")')
+
+# Start of a data file with the version 1 layout: the first key is a
+# bookkeeping entry or the key of a task, while the header of the JSON lines
+# layouts starts with the "format" entry.
+_v1_start_re = re.compile(r'\s*\{\s*"(?:\d+|next_tid|generation|write_id|seq|'
+                          r'replica|replica_home|peers|acks|deleted|'
+                          r'next_heap)"\s*:')
+
+# Number of characters read to recognize the start of a version 1 file.
+_start_size = 256
+
+# A record of a data file as (location, raw text, decoded value or None if it
+# is damaged, reason why it is damaged or None).
+Record = Tuple[str, str, Any, str | None]
+
+
+def quarantine_file(fname: str) -> str:
+    """Returns the path of the quarantine file of a data file."""
+    return fname + ".quarantine"
+
+
+def _version(fp: TextIO) -> int:
+    """Returns the layout version of a data file even if its header is
+    damaged: version 1 files are recognized by their first key(and are
+    written on a single line unless edited), the JSON lines layouts have a
+    task per line. The file is positioned back at its start."""
+    version = detect_version(fp)
+    if version in versions and version > 1:
+        return version
+    start = fp.read(_start_size)
+    fp.seek(0)
+    if _v1_start_re.match(start):
+        return 1
+    fp.readline()
+    second = fp.readline()
+    fp.seek(0)
+    if not second.strip():
+        return 1
+    try:
+        decode_line(second, 3)
+    except ValueError:
+        return 2
+    return 3
+
+
+def _check_task(value: Any, key: str | None = None) -> str | None:
+    """Returns why a decoded record is not a valid serialized task, None if it
+    is one. key is the key of the task in the version 1 layout."""
+    if not isinstance(value, dict) or value.get("__class__") != "Task":
+        return "not a task"
+    try:
+        task = TaskDecoder.from_dict(value)
+    except (KeyError, TypeError, ValueError, OverflowError, OSError):
+        return "invalid task fields"
+    if task.tid < 1 or (key is not None and key != str(task.tid)):
+        return "invalid task id"
+    if not isinstance(task.description, str) or \
+            not all(isinstance(tid, int) for tid in task.blocked_by):
+        return "invalid task fields"
+    return None
+
+
+def _line_records(fp: TextIO, version: int, parse: bool) \
+        -> Iterator[Record]:
+    """Yields the records of a data file with a JSON lines layout, the header
+    first. Without parse, only the checksums are checked(when there are
+    some) and the records of the tasks are not decoded."""
+    records = None
+    count = 0
+    number = 0
+    for number, line in enumerate(fp, 1):
+        if number > 1 and not line.strip():
+            continue
+        count += number > 1
+        location = "line {}".format(number)
+        try:
+            text = decode_line(line, version)
+            if not parse and number > 1:
+                yield location, line, None, None
+                continue
+            value = json.loads(text)
+        except ValueError as e:
+            reason = str(e) if has_checksums(version) else "invalid JSON"
+            yield location, line, None, reason
+            continue
+        if number == 1:
+            if isinstance(value, dict):
+                records = value.pop("records", None)
+            yield location, line, value, \
+                None if isinstance(value, dict) else "invalid header"
+        else:
+            yield location, line, value, _check_task(value)
+    if records is not None and records != count:
+        yield "line {}".format(number + 1), "", None, \
+            "{} task records instead of {}".format(count, records)
+
+
+def _object_records(text: str) -> Iterator[Record]:
+    """Yields the records of a data file with the version 1 layout, the
+    header first(the bookkeeping entries before the first task). The text
+    between the records must only hold the separators, anything else is
+    yielded as a damaged record."""
+    decoder = json.JSONDecoder()
+    starts = list(_task_re.finditer(text))
+    end = starts[0].start() if starts else len(text)
+    head = text[:end].rstrip()
+    try:
+        if starts:
+            if not head.endswith(","):
+                raise ValueError
+            head = head[:-1] + "}"
+        value = json.loads(head)
+        reason = None if isinstance(value, dict) else "invalid header"
+    except ValueError:
+        value, reason = None, "invalid JSON"
+    yield "offset 0", text[:end], value, reason
+    for idx, match in enumerate(starts):
+        location = "offset {}".format(match.start())
+        following = starts[idx + 1].start() if idx + 1 < len(starts) \
+            else len(text)
+        try:
+            value, pos = decoder.raw_decode(text, match.end())
+        except ValueError:
+            pos = len(text)
+        if pos > following:
+            # Not terminated before the start of the next task.
+            yield location, text[match.start():following], None, \
+                "invalid JSON"
+            continue
+        yield location, text[match.start():pos], value, \
+            _check_task(value, match.group(1))
+        rest = text[pos:following].strip()
+        separator = "," if idx + 1 < len(starts) else "}"
+        if rest != separator:
+            yield "offset {}".format(pos), text[pos:following], None, \
+                "unexpected data"
+
+
+def _records(fp: TextIO, version: int, parse: bool = True) \
+        -> Iterator[Record]:
+    """Returns an iterator over the records of an open data file, the header
+    first."""
+    if version > 1:
+        return _line_records(fp, version, parse)
+    return _object_records(fp.read())
+
+
+def verify(fname: str) -> Dict[str, Any]:
+    """
+    Checks every record of a data file. Returns a dictionary with the layout
+    "version", the number of "records" checked and the list of the "damaged"
+    ones as (location, reason) pairs.
+
+    With the version 3 layout only the checksums are checked, which is much
+    faster than parsing. OSError is raised if the file cannot be read.
+    """
+    damaged = []
+    count = 0
+    with open(fname, "r") as fp:
+        version = _version(fp)
+        records = _records(fp, version, parse=not has_checksums(version))
+        for location, _, _, reason in records:
+            count += 1
+            if reason is not None:
+                damaged.append((location, reason))
+    return {"version": version, "records": count, "damaged": damaged}
+
+
+def _counter(meta: Dict[str, Any], key: str, default: int) -> int:
+    """Returns a counter of the bookkeeping entries, default if it is missing
+    or damaged."""
+    value = meta.get(key)
+    return value if isinstance(value, int) else default
+
+
+def salvage(fname: str) -> Dict[str, Any]:
+    """
+    Loads the intact records of a damaged data file in one pass, quarantines
+    the damaged ones and replaces the data file with the recovered store.
+    When two records have the same task id, the one changed last is kept and
+    the other is quarantined.
+
+    Returns a dictionary with the layout "version" of the damaged file, the
+    number of "recovered" tasks, the list of the "quarantined" records as
+    (location, reason) pairs, whether the "header" was intact, the rebuilt
+    "next_tid" and whether the data file was "written". Nothing is written if no record is damaged and the counters
+    are consistent with the tasks. OSError is raised if a file cannot be read
+    or written, ValueError if records are damaged and no task could be
+    recovered(so that an unrecognized file is not replaced with an empty
+    store), the data file is unchanged then.
+    """
+    meta: Dict[str, Any] = {}
+    tasks: Dict[int, Tuple[str, str, Dict[str, Any]]] = {}
+    quarantined: List[Tuple[str, str, str]] = []
+    with open(fname, "r") as fp:
+        version = _version(fp)
+        records = _records(fp, version)
+        location, text, value, reason = next(records)
+        header_intact = reason is None
+        if header_intact:
+            meta = dict(value)
+        else:
+            quarantined.append((location, reason, text))
+        for location, text, value, reason in records:
+            if reason is not None:
+                quarantined.append((location, reason, text))
+                continue
+            tid = int(value["tid"])
+            if tid in tasks:
+                # Keep the task with the latest change.
+                other = tasks[tid]
+                if (int(value.get("seq", 0)), float(value["updated_at"])) < \
+                        (int(other[2].get("seq", 0)),
+                         float(other[2]["updated_at"])):
+                    quarantined.append((location, "duplicate task id", text))
+                    continue
+                quarantined.append((other[0], "duplicate task id", other[1]))
+            tasks[tid] = (location, text, value)
+
+    counters = (meta.get("next_tid"), meta.get("seq"))
+    parsed = [value for _, _, value in tasks.values()]
+    meta["next_tid"] = max([_counter(meta, "next_tid", 1)] +
+                           [tid + 1 for tid in tasks])
+    seq = max([int(d.get("seq", 0)) for d in parsed], default=0)
+    if seq or "seq" in meta:
+        meta["seq"] = max(_counter(meta, "seq", 0), seq)
+    result = {"version": version, "recovered": len(tasks),
+              "quarantined": [(location, reason)
+                              for location, reason, _ in quarantined],
+              "header": header_intact, "next_tid": meta["next_tid"],
+              "written": False}
+    if not quarantined and counters == (meta["next_tid"], meta.get("seq")):
+        return result
+    if not tasks:
+        raise ValueError("no task could be recovered from {} damaged "
+                         "records".format(len(quarantined)))
+    meta.pop("format", None)
+    meta.pop("version", None)
+    # The heap may refer to task ids that are gone, it is rebuilt on use.
+    meta.pop("next_heap", None)
+
+    now = datetime.now(timezone.utc).isoformat()
+    if quarantined:
+        with open(quarantine_file(fname), "a") as fp:
+            for location, reason, text in quarantined:
+                fp.write(json.dumps({"file": fname, "location": location,
+                                     "reason": reason, "salvaged_at": now,
+                                     "text": text}) + "\n")
+
+    columns = TaskColumns.build(meta, parsed)
+    columns.meta["version"] = default_version
+    # A lost generation restarts from the time, so that it differs from the
+    # one readers saw last(see watch.py).
+    columns.meta["generation"] = _counter(columns.meta, "generation",
+                                          int(time.time()))
+    next_generation(columns.meta)
+    salvaged_fname = fname + ".salvaged"
+    try:
+        with open(salvaged_fname, "w") as fp:
+            columns.dump(fp)
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(salvaged_fname, fname)
+    except BaseException:
+        if os.path.exists(salvaged_fname):
+            os.remove(salvaged_fname)
+        raise
+    result["written"] = True
+    return result
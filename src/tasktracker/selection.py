@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+
+"""\
+Utilities to select a set of tasks, either by a list of task ids and task id
+ranges like "1-500,612" or by filters on the task fields.
+"""
+
+from datetime import datetime
+from itertools import chain
+from typing import Iterable, Iterator, List, Tuple
+
+from tasktracker.columnar import TaskColumns, to_micros
+from tasktracker.status import Status
+
+# Accepted formats of the dates passed to the filter options.
+date_formats = ["%Y-%m-%d", "%Y-%m-%dT%H:%M", "%Y-%m-%dT%H:%M:%S"]
+
+
+def _subtract(ids: range, other: range) -> List[range]:
+    """Returns the parts of a range of task ids that are not in the other
+    range(both with a step of 1)."""
+    if other.stop <= ids.start or ids.stop <= other.start:
+        return [ids]
+    return [part for part in (range(ids.start, other.start),
+                              range(other.stop, ids.stop)) if part]
+
+
+class IdRanges:
+    """
+    IdRanges holds the task ids of a specification like "1-500,612" as
+    disjoint ranges in the given order instead of expanding them, so that a
+    huge range like "1-999999999" costs no memory. It behaves as a read only
+    sequence of the task ids in the given order without duplicates.
+    """
+
+    def __init__(self, ranges: Iterable[range] = ()) -> None:
+        self.ranges: List[range] = []
+        for ids in ranges:
+            # Drop the task ids already given by the previous ranges.
+            parts = [ids]
+            for other in self.ranges:
+                parts = [part for ids in parts
+                         for part in _subtract(ids, other)]
+            self.ranges.extend(part for part in parts if part)
+
+    def __len__(self) -> int:
+        return sum(len(ids) for ids in self.ranges)
+
+    def __iter__(self) -> Iterator[int]:
+        return chain.from_iterable(self.ranges)
+
+    def __contains__(self, tid: int) -> bool:
+        return any(tid in ids for ids in self.ranges)
+
+    def __getitem__(self, index: int) -> int:
+        if index < 0:
+            index += len(self)
+        for ids in self.ranges:
+            if 0 <= index < len(ids):
+                return ids[index]
+            index -= len(ids)
+        raise IndexError("task id index out of range")
+
+    def __str__(self) -> str:
+        """Formats the task ids like fmt_id_ranges(), for example "1-3, 7"."""
+        return ", ".join(str(ids.start) if len(ids) == 1 else
+                         "{}-{}".format(ids.start, ids.stop - 1)
+                         for ids in sorted(self.ranges,
+                                           key=lambda ids: ids.start))
+
+    def without(self, tids: Iterable[int]) -> "IdRanges":
+        """Returns the task ids that are not in tids, in the same order."""
+        ranges = self.ranges
+        for tid in tids:
+            ranges = [part for ids in ranges
+                      for part in _subtract(ids, range(tid, tid + 1))]
+        result = IdRanges()
+        result.ranges = ranges
+        return result
+
+    def select_rows(self, columns: TaskColumns) -> Tuple[List[int],
+                                                         "IdRanges"]:
+        """
+        Returns the rows of the live tasks with the task ids in the given
+        order and the task ids that have no live task. Only the part of the
+        ranges that falls within the rows of the columns is visited, so the
+        cost is bounded by the size of the store and not by the size of the
+        ranges.
+        """
+        size = len(columns.tombstones)
+        tombstones = columns.tombstones
+        rows: List[int] = []
+        missing: List[range] = []
+        for ids in self.ranges:
+            start = None
+            for tid in range(ids.start, min(ids.stop, size)):
+                if tombstones[tid]:
+                    if start is None:
+                        start = tid
+                    continue
+                if start is not None:
+                    missing.append(range(start, tid))
+                    start = None
+                rows.append(tid)
+            stop = min(ids.stop, size)
+            if ids.stop > size:
+                # No rows at all beyond the end of the columns.
+                start = max(ids.start, size) if start is None else start
+                stop = ids.stop
+            if start is not None:
+                missing.append(range(start, stop))
+        result = IdRanges()
+        # Already disjoint, no need to subtract them from each other.
+        result.ranges = missing
+        return rows, result
+
+
+def parse_id_ranges(spec: str) -> IdRanges | None:
+    """
+    Parses a comma separated list of task ids and inclusive task id ranges
+    like "1-500,612" and returns the task ids in the given order without
+    duplicates(see IdRanges). None is returned if the specification is
+    invalid.
+    """
+    ranges: List[range] = []
+    for part in spec.split(","):
+        first, sep, last = part.strip().partition("-")
+        try:
+            low = int(first)
+            high = int(last) if sep else low
+        except ValueError:
+            return None
+        if low < 0 or high < low:
+            return None
+        ranges.append(range(low, high + 1))
+    return IdRanges(ranges)
+
+
+def parse_date(date_str: str) -> datetime | None:
+    """
+    Parses a date(and optionally a time) in local time in one of the
+    date_formats and returns it as a timezone aware datetime. None is returned
+    if the string is not in any of the accepted formats.
+    """
+    for fmt in date_formats:
+        try:
+            return datetime.strptime(date_str, fmt).astimezone()
+        except ValueError:
+            continue
+    return None
+
+
+class TaskFilter:
+    """
+    TaskFilter selects the tasks that match all of the given criteria. A
+    criterion that is not set(UNKNOWN status or None datetimes) matches every
+    task.
+
+    status         : the task must have this status.
+    updated_before : the task must have been last updated before this time.
+    updated_after  : the task must have been last updated at or after this time.
+    """
+
+    def __init__(self, status: Status = Status.UNKNOWN,
+                 updated_before: datetime | None = None,
+                 updated_after: datetime | None = None) -> None:
+        self.status = status
+        self.updated_before = updated_before
+        self.updated_after = updated_after
+
+    def select_rows(self, columns: TaskColumns) -> List[int]:
+        """Returns the rows of the columnar task engine that match all
+        criteria, comparing the columns directly without any Task
+        instances."""
+        rows = columns.rows(self.status)
+        updated_at = columns.updated_at
+        if self.updated_before is not None:
+            before = to_micros(self.updated_before)
+            rows = [row for row in rows if updated_at[row] < before]
+        if self.updated_after is not None:
+            after = to_micros(self.updated_after)
+            rows = [row for row in rows if updated_at[row] >= after]
+        return rows
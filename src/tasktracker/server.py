@@ -0,0 +1,370 @@
+#!/usr/bin/env python
+
+"""\
+A local HTTP API over a TaskStore, built on the standard library
+ThreadingHTTPServer. Requests are served by one thread each and share a
+single in-memory store, reads run concurrently while writes are exclusive
+(see RWLock). Every response carries an ETag derived from the generation of
+the store, so clients polling with If-None-Match get an empty 304 response
+as long as nothing changed.
+
+Endpoints (all bodies are JSON):
+GET    /tasks[?status=<status>]  list the tasks in list order
+GET    /tasks/<id>               get a task
+POST   /tasks                    add a task: {"description": "..."}
+PATCH  /tasks/<id>               update a task: {"description": "...",
+                                 "status": "..."}, both keys are optional
+DELETE /tasks/<id>               delete a task
+"""
+
+import json
+import threading
+from contextlib import contextmanager
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING, Any, Dict, Iterator, Tuple, cast
+from urllib.parse import parse_qs, urlsplit
+
+from tasktracker.actions import ActionDelete, ActionMark
+from tasktracker.status import Status, get_status_from_str
+from tasktracker.watch import FileWatcher, read_stamp
+
+if TYPE_CHECKING:
+    from tasktracker.tasks import TaskStore
+
+# The server only listens on the loopback interface.
+server_host = "127.0.0.1"
+default_port = 8765
+
+
+class RWLock:
+    """
+    A readers-writer lock: any number of readers or a single writer. Waiting
+    writers block new readers so that a steady stream of reads cannot starve
+    the writes.
+    """
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writing = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        """Context manager that holds the lock for reading."""
+        with self._cond:
+            while self._writing or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        """Context manager that holds the lock for writing."""
+        with self._cond:
+            self._waiting_writers += 1
+            while self._writing or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
+
+
+class TaskServer(ThreadingHTTPServer):
+    """
+    The HTTP server holding the shared TaskStore. Changes of the data file
+    made by other processes(like the CLI) are picked up before reads with a
+    stat() call(see FileWatcher).
+    """
+
+    daemon_threads = True
+
+    def __init__(self, store: "TaskStore", port: int = default_port,
+                 verbose: bool = False) -> None:
+        super().__init__((server_host, port), TaskRequestHandler)
+        self.store = store
+        self.verbose = verbose
+        self.lock = RWLock()
+        self.watcher = FileWatcher(store.file)
+        # Guards the state of the watcher, which changed() updates.
+        self._watch_lock = threading.Lock()
+        # Serialized list responses of the current generation keyed by the
+        # status filter.
+        self._cache: Dict[Status, bytes] = {}
+        self._cache_generation: str | None = None
+        self._cache_lock = threading.Lock()
+
+    def generation(self) -> str:
+        """Returns the generation of the store, incremented on each write,
+        with the id of that write(see formats.next_generation())."""
+        meta = self.store.columns().meta
+        return "{}.{}".format(meta.get("generation", 0),
+                              meta.get("write_id", ""))
+
+    def refresh(self):
+        """Reloads the store if the data file was written by another
+        process."""
+        with self._watch_lock:
+            if not self.watcher.changed():
+                return
+        with self.lock.write():
+            if self._stale() and not self.store.reload():
+                # Probably caught in the middle of a write, retry next time.
+                with self._watch_lock:
+                    self.watcher.signature = None
+                    self.watcher.stamp = None
+
+    def _stale(self) -> bool:
+        """Returns whether the data file holds another generation than the
+        loaded store, whatever the watcher saw. Must be called holding the
+        write lock."""
+        stamp = read_stamp(self.store.file)
+        meta = self.store.columns().meta
+        return stamp is not None and \
+            stamp != (meta.get("generation"), meta.get("write_id"))
+
+    def list_body(self, status: Status) -> Tuple[str, bytes]:
+        """Returns the generation and the JSON list of the tasks with the
+        status(all for UNKNOWN). Must be called holding the read lock."""
+        generation = self.generation()
+        with self._cache_lock:
+            if generation != self._cache_generation:
+                self._cache = {}
+                self._cache_generation = generation
+            body = self._cache.get(status)
+        if body is None:
+            records = [task.to_record() for task
+                       in self.store.iter_sorted_tasks(status)]
+            body = json.dumps(records).encode()
+            with self._cache_lock:
+                if generation == self._cache_generation:
+                    self._cache[status] = body
+        return generation, body
+
+    @contextmanager
+    def mutation(self) -> Iterator["TaskStore | None"]:
+        """Context manager that holds the write lock for a mutation of the
+        store. The store is reloaded first if the data file was written by
+        another process, so that the mutation does not overwrite those
+        changes. None is given instead of the store if the data file cannot
+        be reloaded(like while it is being written), the mutation must not be
+        done then."""
+        with self.lock.write():
+            # Compared with the loaded store rather than asked to the watcher:
+            # a read may have seen the change already and not reloaded yet.
+            if self._stale() and not self.store.reload():
+                # Retried by the next request, the reads too.
+                with self._watch_lock:
+                    self.watcher.signature = None
+                    self.watcher.stamp = None
+                yield None
+                return
+            yield self.store
+            # The data file was written by this process, not a change to be
+            # reloaded.
+            with self._watch_lock:
+                self.watcher.reset()
+
+
+class TaskRequestHandler(BaseHTTPRequestHandler):
+    """Handles the requests of the task API, see the module documentation."""
+
+    server: TaskServer
+    # Keep-alive connections, every response has a Content-Length.
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, code: int, body: bytes = b"", generation: str | None = None):
+        self.send_response(code)
+        if generation is not None:
+            self.send_header("ETag", '"{}"'.format(generation))
+        if body:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body and self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _send_json(self, code: int, obj: Any, generation: str | None = None):
+        self._send(code, json.dumps(obj).encode(), generation)
+
+    def _send_error(self, code: int, message: str):
+        self._send_json(code, {"error": message})
+
+    def _send_busy(self):
+        self._send_error(HTTPStatus.SERVICE_UNAVAILABLE,
+                         "the data file is being written, try again")
+
+    def _not_modified(self, generation: str) -> bool:
+        """Sends a 304 response and returns True if the client already has
+        the representation of this generation."""
+        etags = self.headers.get("If-None-Match")
+        if etags is None:
+            return False
+        etag = '"{}"'.format(generation)
+        if etag not in [tag.strip() for tag in etags.split(",")] and etags.strip() != "*":
+            return False
+        self._send(HTTPStatus.NOT_MODIFIED, generation=generation)
+        return True
+
+    def _route(self) -> Tuple[str, int | None, Dict[str, list[str]]] | None:
+        """Returns (collection, task id or None, query parameters) or None if
+        the path is not one of the endpoints."""
+        url = urlsplit(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        if not parts or parts[0] != "tasks" or len(parts) > 2:
+            return None
+        tid = None
+        if len(parts) == 2:
+            try:
+                tid = int(parts[1])
+            except ValueError:
+                return None
+        return parts[0], tid, parse_qs(url.query)
+
+    def _read_json(self) -> Dict[str, Any] | None:
+        """Reads the JSON object of the request body or sends a 400 response
+        and returns None."""
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            body = None
+        if not isinstance(body, dict):
+            self._send_error(HTTPStatus.BAD_REQUEST, "expected a JSON object")
+            return None
+        return body
+
+    def do_GET(self):
+        route = self._route()
+        if route is None:
+            self._send_error(HTTPStatus.NOT_FOUND, "no such endpoint")
+            return
+        _, tid, query = route
+        self.server.refresh()
+        with self.server.lock.read():
+            if tid is None:
+                status = Status.UNKNOWN
+                if "status" in query:
+                    _status = get_status_from_str(query["status"][0])
+                    if _status is None:
+                        self._send_error(HTTPStatus.BAD_REQUEST, "invalid status")
+                        return
+                    status = _status
+                generation = self.server.generation()
+                if self._not_modified(generation):
+                    return
+                generation, body = self.server.list_body(status)
+                self._send(HTTPStatus.OK, body, generation)
+                return
+            generation = self.server.generation()
+            task = self.server.store.columns().get(tid)
+            if task is None:
+                self._send_error(HTTPStatus.NOT_FOUND, "no such task")
+                return
+            if self._not_modified(generation):
+                return
+            self._send_json(HTTPStatus.OK, task.to_record(), generation)
+
+    do_HEAD = do_GET
+
+    def do_POST(self):
+        route = self._route()
+        if route is None or route[1] is not None:
+            self._send_error(HTTPStatus.NOT_FOUND, "no such endpoint")
+            return
+        body = self._read_json()
+        if body is None:
+            return
+        description = body.get("description")
+        if not isinstance(description, str) or not description:
+            self._send_error(HTTPStatus.BAD_REQUEST, "invalid description")
+            return
+        with self.server.mutation() as store:
+            if store is None:
+                self._send_busy()
+                return
+            # A plain value, never parsed as command line arguments.
+            task = store.add_task(description)
+            generation = self.server.generation()
+        self._send_json(HTTPStatus.CREATED, task.to_record(), generation)
+
+    def do_PATCH(self):
+        route = self._route()
+        if route is None or route[1] is None:
+            self._send_error(HTTPStatus.NOT_FOUND, "no such endpoint")
+            return
+        tid = route[1]
+        body = self._read_json()
+        if body is None:
+            return
+        # The description is a plain value, never parsed as command line
+        # arguments.
+        description = body.get("description")
+        status_name = body.get("status")
+        status = get_status_from_str(status_name) \
+            if isinstance(status_name, str) else None
+        if (description is None and status_name is None) or \
+                (description is not None and
+                 (not isinstance(description, str) or not description)) or \
+                (status_name is not None and status is None):
+            self._send_error(HTTPStatus.BAD_REQUEST, "invalid description or status")
+            return
+        with self.server.mutation() as store:
+            if store is None:
+                self._send_busy()
+                return
+            if tid not in store.columns():
+                self._send_error(HTTPStatus.NOT_FOUND, "no such task")
+                return
+            with store.transaction():
+                if description is not None:
+                    store.update_task(tid, description)
+                if status is not None:
+                    store.mark(ActionMark([str(tid), cast(str, status_name)]))
+            task = store.columns().get(tid)
+            generation = self.server.generation()
+        self._send_json(HTTPStatus.OK, task.to_record() if task else None, generation)
+
+    def do_DELETE(self):
+        route = self._route()
+        if route is None or route[1] is None:
+            self._send_error(HTTPStatus.NOT_FOUND, "no such endpoint")
+            return
+        tid = route[1]
+        with self.server.mutation() as store:
+            if store is None:
+                self._send_busy()
+                return
+            if tid not in store.columns():
+                self._send_error(HTTPStatus.NOT_FOUND, "no such task")
+                return
+            store.delete(ActionDelete([str(tid)]))
+            generation = self.server.generation()
+        self._send(HTTPStatus.NO_CONTENT, generation=generation)
+
+
+def serve(store: "TaskStore", port: int = default_port, verbose: bool = False):
+    """Serves the task API over the store on localhost until interrupted."""
+    with TaskServer(store, port, verbose) as server:
+        print("Serving the task API on http://{}:{}/tasks, press Ctrl+C to"
+              " stop".format(server_host, server.server_address[1]))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+
+"""\
+Read-only streaming access to the JSON data files. The data file is read in
+chunks and tokenized incrementally: each top-level entry(a bookkeeping value
+or a serialized task) is decoded on its own with JSONDecoder.raw_decode() and
+dropped from the buffer once consumed. So the memory used does not depend on
+the size of the file but only on the chunk size and the size of the largest
+entry, unlike json.load() which holds the whole document and every decoded
+task at once.
+
+Data files with the JSON lines layouts(versions 2 and 3, see formats.py) are
+simply read one line at a time.
+"""
+
+import heapq
+import json
+import re
+from typing import Any, Callable, Iterable, Iterator, List, TextIO, Tuple
+
+from tasktracker.formats import decode_line, detect_version
+from tasktracker.model import Task, TaskDecoder
+from tasktracker.status import Status
+
+# Number of characters read from the file at a time.
+chunk_size = 1 << 16
+
+_whitespace = " \t\n\r"
+_number_chars = "0123456789.eE+-"
+# A whole string(group 1 is None if it is not terminated in the buffer) or
+# a bracket.
+_skip_re = re.compile(r'"(?:[^"\\]|\\.)*(")?|[\[\]{}]')
+
+
+class _Reader:
+    """A buffer over a text file that is refilled on demand. The consumed
+    part of the buffer is discarded when refilling."""
+
+    def __init__(self, fp: TextIO, size: int) -> None:
+        self.fp = fp
+        self.size = size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Reads the next chunk, returns False at the end of the file."""
+        if self.eof:
+            return False
+        chunk = self.fp.read(self.size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Skips whitespace and returns the next character, "" at the end of
+        the file."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _whitespace:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, chars: str) -> str:
+        """Consumes and returns the next character which must be one of
+        chars."""
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError("expected one of {!r} at offset {}".format(chars, self.pos))
+        self.pos += 1
+        return char
+
+    def value(self, decoder: json.JSONDecoder) -> Any:
+        """Decodes the next JSON value, reading more chunks while the value
+        is incomplete."""
+        self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            # A number at the end of the buffer may continue in the next
+            # chunk, like "7." followed by "25".
+            if isinstance(value, (int, float)) and \
+                    not self.buf[end:].strip(_number_chars) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+    def skip(self, decoder: json.JSONDecoder):
+        """Skips the next JSON value. A value that is complete in the buffer
+        is simply decoded, which is the fastest. Larger arrays and objects
+        are scanned for their closing bracket without decoding them keeping
+        only the current chunk in memory, so that a large value does not need
+        to be held at once."""
+        if self.peek() not in "[{":
+            self.value(decoder)
+            return
+        try:
+            _, self.pos = decoder.raw_decode(self.buf, self.pos)
+            return
+        except json.JSONDecodeError:
+            pass
+        depth = 0
+        while True:
+            for match in _skip_re.finditer(self.buf, self.pos):
+                token = match.group()
+                if token[0] == '"':
+                    if match.group(1) is None:
+                        # The string continues in the next chunk.
+                        break
+                elif token in "[{":
+                    depth += 1
+                else:
+                    depth -= 1
+                    if not depth:
+                        self.pos = match.end()
+                        return
+                self.pos = match.end()
+            else:
+                self.pos = len(self.buf)
+            if not self.fill():
+                raise ValueError("unexpected end of file")
+
+
+def iter_entries(fp: TextIO, size: int = chunk_size,
+                 select: Callable[[str], bool] | None = None) \
+        -> Iterator[Tuple[str, Any]]:
+    """
+    Yields the (key, value) pairs of the top-level JSON object of a data file
+    one at a time. If select is given, only the entries whose key is
+    selected are decoded and yielded, the others are skipped. ValueError is
+    raised if the file is not a JSON object.
+    """
+    reader = _Reader(fp, size)
+    decoder = json.JSONDecoder()
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.value(decoder)
+        if not isinstance(key, str):
+            raise ValueError("expected a key at offset {}".format(reader.pos))
+        reader.expect(":")
+        if select is None or select(key):
+            yield key, reader.value(decoder)
+        else:
+            reader.skip(decoder)
+        if reader.expect(",}") == "}":
+            return
+
+
+def iter_tasks(fp: TextIO, status: Status = Status.UNKNOWN,
+               size: int = chunk_size) -> Iterator[Task]:
+    """Yields the tasks of a data file(all of them or those with the given
+    status) in file order, decoding one task at a time. The bookkeeping
+    entries are skipped without decoding them. The file must be seekable."""
+    values: Iterable[Any]
+    version = detect_version(fp)
+    if version > 1:
+        fp.readline()
+        values = (json.loads(decode_line(line, version))
+                  for line in fp if line.strip())
+    else:
+        values = (value for _, value in iter_entries(fp, size, str.isdigit))
+    for value in values:
+        if not isinstance(value, dict) or value.get("__class__") != "Task":
+            continue
+        task = TaskDecoder.from_dict(value)
+        if status == Status.UNKNOWN or task.status == status:
+            yield task
+
+
+def _sort_key(task: Task) -> Tuple[int, float]:
+    """Key of the order defined by Task.__lt__."""
+    return task.status.value, -task.updated_at.timestamp()
+
+
+def top_tasks(tasks: Iterable[Task], limit: int) -> List[Task]:
+    """Returns the first limit tasks in the order defined by Task.__lt__
+    keeping at most limit tasks in memory at any time."""
+    return heapq.nsmallest(limit, tasks, key=_sort_key)
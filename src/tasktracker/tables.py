@@ -4,7 +4,9 @@
 Helper functions for pretty printing list of tasks using tables.
 """
 
-from typing import Dict, List
+import shutil
+from itertools import islice
+from typing import Callable, Dict, Iterator, List
 
 def _get_col_sizes(data: List[Dict[str, str]], columns: List[str], max_sizes: Dict[str, int]) -> List[int]:
     """Internal function to compute maximum length of each column.
@@ -61,15 +63,15 @@ def _get_rows(data: List[Dict[str, str]], columns: List[str], max_col_lens: List
         rows.append(row)
     return rows
 
-def _draw_table(rows: List[List[str]], max_col_lens: List[int]):
-    """Internal implementation that renders a table.
+def _table_lines(rows: List[List[str]], max_col_lens: List[int]) -> List[str]:
+    """Internal implementation that renders a table as a list of lines.
 
     Keyword arguments:
     rows: A 2-D matrix of strings to be represented as a table in the console.
     max_col_lens: provides the maximum length of each column.
     """
-    # print the table's top border
-    print("┌" + "┬".join("─" * (n + 2) for n in max_col_lens) + "┐")
+    # the table's top border
+    lines = ["┌" + "┬".join("─" * (n + 2) for n in max_col_lens) + "┐"]
     rows_separator = "├" + "┼".join("─" * (n + 2) for n in max_col_lens) + "┤"
     header_separator = "╞" + "╪".join("═" * (n + 2) for n in max_col_lens) + "╡"
     row_fstring = " │ ".join("{: <%s}" % n for n in max_col_lens)
@@ -79,16 +81,32 @@ def _draw_table(rows: List[List[str]], max_col_lens: List[int]):
 
     for idx, row in enumerate(rows):
         row_str = header_fstring.format(*row) if idx == 0 else row_fstring.format(*row)
-        print("│", row_str, "│")
+        lines.append("│ " + row_str + " │")
         if idx < len(rows) - 1:
             if idx == 0:
-                print(header_separator)
+                lines.append(header_separator)
             else:
-                print(rows_separator)
+                lines.append(rows_separator)
+
+    # the table's bottom border
+    lines.append("└" + "┴".join("─" * (n + 2) for n in max_col_lens) + "┘")
+    return lines
 
+def _draw_table(rows: List[List[str]], max_col_lens: List[int]):
+    """Internal implementation that renders a table.
 
-    # print the table's bottom border
-    print("└" + "┴".join("─" * (n + 2) for n in max_col_lens) + "┘")
+    Keyword arguments:
+    rows: A 2-D matrix of strings to be represented as a table in the console.
+    max_col_lens: provides the maximum length of each column.
+    """
+    for line in _table_lines(rows, max_col_lens):
+        print(line)
+
+def table_lines(data: List[Dict[str, str]], columns: List[str], max_sizes: Dict[str, int] = {}) -> List[str]:
+    """Returns the lines of the pretty tabular form of the data without
+    displaying them. See show_table for the arguments."""
+    max_col_lens = _get_col_sizes(data, columns, max_sizes)
+    return _table_lines(_get_rows(data, columns, max_col_lens), max_col_lens)
 
 def show_table(data: List[Dict[str, str]], columns: List[str], max_sizes: Dict[str, int] = {}):
     """Displays the data in a pretty tabular form.
@@ -104,6 +122,78 @@ def show_table(data: List[Dict[str, str]], columns: List[str], max_sizes: Dict[s
     rows = _get_rows(data, columns, max_col_lens)
     _draw_table(rows, max_col_lens)
 
+def _page_size() -> int:
+    """Returns the number of table rows that fit in the terminal window. Each
+    row takes two lines(the row and its separator), the rest of the lines are
+    used by the title, the header, the borders and the prompt."""
+    lines = shutil.get_terminal_size().lines
+    return max((lines - 6) // 2, 1)
+
+def page_table(data: Iterator[Dict[str, str]], columns: List[str], max_sizes: Dict[str, int] = {},
+               page_size: int = 0, read_key: Callable[[str], str] = input, title: str = ""):
+    """Displays the data in a pretty tabular form one window(page) at a time.
+
+    The rows are pulled lazily from the data iterator, so only the rows up to
+    the current window are ever requested from the producer. The column
+    widths are computed only from the rows of the windows shown so far (and
+    are capped by max_sizes) so that the time to draw a window does not depend
+    on the total number of rows. Rows already shown are kept to allow going
+    back to previous windows.
+
+    Keyword arguments:
+    data      : an iterator of rows of data represented as a dictionary(key =
+                column-name, value = cell-value).
+    columns   : a list of column names.
+    max_sizes : (Optional) dictionary containing maximum length of columns(key =
+                column-name, value = maximum length of that column).
+    page_size : (Optional) number of rows per window, by default as many as fit
+                in the terminal.
+    read_key  : (Optional) function that shows a prompt and returns the user
+                input. Defaults to the builtin input().
+    title     : (Optional) line shown above the table on each window.
+    """
+    if page_size <= 0:
+        page_size = _page_size()
+    seen: List[Dict[str, str]] = []
+    exhausted = False
+    col_sizes: List[int] = []
+    start = 0
+    redraw = False
+    while True:
+        if not exhausted and len(seen) < start + page_size + 1:
+            # Fetch one extra row to know whether there is a next window.
+            fetched = list(islice(data, start + page_size + 1 - len(seen)))
+            seen.extend(fetched)
+            exhausted = len(seen) < start + page_size + 1
+        window = seen[start:start + page_size]
+        # Column widths only grow so that the table does not jitter.
+        window_sizes = _get_col_sizes(window, columns, max_sizes)
+        col_sizes = [max(pair) for pair in zip(col_sizes, window_sizes)] if col_sizes else window_sizes
+        has_next = len(seen) > start + page_size
+        if redraw:
+            print("\033[2J\033[H", end="")  # clear the screen
+        redraw = True
+        if title:
+            print(title)
+        _draw_table(_get_rows(window, columns, col_sizes), col_sizes)
+        if not has_next and start == 0:
+            return
+        choices = (["[n]ext"] if has_next else []) + (["[p]revious"] if start > 0 else []) + ["[q]uit"]
+        prompt = "Rows {}-{}{} {}: ".format(start + 1, start + len(window),
+                                            "" if exhausted else "+",
+                                            " ".join(choices))
+        try:
+            key = read_key(prompt).strip().lower()
+        except (EOFError, KeyboardInterrupt):
+            print()
+            return
+        if key in ("", "n") and has_next:
+            start += page_size
+        elif key == "p" and start > 0:
+            start = max(start - page_size, 0)
+        elif key == "q" or (key in ("", "n") and not has_next):
+            return
+
 def _sample_run():
     """Function that shows a sample usage of show_table"""
     data = [
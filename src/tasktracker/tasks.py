@@ -2,101 +2,128 @@
 
 """Implements task management functionality"""
 
+import heapq
+import json
+import os
+import socket
 import sys
+import time
 from datetime import datetime, timezone
-import json
+from itertools import chain, islice
 from pathlib import Path
-from typing import override, Any, cast, Dict, List, Generator
+from contextlib import contextmanager
+from typing import cast, Any, Dict, Iterable, Iterator, List, Generator, Tuple
+from uuid import uuid4
 
 from tasktracker.actions import ActionAdd, ActionUpdate
 from tasktracker.actions import ActionBase, ActionDelete
 from tasktracker.actions import ActionMark, ActionList, ActionType
-from tasktracker.status import Status, status_map
-from tasktracker.tables import show_table
+from tasktracker.actions import ActionStats, ActionQuery
+from tasktracker.actions import ActionSyncExport, ActionSyncImport
+from tasktracker.actions import ActionServe, ActionNext
+from tasktracker.actions import ActionBlock, ActionUnblock, ActionMigrate
+from tasktracker.actions import ActionMetrics, ActionSalvage, ActionVerify
+from tasktracker.analytics import TaskArrays, fmt_duration, status_counts
+from tasktracker.analytics import lead_time_histogram, lead_time_summary
+from tasktracker.analytics import throughput_per_day
+from tasktracker.columnar import TaskColumns, to_micros
+from tasktracker.formats import default_version, next_generation
+from tasktracker.formatting import fmt_id_ranges, fmt_list_of_strings
+from tasktracker.metrics import load_metrics, metrics_file, record, render
+from tasktracker.migration import migrate
+# Task, TaskEncoder and TaskDecoder used to live here, they are imported for
+# backward compatibility.
+from tasktracker.model import Task, TaskDecoder, TaskEncoder
+from tasktracker.multilist import default_list_name, list_file, list_names
+from tasktracker.multilist import query_lists
+from tasktracker.status import Status
+from tasktracker.output import record_fields, resolve_format, write_json
+from tasktracker.output import write_records
+from tasktracker.query import Query
+from tasktracker.recovery import quarantine_file, salvage, verify
+from tasktracker.streaming import iter_tasks, top_tasks
+from tasktracker.tables import page_table, show_table, table_lines
+from tasktracker.watch import FileWatcher, watch
 
+# Value of the "format" entry of the changes exported for synchronization.
+sync_format = "task-tracker-changes"
 
-class Task:
-    """
-    Task represents a single task with id(tid), a short
-    description(description), its status and two datetime fields to represent
-    when it was created and when it was updated last both in UTC timezone.
-    """
 
-    tid = -1
-    description = ""
-    status = Status.UNKNOWN
-    created_at = datetime(1970, 1, 1, 0, 0, 0, tzinfo=timezone.utc)
-    updated_at = datetime(1970, 1, 1, 0, 0, 0, tzinfo=timezone.utc)
+# Seconds after which a replica that did not send any changes is considered
+# retired: it does not hold back the pruning of the deletions anymore.
+_peer_expiry = 180 * 86400
 
-    def __lt__(self, other):
-        """
-        When sorting a list of tasks, order by status. For tasks of same
-        status, order by last updated time in descending order.
-        """
-        if self.status.value < other.status.value:
-            return True
-        if self.status.value > other.status.value:
-            return False
-        if self.updated_at < other.updated_at:
-            return False
-        return True
 
-    def to_dict(self) -> Dict[str, str]:
-        fmt_str = "%d %b %Y %H:%M:%S"
-        return {
-                "ID": str(self.tid),
-                "Description": self.description,
-                "Status": self.status.name.lower(),
-                "Updated@": self.updated_at.astimezone().strftime(fmt_str),
-                "Created@": self.created_at.astimezone().strftime(fmt_str)}
+def _legacy_uid(tid: int) -> str:
+    """Returns the identifier shared by the replicas of a task that was
+    created before synchronization support, derived from its task id."""
+    return "tid-{}".format(tid)
 
-    @staticmethod
-    def column_names() -> List[str]:
-        return ["ID", "Description", "Status", "Updated@", "Created@"]
 
+def _replica_home(fname: str) -> str:
+    """Returns the location a replica is bound to: the host name and the
+    absolute path of its data file."""
+    return "{}:{}".format(socket.gethostname(), os.path.realpath(fname))
 
-class TaskEncoder(json.JSONEncoder):
-    """
-    A custom JSON encoder for Task instances. The status is represented by
-    lower case strings. The created_at and updated_at datetimes are represented
-    as timestamps. Task is represented as a dictionary with a special key value
-    pair of <"__class__" : "Task"> as a cue to the decoder (TaskDecoder).
-    """
-    @override
-    def default(self, o):
-        if not isinstance(o, Task):
-            return super().default(o)
-        return {
-                "__class__": "Task",
-                "tid": o.tid,
-                "description": o.description,
-                "status": o.status.name.lower(),
-                "created_at": str(o.created_at.timestamp()),
-                "updated_at": str(o.updated_at.timestamp())}
-
-
-class TaskDecoder(json.JSONDecoder):
+
+# Due time used in the "next" order for tasks without a due date.
+_no_due = 1 << 62
+
+
+def heap_file(fname: str) -> str:
+    """Returns the path of the file next to a data file that holds the
+    persisted heap of the "next" order, see TaskStore._next_heap()."""
+    return fname + ".next"
+
+
+def _next_key(columns: TaskColumns, tid: int) -> List[int]:
+    """Returns the key of a task in the "next" order: [-priority, due time,
+    creation time, task id], the key is the heap entry itself."""
+    return [-columns.priority[tid], columns.due[tid] or _no_due,
+            columns.created_at[tid], tid]
+
+
+def _parse_micros(timestamp: str) -> int:
+    """Returns the microseconds since epoch of a timestamp string as written
+    by TaskEncoder."""
+    return round(float(timestamp) * 1000000)
+
+
+def _show_stats(arrays: TaskArrays, days: int):
     """
-    A custom JSON decoder for importing Task instances from JSON. This reverses
-    the convertions done in TaskEncoder to read dictionaries representing a
-    task to a Task instance.
+    Shows the number of tasks per status, the number of tasks added and done
+    per day for the last given number of days and the lead time(creation to
+    done) statistics of the done tasks.
     """
-    def __init__(self):
-        json.JSONDecoder.__init__(self, object_hook=TaskDecoder.from_dict)
 
-    @staticmethod
-    def from_dict(d):
-        if d.get("__class__") != "Task":
-            return d
-        task = Task()
-        task.tid = int(d["tid"])
-        task.description = d["description"]
-        task.status = status_map[d["status"]]
-        task.created_at = datetime.fromtimestamp(
-                float(d["created_at"]), tz=timezone.utc)
-        task.updated_at = datetime.fromtimestamp(
-                float(d["updated_at"]), tz=timezone.utc)
-        return task
+    if len(arrays) == 0:
+        print("There are no tasks.")
+        return
+
+    counts = status_counts(arrays)
+    print("\nTasks by status:")
+    data = [{"Status": status.name.lower(), "Tasks": str(count)}
+            for status, count in counts.items()]
+    data.append({"Status": "total", "Tasks": str(len(arrays))})
+    show_table(data, ["Status", "Tasks"])
+
+    print("\nThroughput of the last {} days:".format(days))
+    data = [{"Day": day.strftime("%d %b %Y"), "Added": str(added),
+             "Done": str(done)}
+            for day, added, done in throughput_per_day(arrays, days)]
+    show_table(data, ["Day", "Added", "Done"])
+
+    summary = lead_time_summary(arrays)
+    if not summary:
+        print("\nThere are no done tasks to compute lead times.")
+        return
+    print("\nLead time of done tasks:")
+    data = [{"Statistic": name, "Lead time": fmt_duration(value)}
+            for name, value in summary.items()]
+    show_table(data, ["Statistic", "Lead time"])
+    data = [{"Lead time": label, "Tasks": str(count)}
+            for label, count in lead_time_histogram(arrays)]
+    show_table(data, ["Lead time", "Tasks"])
 
 
 class TaskStore:
@@ -109,48 +136,270 @@ class TaskStore:
 
     error = False  # To indicate one or more errors occured.
 
-    # In-memory representation of list of Tasks.
-    # "next_tid" holds the value of "task id" for the next Task to be added.
-    _store: dict[str, Any] = {"next_tid": 1}
+    # In-memory representation of the tasks(see TaskColumns) held in parallel
+    # columns indexed by task id. Its "next_tid" bookkeeping entry holds the
+    # value of "task id" for the next Task to be added.
+    _columns: TaskColumns
+
+    # Nesting depth of the open transactions, see transaction().
+    _depth = 0
+    # Whether there are mutations not yet written by the open transactions.
+    _dirty = False
 
-    def __init__(self, store_fname: str, test_mode=False) -> None:
+    # Fingerprints of the lines of the tasks in the data file as last loaded
+    # or written(see TaskColumns.load()), None if they are not tracked.
+    _fingerprints: Dict[int, int] | None = None
+    # Time(time.monotonic()) of the last check for changes before a read.
+    _checked_at = float("-inf")
+
+    # Location the replica is bound to, see _replica_id().
+    _home: str | None = None
+
+    # Heap of the "next" order(see _next_heap()) if it is loaded or built,
+    # and whether the heap file was already read for the loaded store.
+    _heap: List[List[int]] | None = None
+    _heap_read = False
+
+    # Seconds taken to load the data file, None if it was not loaded.
+    load_seconds: float | None = None
+    # Number of bytes written to the data file since the store was created.
+    written_bytes = 0
+
+    def __init__(self, store_fname: str, test_mode=False,
+                 auto_refresh: float | None = None) -> None:
         """
         Builds a TaskStore instance from the given file path of the underlying
         JSON data file. If the file does not exist, it is created.
+
+        If auto_refresh is not None, the reads check for changes made to the
+        data file by other processes(see refresh()) at most once every
+        auto_refresh seconds(0 to check before every read). The mutations
+        always check first, so that they never overwrite those changes.
         """
 
         self.file = store_fname
         self.test_mode = test_mode
+        self.auto_refresh = auto_refresh
+        self._columns = TaskColumns()
+        # Created before loading so that no write after the load is missed.
+        self._watcher = FileWatcher(self.file)
         if not Path(self.file).is_file():
+            # New data files get the default layout(see formats.py).
+            self._columns.meta["version"] = default_version
             self._write()
 
         try:
+            started = time.perf_counter()
             with open(self.file, "r") as fp:
-                self._load(fp)
+                # Tracked from the start for the deltas of auto_refresh.
+                self._load(fp, {} if auto_refresh is not None else None)
+            self.load_seconds = time.perf_counter() - started
         except Exception:
             print("[ERROR] cannot load data file {}"
                   " due to possible corruption.".format(self.file))
+            print("Run the salvage sub-command to recover the intact tasks.")
             self.error = True
 
-    def _load(self, fp):
+    def _load(self, fp, fingerprints: Dict[int, int] | None = None):
+        """
+        Imports tasks from the JSON data file(in the format written by the
+        custom JSON encoder TaskEncoder) directly into the in-memory columns.
+        If a fingerprints dictionary is given, the lines of the tasks are
+        tracked for the deltas of refresh().
+        """
+        self._columns = TaskColumns.load(fp, fingerprints)
+        self._fingerprints = fingerprints
+        self._reset_heap()
+
+    def _reset_heap(self):
+        """
+        Helper method that forgets the heap of the "next" order after the
+        columns were loaded or refreshed, the heap file is read again when the
+        heap is needed. The heap held in the header by older versions is
+        taken over, it is written to the heap file by the next write.
+        """
+        legacy = self._columns.meta.pop("next_heap", None)
+        self._heap = legacy
+        self._heap_read = legacy is not None
+
+    def reload(self) -> bool:
+        """
+        Reloads the tasks from the data file, for example after another
+        process has written it. Returns False if the file cannot be loaded
+        (like while it is being written), the tasks loaded before are kept in
+        that case.
+        """
+        self._watcher.reset()
+        try:
+            with open(self.file, "r") as fp:
+                self._load(fp, None if self._fingerprints is None else {})
+        except Exception:
+            self._watcher.signature = None
+            return False
+        return True
+
+    def refresh(self) -> bool:
+        """
+        Brings the store up to date with the data file if another process
+        wrote it since it was loaded or written by this store. The check
+        costs one stat() call if the file was not written(see FileWatcher).
+        If it was, only the tasks whose line changed are decoded and applied
+        (see TaskColumns.apply_changes()), a full reload is done instead for
+        the version 1 layout and the first time the lines are not tracked
+        yet. Nothing is done inside a transaction.
+
+        Returns True if the store was refreshed. If the file cannot be loaded
+        (like while it is being written), the tasks loaded before are kept
+        and False is returned, the next call tries again.
+        """
+        if self._depth or not self._watcher.changed():
+            return False
+        return self._apply_changes()
+
+    def _apply_changes(self) -> bool:
+        """
+        Helper method of refresh() that applies the changes of the data file
+        once the watcher reported them. Returns False if the file cannot be
+        loaded, the watcher reports the change again then.
+        """
+        try:
+            with open(self.file, "r") as fp:
+                if self._fingerprints is None or \
+                        self._columns.apply_changes(
+                            fp, self._fingerprints) is None:
+                    fp.seek(0)
+                    self._load(fp, {})
+                else:
+                    self._reset_heap()
+        except Exception:
+            # Probably caught in the middle of a write, retry next time(even
+            # if the stamp of the file does not change again).
+            self._watcher.signature = None
+            self._watcher.stamp = None
+            return False
+        return True
+
+    def columns(self) -> TaskColumns:
         """
-        Imports tasks from the JSON data file to be held in memory making use
-        of the custom JSON decoder(TaskDecoder).
+        Returns the in-memory columnar representation of the tasks. It must be
+        treated as read only, use the mutation methods of TaskStore instead.
+        With auto_refresh, the store is refreshed first if the last check is
+        at least auto_refresh seconds old.
         """
-        self._store = json.load(fp, cls=TaskDecoder)
+        if self.auto_refresh is not None:
+            now = time.monotonic()
+            if now - self._checked_at >= self.auto_refresh:
+                self._checked_at = now
+                self.refresh()
+        return self._columns
+
+    def _before_mutation(self):
+        """
+        Helper method called at the start of the mutations(and of the
+        outermost transactions). With auto_refresh, the store is refreshed
+        whatever the time of the last check so that the write that follows
+        does not erase the changes of other processes. OSError is raised if
+        the data file changed but cannot be loaded(like while it is being
+        written), the mutation must not be done then.
+        """
+
+        if self.auto_refresh is None or self._depth:
+            return
+        self._checked_at = time.monotonic()
+        if self._watcher.changed() and not self._apply_changes():
+            raise OSError("{} was changed by another process and cannot be"
+                          " reloaded".format(self.file))
 
     def _write(self):
         """
-        Exports the tasks data from the in memory representation in self._store
-        to the JSON file making use of the custom JSON encoder(TaskEncoder).
+        Exports the tasks data from the in memory representation in
+        self._columns to the JSON file in the format of the custom JSON
+        encoder(TaskEncoder). The generation of the store is incremented to
+        let readers detect the change cheaply. The data is written to a file
+        next to the data file(unique to the process, concurrent writers do
+        not share it), flushed to disk and then moved over the data file with
+        os.replace(), so readers and crashes never see a partial file.
         """
 
+        next_generation(self._columns.meta)
+        fingerprints = None if self._fingerprints is None else {}
+        written_fname = "{}.{}.writing".format(self.file, os.getpid())
         try:
-            with open(self.file, "w") as fp:
-                json.dump(self._store, fp, cls=TaskEncoder)
+            with open(written_fname, "w") as fp:
+                self._columns.dump(fp, fingerprints)
+                fp.flush()
+                os.fsync(fp.fileno())
+                self.written_bytes += fp.tell()
+            os.replace(written_fname, self.file)
         except Exception:
             print("[ERROR] cannot write to {}.".format(self.file))
             self.error = True
+            fingerprints = None
+            try:
+                os.remove(written_fname)
+            except OSError:
+                pass
+        else:
+            if self._heap is not None:
+                self._write_heap()
+        self._fingerprints = fingerprints
+        # Not a change to be refreshed.
+        self._watcher.reset()
+
+    def _commit(self):
+        """
+        Persists the in-memory store after a mutation. Inside a transaction
+        the write is deferred until the outermost transaction finishes.
+        """
+
+        if self._depth:
+            self._dirty = True
+        else:
+            self._write()
+
+    def _snapshot(self) -> TaskColumns:
+        """
+        Returns a copy of the in-memory store that is not affected by later
+        mutations of the store.
+        """
+
+        return self._columns.copy()
+
+    @contextmanager
+    def transaction(self) -> Iterator["TaskStore"]:
+        """
+        Context manager that groups mutations(add, update, delete, mark) so
+        that the JSON file is written only once when the outermost
+        transaction exits. If an exception escapes a transaction, the
+        in-memory store is rolled back to its state at the start of that
+        transaction and the exception is re-raised. Transactions can be
+        nested, an inner transaction that is rolled back does not undo the
+        changes of the enclosing one made before it started.
+
+        Usage:
+        with store.transaction():
+            for action in actions:
+                store.add(action)
+        """
+
+        self._before_mutation()
+        snapshot = self._snapshot()
+        self._depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._columns = snapshot
+            # Read again from the heap file written with the snapshot.
+            self._heap = None
+            self._heap_read = False
+            self._depth -= 1
+            if not self._depth:
+                self._dirty = False
+            raise
+        self._depth -= 1
+        if not self._depth and self._dirty:
+            self._dirty = False
+            self._write()
 
     def _next_tid(self) -> int:
         """
@@ -158,141 +407,823 @@ class TaskStore:
         increments the internal counter in the in memory store.
         """
 
-        next_tid = self._store["next_tid"]
-        self._store["next_tid"] += 1
+        meta = self._columns.meta
+        next_tid = meta["next_tid"]
+        meta["next_tid"] += 1
         return next_tid
 
+    def _put(self, task: Task):
+        """
+        Helper method that puts a new or modified task in the in-memory store
+        and keeps the heap of the tasks to work on next up to date: a todo
+        task whose priority, due date or status changed gets a new heap
+        entry. The outdated entries are dropped lazily, see next_tasks().
+        """
+
+        columns = self._columns
+        tid = task.tid
+        old_key = _next_key(columns, tid) \
+            if tid in columns and columns.status[tid] == Status.TODO.value \
+            else None
+        columns.put(task)
+        if task.status != Status.TODO:
+            return
+        key = _next_key(columns, tid)
+        heap = self._stored_heap()
+        if heap is None or key == old_key:
+            return
+        if len(heap) > 2 * len(columns) + 64:
+            # Too many outdated entries, rebuilt on the next use.
+            self._heap = None
+            return
+        heapq.heappush(heap, key)
+
+    def _next_heap(self) -> List[List[int]]:
+        """
+        Helper method that returns the heap of the todo tasks ordered by the
+        "next" order(see _next_key()). The heap is persisted in the heap file
+        next to the data file(see heap_file()), not in the header, so that
+        the readers that do not need it never load it. It is built with a
+        single heapify if it is missing or outdated.
+        """
+
+        heap = self._stored_heap()
+        if heap is None:
+            columns = self._columns
+            heap = [_next_key(columns, row)
+                    for row in columns.rows(Status.TODO)]
+            heapq.heapify(heap)
+            self._heap = heap
+        return heap
+
+    def _stored_heap(self) -> List[List[int]] | None:
+        """
+        Helper method that returns the heap of the "next" order if it is
+        loaded, or reads it from the heap file if it was written along with
+        the loaded data file(same "generation" and "write_id"). Returns None
+        if there is no such heap.
+        """
+
+        if self._heap is None and not self._heap_read:
+            self._heap_read = True
+            meta = self._columns.meta
+            try:
+                with open(heap_file(self.file), "r") as fp:
+                    stored = json.load(fp)
+                if stored["generation"] == meta.get("generation") and \
+                        stored["write_id"] == meta.get("write_id"):
+                    self._heap = list(stored["heap"])
+            except (OSError, ValueError, KeyError, TypeError):
+                pass
+        return self._heap
+
+    def _write_heap(self):
+        """
+        Helper method that replaces the heap file with the heap of the "next"
+        order, stamped with the "generation" and the "write_id" of the store
+        so that it is only used with the data file written along. Errors are
+        ignored, the heap is rebuilt when it cannot be read.
+        """
+
+        meta = self._columns.meta
+        fname = heap_file(self.file)
+        try:
+            with open(fname + ".tmp", "w") as fp:
+                json.dump({"generation": meta.get("generation"),
+                           "write_id": meta.get("write_id"),
+                           "heap": self._heap}, fp)
+            os.replace(fname + ".tmp", fname)
+        except OSError:
+            pass
+
+    def next_tasks(self, count: int = 1) -> List[Task]:
+        """
+        Returns the first count todo tasks in the "next" order: by priority
+        (higher first), by due date(earlier first, tasks without a due date
+        last) and by creation time. Tasks blocked by open tasks are skipped.
+        Only the top of the heap is visited, so this costs O((count + outdated
+        or blocked entries) * log n) instead of a sort of all the todo tasks.
+        Outdated entries(of tasks that were changed, marked or deleted) found
+        on the way are dropped for good, the entries of blocked tasks are
+        kept for when they become ready.
+        """
+
+        columns = self.columns()
+        heap = self._next_heap()
+        top: List[List[int]] = []
+        blocked: List[List[int]] = []
+        seen = set()
+        while heap and len(top) < count:
+            entry = heapq.heappop(heap)
+            tid = entry[-1]
+            if tid in seen or tid not in columns or \
+                    columns.status[tid] != Status.TODO.value or \
+                    _next_key(columns, tid) != entry:
+                continue
+            seen.add(tid)
+            if columns.ready[tid]:
+                top.append(entry)
+            else:
+                blocked.append(entry)
+        for entry in chain(top, blocked):
+            heapq.heappush(heap, entry)
+        return [columns.task(entry[-1]) for entry in top]
+
+    def next(self, action: ActionNext):
+        """
+        Shows the todo tasks to work on next, as many as requested by the
+        action parameter.
+        """
+
+        self.columns()
+        built = self._stored_heap() is None
+        tasks = self.next_tasks(action.count)
+        if built:
+            # Persisted so that the next invocations(and the tasks put until
+            # then) do not have to build it again.
+            self._write_heap()
+        if not tasks:
+            print("There are no todo tasks.")
+            return
+        print("\nNext task{}:".format("s" if len(tasks) > 1 else ""))
+        show_table([task.to_dict() for task in tasks],
+                   ["ID", "Description", "Priority", "Due", "Created@"],
+                   {"Description": 60})
+
+    def _replica_id(self) -> str:
+        """
+        Helper method that returns the identifier of this replica of the
+        store, created on first use. The identifier is bound to the location
+        of the data file(see _replica_home()): a copy of the data file made
+        to create another replica gets a new identifier on first use instead
+        of sharing the one of the original, and the acknowledgements of the
+        peers of the original are dropped. Data files written before the
+        binding keep their identifier.
+        """
+
+        meta = self._columns.meta
+        if self._home is None:
+            self._home = _replica_home(self.file)
+        home = self._home
+        if meta.get("replica_home") != home:
+            if "replica_home" in meta or "replica" not in meta:
+                meta["replica"] = uuid4().hex
+                meta.pop("acks", None)
+            meta["replica_home"] = home
+        return meta["replica"]
+
+    def _next_seq(self) -> int:
+        """
+        Helper method that returns the sequence number for the next change of
+        the store and increments the counter in the in-memory store.
+        """
+
+        meta = self._columns.meta
+        self._replica_id()
+        meta["seq"] = meta.get("seq", 0) + 1
+        return meta["seq"]
+
+    def _record_change(self, task: Task):
+        """
+        Helper method that records a change of a task(before it is put back
+        in the store) for synchronization: the task gets the next sequence
+        number and the identifier shared by the replicas if it had none.
+        """
+
+        task.seq = self._next_seq()
+        if not task.uid:
+            task.uid = _legacy_uid(task.tid)
+
+    def _record_deletion(self, uid: str, deleted_at: str):
+        """
+        Helper method that records the deletion of the task with the given
+        identifier at the given time(timestamp string) as a tombstone, so
+        that the deletion can be exported to the other replicas.
+        """
+
+        self._columns.meta.setdefault("deleted", {})[uid] = {
+            "seq": self._next_seq(), "deleted_at": deleted_at}
+
+    def export_changes(self, since: int = 0) -> Dict[str, Any]:
+        """
+        Returns the changes of the store with a sequence number greater than
+        since (all tasks if since is 0) as a dictionary that can be serialized
+        to JSON and applied to another replica with import_changes(). Only the
+        changed tasks are serialized. The "seq" entry of the result is the
+        sequence number of the last exported change, the value of since for
+        the next export.
+        """
+
+        self._before_mutation()
+        columns = self.columns()
+        meta = columns.meta
+        rows = columns.rows() if since == 0 else columns.changed_rows(since)
+        encoder = TaskEncoder()
+        tasks = []
+        for task in columns.tasks(rows):
+            if not task.uid:
+                task.uid = _legacy_uid(task.tid)
+            d = encoder.default(task)
+            if task.blocked_by:
+                # Task ids differ between replicas, the blockers are
+                # identified by their shared identifiers.
+                d["blocked_by"] = [columns.uids[tid] or _legacy_uid(tid)
+                                   for tid in task.blocked_by]
+            tasks.append(d)
+        deleted = [{"uid": uid, "deleted_at": tombstone["deleted_at"]}
+                   for uid, tombstone in meta.get("deleted", {}).items()
+                   if tombstone["seq"] > since]
+        home = meta.get("replica_home")
+        replica = self._replica_id()
+        if meta["replica_home"] != home:
+            self._commit()
+        return {"format": sync_format, "replica": replica,
+                "since": since, "seq": meta.get("seq", 0),
+                "tasks": tasks, "deleted": deleted,
+                "peers": meta.get("peers", {})}
+
+    def import_changes(self, delta: Dict[str, Any]) -> Dict[str, int]:
+        """
+        Applies the changes exported by export_changes() of another replica
+        and writes the store once. Conflicts are resolved by the last update
+        time: a task or a deletion is applied only if it is newer than the
+        local version of the task(ties keep the local version). The applied
+        changes get local sequence numbers so that they are passed on by the
+        next export. Returns the number of tasks "added", "updated",
+        "deleted" and "skipped"(outdated changes) and the number of blocked-by
+        links dropped as "cycles".
+
+        The blockers of the imported tasks are given by their shared
+        identifiers, the blockers unknown to this replica are dropped. So are
+        the links that would create a cycle with the links already known(the
+        two replicas linked the same tasks the other way round).
+
+        ValueError is raised if the delta is not valid, KeyError or TypeError
+        if it is malformed. The store is not modified in these cases.
+        """
+
+        if delta.get("format") != sync_format:
+            raise ValueError("not a sync export")
+        self._before_mutation()
+        replica = self._replica_id()
+        if delta["replica"] == replica:
+            raise ValueError("the changes were exported by this replica")
+        columns = self._columns
+        counts = {"added": 0, "updated": 0, "deleted": 0, "skipped": 0,
+                  "cycles": 0}
+        with self.transaction():
+            meta = columns.meta
+            tombstones = meta.setdefault("deleted", {})
+            by_uid = {columns.uids[row] or _legacy_uid(row): row
+                      for row in columns.rows()}
+            # Imported tasks with the identifiers of their blockers, linked
+            # once all the tasks are known.
+            blocked: List[Tuple[Task, List[str]]] = []
+            for d in delta["tasks"]:
+                task = cast(Task, TaskDecoder.from_dict(d))
+                updated_at = to_micros(task.updated_at)
+                tombstone = tombstones.get(task.uid)
+                if tombstone is not None and \
+                        _parse_micros(tombstone["deleted_at"]) >= updated_at:
+                    counts["skipped"] += 1
+                    continue
+                row = by_uid.get(task.uid)
+                if row is None:
+                    task.tid = self._next_tid()
+                    by_uid[task.uid] = task.tid
+                    counts["added"] += 1
+                elif columns.updated_at[row] >= updated_at:
+                    counts["skipped"] += 1
+                    continue
+                else:
+                    task.tid = row
+                    counts["updated"] += 1
+                tombstones.pop(task.uid, None)
+                self._record_change(task)
+                if task.blocked_by:
+                    blocked.append((task, cast(List[str], task.blocked_by)))
+                    task.blocked_by = []
+                self._put(task)
+            for task, uids in blocked:
+                task.blocked_by = []
+                for uid in uids:
+                    blocker = by_uid.get(uid)
+                    if blocker is None:
+                        continue
+                    # Both replicas may have linked the tasks the other way
+                    # round, the link that would close a cycle is dropped.
+                    if blocker == task.tid or columns.depends_on(blocker, task.tid):
+                        counts["cycles"] += 1
+                        continue
+                    task.blocked_by.append(blocker)
+                self._put(task)
+            for d in delta["deleted"]:
+                uid = d["uid"]
+                deleted_at = _parse_micros(d["deleted_at"])
+                row = by_uid.get(uid)
+                tombstone = tombstones.get(uid)
+                if (row is not None and columns.updated_at[row] > deleted_at) \
+                        or (tombstone is not None and
+                            _parse_micros(tombstone["deleted_at"]) >= deleted_at):
+                    counts["skipped"] += 1
+                    continue
+                if row is not None:
+                    columns.remove(row)
+                    del by_uid[uid]
+                    counts["deleted"] += 1
+                self._record_deletion(uid, d["deleted_at"])
+            meta.setdefault("peers", {})[delta["replica"]] = int(delta["seq"])
+            # The exporter tells how far it imported the changes of this
+            # replica(older exports do not).
+            acked = int(delta.get("peers", {}).get(replica, 0))
+            meta.setdefault("acks", {})[delta["replica"]] = [acked,
+                                                             int(time.time())]
+            self._prune_deletions()
+            self._commit()
+        return counts
+
+    def _prune_deletions(self):
+        """
+        Helper method that drops the deletions that every peer has imported,
+        so that the bookkeeping entries do not grow without bound. The peers
+        are the replicas this one imported changes from, a deletion is
+        dropped once each of them acknowledged a sequence number after it.
+        The peers that sent nothing for _peer_expiry seconds are forgotten as
+        retired.
+        """
+
+        meta = self._columns.meta
+        acks = meta.get("acks", {})
+        retired = [replica for replica, (_, at) in acks.items()
+                   if at < time.time() - _peer_expiry]
+        for replica in retired:
+            del acks[replica]
+            meta.get("peers", {}).pop(replica, None)
+        if not acks:
+            return
+        acked = min(seq for seq, _ in acks.values())
+        tombstones = meta.get("deleted", {})
+        for uid in [uid for uid, tombstone in tombstones.items()
+                    if tombstone["seq"] <= acked]:
+            del tombstones[uid]
+
+    def sync_export(self, action: ActionSyncExport):
+        """
+        Writes the changes after the sequence number given by the action
+        parameter to the standard output as JSON(see export_changes()).
+        """
+
+        write_json(self.export_changes(action.since))
+
+    def sync_import(self, action: ActionSyncImport):
+        """
+        Applies the changes exported by another replica read from the file
+        given by the action parameter or from the standard input.
+        """
+
+        try:
+            if action.fname == "-":
+                delta = json.load(sys.stdin)
+            else:
+                with open(action.fname, "r") as fp:
+                    delta = json.load(fp)
+            counts = self.import_changes(delta)
+        except OSError:
+            print("[ERROR] cannot read {}.".format(action.fname))
+            return
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            print("[ERROR] invalid sync data: {}".format(e))
+            return
+        if self.error or self.test_mode:
+            return
+        print("Imported the changes of replica {} up to sequence number {}: "
+              "{added} added, {updated} updated, {deleted} deleted and "
+              "{skipped} skipped as outdated".format(
+                  delta["replica"], delta["seq"], **counts))
+        if counts["cycles"]:
+            print("{cycles} blocked-by link(s) dropped as they would create a "
+                  "cycle".format(**counts))
+        print("Use --since {} for the next export of that replica".format(
+            delta["seq"]))
+
     def _get_task(self, tid: int) -> Task | None:
         """
         Helper method to get a Task instance corresponding to a task-id from
-        the in-memory store.
+        the in-memory store. The Task instance is a copy, it must be put back
+        in the store after modifying it.
         """
 
-        stid = str(tid)
-        if stid not in self._store:
-            return None
-        return self._store[stid]
+        return self._columns.get(tid)
 
-    def add(self, action: ActionAdd):
+    def add(self, action: ActionAdd) -> Task:
         """
         Adds a new task with description specified by action(ActionAdd
         instance) to the in-memory data store and finally writes everything
-        to JSON file.
+        to JSON file. Returns the new Task instance. ValueError is raised if
+        the action is not valid.
         """
 
+        if not action.valid:
+            raise ValueError("invalid add action")
+        return self.add_task(action.task_description, action.priority,
+                             action.due)
+
+    def add_task(self, description: str, priority: int | None = None,
+                 due: datetime | None = None) -> Task:
+        """
+        Adds a new task with the given description, priority and due date
+        (plain values, never parsed as command line arguments) like add().
+        Returns the new Task instance.
+        """
+
+        self._before_mutation()
         next_tid = self._next_tid()
         task = Task()
         task.tid = next_tid
-        task.description = action.task_description
+        task.description = description
         task.status = Status.TODO
         now = datetime.now(tz=timezone.utc)
         task.created_at = now
         task.updated_at = now
-        self._store[str(task.tid)] = task
-        self._write()
+        task.uid = uuid4().hex
+        if priority is not None:
+            task.priority = priority
+        if due is not None:
+            task.due = due.astimezone(timezone.utc)
+        self._record_change(task)
+        self._put(task)
+        self._commit()
         if not self.error and not self.test_mode:
             print("Added new task with id = {}".format(next_tid))
             show_table([task.to_dict(),], Task.column_names(),
                        {"Description": 60})
+        return task
 
     def update(self, action: ActionUpdate):
         """
-        Updates the description of a task in the in-memory store for a given
-        task-id specified by the "action" parameter. The in-memory store is
-        serialized to JSON in the end.
+        Updates the description, the priority or the due date of a task in
+        the in-memory store for a given task-id specified by the "action"
+        parameter. The in-memory store is serialized to JSON in the end.
+        ValueError is raised if the action is not valid.
         """
 
-        task = self._get_task(action.task_id)
+        if not action.valid:
+            raise ValueError("invalid update action")
+        self.update_task(action.task_id, action.task_description,
+                         action.priority, action.due, action.clear_due)
+
+    def update_task(self, tid: int, description: str | None = None,
+                    priority: int | None = None, due: datetime | None = None,
+                    clear_due: bool = False) -> Task | None:
+        """
+        Updates the fields of the task with the given task id to the given
+        plain values(never parsed as command line arguments) like update(),
+        None keeps a field. Returns the updated Task instance or None if
+        there is no such task.
+        """
+
+        self._before_mutation()
+        task = self._get_task(tid)
         if task is None:
             if not self.test_mode:
                 print("[ERROR] There is no task with task_id = {}".
-                      format(action.task_id))
-            return
-        task.description = action.task_description
+                      format(tid))
+            return None
+        if description is not None:
+            task.description = description
+        if priority is not None:
+            task.priority = priority
+        if due is not None:
+            task.due = due.astimezone(timezone.utc)
+        elif clear_due:
+            task.due = None
         now = datetime.now(tz=timezone.utc)
         task.updated_at = now
-        self._write()
+        self._record_change(task)
+        self._put(task)
+        self._commit()
         if not self.error and not self.test_mode:
-            print("Updated task with id = {}".format(action.task_id))
+            print("Updated task with id = {}".format(tid))
             show_table([task.to_dict(),], Task.column_names(),
                        {"Description": 60})
+        return task
 
-    def delete(self, action: ActionDelete):
+    def block(self, action: ActionBlock):
         """
-        Deletes a task specified by the action parameter from the in-memory
-        store and finally the JSON file is re-written.
+        Records that the task specified by the action parameter is blocked by
+        the given blocker tasks. Nothing is changed if a blocker does not
+        exist or if the new links would create a cycle(a blocker that is
+        already blocked by the task directly or through other tasks).
         """
 
-        stid = str(action.task_id)
-        if stid not in self._store:
+        self._before_mutation()
+        task = self._get_task(action.task_id)
+        if task is None:
             if not self.test_mode:
                 print("[ERROR] There is no task with task_id = {}".
                       format(action.task_id))
             return
-        task = self._store[stid]
-        del self._store[stid]
-        self._write()
+        columns = self._columns
+        blockers, missing = action.blocker_ids.select_rows(columns)
+        if missing.ranges:
+            if not self.test_mode:
+                print("[ERROR] There are no tasks with task_ids = {}".
+                      format(missing))
+            return
+        # A new link blocker -> task closes a cycle if the blocker is already
+        # blocked by the task. The links of the task itself do not matter.
+        cycles = [tid for tid in blockers if tid == task.tid or
+                  columns.depends_on(tid, task.tid)]
+        if cycles:
+            if not self.test_mode:
+                print("[ERROR] Task {} cannot be blocked by task(s) {}:"
+                      " they depend on it, that would be a cycle".format(
+                          task.tid, fmt_id_ranges(cycles)))
+            return
+        added = [tid for tid in blockers if tid not in task.blocked_by]
+        if not added:
+            return
+        task.blocked_by = task.blocked_by + added
+        self._save_blockers(task)
+
+    def unblock(self, action: ActionUnblock):
+        """
+        Removes the given blockers of the task specified by the action
+        parameter.
+        """
+
+        self._before_mutation()
+        task = self._get_task(action.task_id)
+        if task is None:
+            if not self.test_mode:
+                print("[ERROR] There is no task with task_id = {}".
+                      format(action.task_id))
+            return
+        removed = [tid for tid in task.blocked_by
+                   if tid in action.blocker_ids]
+        missing = action.blocker_ids.without(removed)
+        if missing.ranges and not self.test_mode:
+            print("[ERROR] Task {} is not blocked by task(s) {}".format(
+                task.tid, missing))
+        if not removed:
+            return
+        task.blocked_by = [tid for tid in task.blocked_by
+                           if tid not in removed]
+        self._save_blockers(task)
+
+    def _save_blockers(self, task: Task):
+        """
+        Helper method that puts back a task whose blockers changed and shows
+        it.
+        """
+
+        task.updated_at = datetime.now(tz=timezone.utc)
+        self._record_change(task)
+        self._put(task)
+        self._commit()
         if not self.error and not self.test_mode:
-            print("Deleted task with id = {}".format(action.task_id))
-            show_table([task.to_dict(),], Task.column_names(),
+            print("Task with id = {} is {}".format(
+                task.tid, "blocked by task(s) {}".format(
+                    fmt_id_ranges(task.blocked_by))
+                if task.blocked_by else "not blocked anymore"))
+            show_table([task.to_dict(),],
+                       Task.column_names() + ["Blocked by"],
+                       {"Description": 60})
+
+    def _select_tasks(self, action: ActionDelete | ActionMark) -> List[Task]:
+        """
+        Helper method that returns the Task instances selected by the task ids
+        or by the task filter of the action parameter in a single pass. An
+        error is shown for the task ids that do not exist or if no task
+        matches the filter.
+        """
+
+        if action.task_filter is not None:
+            rows = action.task_filter.select_rows(self._columns)
+            tasks = list(self._columns.tasks(rows))
+            if not tasks and not self.test_mode:
+                print("[ERROR] There are no tasks matching the given filters")
+            return tasks
+        # The id ranges are intersected with the rows, never expanded.
+        rows, missing = action.task_ids.select_rows(self._columns)
+        tasks = list(self._columns.tasks(rows))
+        if missing.ranges and not self.test_mode:
+            if len(missing) == 1:
+                print("[ERROR] There is no task with task_id = {}".
+                      format(missing[0]))
+            else:
+                print("[ERROR] There are no tasks with task_ids = {}".
+                      format(missing))
+        return tasks
+
+    def _show_summary(self, tasks: List[Task], statuses: List[Status]):
+        """
+        Helper method that shows a table summarizing a bulk operation with the
+        number of tasks and their ids grouped by the given statuses(one for
+        each task).
+        """
+
+        groups: Dict[Status, List[int]] = {}
+        for task, status in zip(tasks, statuses):
+            groups.setdefault(status, []).append(task.tid)
+        data = [{"Status": status.name.lower(), "Tasks": str(len(tids)),
+                 "IDs": fmt_id_ranges(tids)}
+                for status, tids in sorted(groups.items(),
+                                           key=lambda item: item[0].value)]
+        show_table(data, ["Status", "Tasks", "IDs"], {"IDs": 60})
+
+    def delete(self, action: ActionDelete):
+        """
+        Deletes the tasks specified by the action parameter from the in-memory
+        store and finally the JSON file is re-written once.
+        """
+
+        self._before_mutation()
+        tasks = self._select_tasks(action)
+        if not tasks:
+            return
+        now = datetime.now(tz=timezone.utc)
+        for task in tasks:
+            self._columns.remove(task.tid)
+            self._record_deletion(task.uid or _legacy_uid(task.tid),
+                                  str(now.timestamp()))
+        self._commit()
+        if self.error or self.test_mode:
+            return
+        if len(tasks) == 1:
+            print("Deleted task with id = {}".format(tasks[0].tid))
+            show_table([tasks[0].to_dict(),], Task.column_names(),
                        {"Description": 60})
+        else:
+            print("Deleted {} tasks".format(len(tasks)))
+            self._show_summary(tasks, [task.status for task in tasks])
+
+    def _sorted_tasks(self, status: Status = Status.UNKNOWN,
+                      limit: int = 0, ready: bool = False,
+                      query: Query | None = None) -> List[Task]:
+        """
+        Helper method to get a sorted list of all Task instances or those with
+        a given status(only the first limit ones if limit is not 0, only the
+        ready ones if ready is True and only those matching the query if
+        given).
+        """
+        return list(islice(self.iter_sorted_tasks(status, ready, query,
+                                                  lazy=bool(limit)),
+                           limit or None))
+
+    def iter_sorted_tasks(self, status: Status = Status.UNKNOWN,
+                          ready: bool = False, query: Query | None = None,
+                          lazy: bool = False) \
+            -> Generator[Task, None, None]:
+        """
+        Generator of all Task instances or those with a given status in the
+        same order as get_task_list(). The filtering and sorting is done over
+        the columns and each Task instance is built only when requested, so
+        consuming just the first few tasks is much cheaper than building all
+        of them. If ready is True only the tasks that are not blocked by open
+        tasks are generated, read directly from the maintained ready column.
+        If a query(see query.py) is given, its plan selects and orders the
+        rows instead. With lazy, the rows are ordered as they are consumed
+        (see TaskColumns.iter_sorted_rows()) so that the first tasks do not
+        wait for a sort of all of them, for the pager and the limits.
+        """
+        columns = self.columns()
+        if query is not None:
+            return columns.tasks(query.plan(columns, status, ready).rows())
+        rows = columns.ready_rows(status) if ready else columns.rows(status)
+        if lazy:
+            return columns.tasks(columns.iter_sorted_rows(rows))
+        return columns.tasks(columns.sort_rows(rows))
 
-    def get_task_list(self, status: Status = Status.UNKNOWN) \
+    def get_task_list(self, status: Status = Status.UNKNOWN, limit: int = 0,
+                      ready: bool = False, query: Query | None = None) \
             -> List[Dict[str, str]]:
         """
-        Method to get a sorted list of all tasks or those with a given status.
+        Method to get a sorted list of all tasks or those with a given status
+        (only the first limit ones if limit is not 0, only the ready ones if
+        ready is True and only those matching the query if given).
+        """
+        return [task.to_dict()
+                for task in self._sorted_tasks(status, limit, ready, query)]
+
+    def explain(self, action: ActionList):
+        """
+        Shows the plan chosen for the query of a list action, after running
+        it, with the number of rows examined and returned by each step.
         """
-        tasks: Generator[Task, None, None] = (task for _, task
-                                              in self._store.items()
-                                              if hasattr(task, "tid"))
-        if status != Status.UNKNOWN:
-            tasks = (task for task in tasks if task.status == status)
-        tasks_sorted = sorted(tasks)
-        return [task.to_dict() for task in tasks_sorted]
+        plan = cast(Query, action.query).plan(self.columns(), action.status,
+                                              action.ready)
+        returned = len(plan.rows())
+        if action.limit:
+            returned = min(returned, action.limit)
+        print("\n".join(plan.explain(returned)))
 
     def list(self, action: ActionList):
         """
         Lists the all existing tasks or those with a status specified by the
-        action parameter.
+        action parameter. The tasks are shown in a table or are streamed in
+        the machine-readable format requested by the action.
         """
 
-        data = self.get_task_list(action.status)
-        if len(data):
-            if action.status == Status.UNKNOWN:
-                print("\nList of all tasks:")
-            else:
-                print("\nList of {} tasks:".format(action.status.name.lower()))
+        if action.explain:
+            self.explain(action)
+            return
+        fmt = "table" if action.paged \
+            else resolve_format(action.output_format, sys.stdout)
+        if fmt != "table":
+            write_records((task.to_record() for task in islice(
+                self.iter_sorted_tasks(action.status, action.ready,
+                                       action.query, lazy=bool(action.limit)),
+                action.limit or None)), fmt)
+            return
 
-            show_table(data, Task.column_names(), {"Description": 60})
-        else:
-            print("There are no {}tasks.".
-                  format("" if action.status == Status.UNKNOWN
-                         else action.status.name.lower() + " "))
+        if action.paged:
+            rows = (task.to_dict() for task in islice(
+                self.iter_sorted_tasks(action.status, action.ready,
+                                       action.query, lazy=True),
+                action.limit or None))
+            first = next(rows, None)
+            if first is not None:
+                page_table(chain((first,), rows), Task.column_names(),
+                           {"Description": 60},
+                           title=self._list_title(action.status, action.ready,
+                                                  action.query))
+                return
+        for line in self.list_lines(action.status, action.limit,
+                                    action.ready, action.query):
+            print(line)
+
+    @staticmethod
+    def _list_title(status: Status, ready: bool = False,
+                    query: Query | None = None) -> str:
+        matching = " matching {}".format(query) if str(query or "") else ""
+        if status == Status.UNKNOWN:
+            return "\nList of all {}tasks{}:".format(
+                "ready " if ready else "", matching)
+        return "\nList of {}{} tasks{}:".format("ready " if ready else "",
+                                                status.name.lower(), matching)
+
+    def list_lines(self, status: Status = Status.UNKNOWN,
+                   limit: int = 0, ready: bool = False,
+                   query: Query | None = None) -> List[str]:
+        """
+        Returns the lines of the table of all tasks or those with the given
+        status(only the first limit ones if limit is not 0, only the ready
+        ones if ready is True and only those matching the query if given) as
+        shown by list or a message if there are no such tasks.
+        """
+        data = self.get_task_list(status, limit, ready, query)
+        if not len(data):
+            return ["There are no {}{}tasks{}.".
+                    format("ready " if ready else "",
+                           "" if status == Status.UNKNOWN
+                           else status.name.lower() + " ",
+                           " matching {}".format(query)
+                           if str(query or "") else "")]
+        return self._list_title(status, ready, query).split("\n") + \
+            table_lines(data, Task.column_names(), {"Description": 60})
+
+    def stats(self, action: ActionStats):
+        """
+        Shows the number of tasks per status, the number of tasks added and
+        done per day for the last action.days days and the lead time(creation
+        to done) statistics of the done tasks.
+        """
+
+        _show_stats(TaskArrays.from_columns(self.columns()), action.days)
 
     def mark(self, action: ActionMark):
         """
-        Changes the status of a task as specified by the action parameter and
-        the JSON file is updated.
+        Changes the status of the tasks specified by the action parameter and
+        the JSON file is updated once.
         """
         if not action.valid:
             if not self.test_mode:
                 print("[ERROR] Invalid mark arguments passed")
             return
-        task = self._get_task(action.task_id)
-        if task is None:
-            if not self.test_mode:
-                print("[ERROR] There is no task with task_id = {}".
-                      format(action.task_id))
+        self._before_mutation()
+        tasks = self._select_tasks(action)
+        if not tasks:
             return
-        task.status = action.new_status
+        old_statuses = [task.status for task in tasks]
         now = datetime.now(tz=timezone.utc)
-        task.updated_at = now
-        self._write()
-        if not self.error and not self.test_mode:
+        for task in tasks:
+            task.status = action.new_status
+            task.updated_at = now
+            self._record_change(task)
+            self._put(task)
+        self._commit()
+        if self.error or self.test_mode:
+            return
+        if len(tasks) == 1:
             print("Marked task with id = {} as {}".
-                  format(action.task_id, action.new_status.name.lower()))
-            show_table([task.to_dict(),], Task.column_names(),
+                  format(tasks[0].tid, action.new_status.name.lower()))
+            show_table([tasks[0].to_dict(),], Task.column_names(),
                        {"Description": 60})
+        else:
+            print("Marked {} tasks as {}, previous statuses were:".
+                  format(len(tasks), action.new_status.name.lower()))
+            self._show_summary(tasks, old_statuses)
 
 
 class TasksManager:
@@ -303,36 +1234,53 @@ class TasksManager:
     # To store the error status of one of the store or file operations.
     error = False
 
-    def __init__(self, data_fname: str | None = None) -> None:
+    # The store is loaded on first use, so that actions spanning many lists
+    # (like query) do not load the selected list.
+    _store: TaskStore | None = None
+
+    # Actions that are not recorded in the metrics: the metrics action itself
+    # and the ones that run until interrupted.
+    _unmetered = (ActionType.METRICS, ActionType.SERVE)
+
+    def __init__(self, data_fname: str | None = None,
+                 list_name: str | None = None, metrics: bool = False) -> None:
         """
-        Creates an instance of TaskStore from the default or specified JSON
-        file.
+        Prepares the TaskStore of the specified JSON file or if no file is
+        specified of the named list(default list if None) in the default data
+        directory. If metrics is True, the executed actions are recorded in
+        the metrics file of the data file(see metrics.py).
         """
 
+        self.metrics = metrics
         if data_fname is None:
             try:
-                self.file = self._default_data_fname()
+                self.file = self._default_data_fname(list_name)
             except Exception:
                 print("[ERROR] Cannot create default data directory!")
                 self.error = True
                 return
         else:
             self.file = data_fname
-        if self.error:
-            return
-        self.store = TaskStore(str(self.file))
-        if self.store.error:
-            self.error = True
 
-    def _default_data_fname(self) -> Path:
+    @property
+    def store(self) -> TaskStore:
+        """The TaskStore of the data file, loaded on first access."""
+        if self._store is None:
+            self._store = TaskStore(str(self.file))
+            if self._store.error:
+                self.error = True
+        return self._store
+
+    def _default_data_fname(self, list_name: str | None = None) -> Path:
         """
-        Helper method that returns the default JSON file location.
+        Helper method that returns the default JSON file location of the
+        named list.
         """
 
         folder = self._data_dir()
         if not folder.is_dir():
             folder.mkdir(parents=True)
-        return folder / "tasks.json"
+        return list_file(folder, list_name or default_list_name)
 
     def _data_dir(self) -> Path:
         """
@@ -358,12 +1306,73 @@ class TasksManager:
     def execute(self, action: ActionBase):
         """
         Forwards the action parameter to the TaskStore instance's
-        corresponding API method.
+        corresponding API method. The latency and the outcome of the action
+        are recorded if metrics are enabled.
+        """
+
+        if not self.metrics or self.error or action.atype in self._unmetered \
+                or getattr(action, "watch", False):
+            self._execute(action)
+            return
+        started = time.perf_counter()
+        try:
+            self._execute(action)
+        finally:
+            self._record(action, time.perf_counter() - started)
+
+    def _record(self, action: ActionBase, duration: float):
+        """
+        Helper method that records the outcome of an action that took the
+        given number of seconds in the metrics file.
+        """
+
+        store = self._store
+        try:
+            store_bytes: int | None = os.stat(self.file).st_size
+        except OSError:
+            store_bytes = None
+        record(metrics_file(str(self.file)),
+               action.atype.name.lower().replace("_", "-"), duration,
+               self.error or (store is not None and store.error),
+               load_seconds=store.load_seconds if store else None,
+               written_bytes=store.written_bytes if store else 0,
+               store_bytes=store_bytes,
+               tasks=len(store.columns())
+               if store and store.load_seconds is not None else None)
+
+    def _execute(self, action: ActionBase):
+        """
+        Helper method that executes the action without recording it.
         """
 
         if self.error:
             print("[ERROR] Cannot continue due to previous error(s)")
             return
+        if action.atype == ActionType.QUERY:
+            self.query(cast(ActionQuery, action))
+            return
+        if action.atype in (ActionType.LIST, ActionType.STATS) and \
+                cast(ActionList | ActionStats, action).stream:
+            # Served from the data file without loading the store.
+            self.stream(cast(ActionList | ActionStats, action))
+            return
+        if action.atype == ActionType.MIGRATE:
+            # The data file is converted without loading the store.
+            self.migrate(cast(ActionMigrate, action))
+            return
+        if action.atype == ActionType.METRICS:
+            self.show_metrics(cast(ActionMetrics, action))
+            return
+        if action.atype == ActionType.VERIFY:
+            self.verify(cast(ActionVerify, action))
+            return
+        if action.atype == ActionType.SALVAGE:
+            # Works on the data file even if it cannot be loaded.
+            self.salvage(cast(ActionSalvage, action))
+            return
+        if self.store.error:
+            print("[ERROR] Cannot continue due to previous error(s)")
+            return
         if action.atype == ActionType.ADD:
             self.store.add(cast(ActionAdd, action))
         elif action.atype == ActionType.UPDATE:
@@ -371,6 +1380,209 @@ class TasksManager:
         elif action.atype == ActionType.DELETE:
             self.store.delete(cast(ActionDelete, action))
         elif action.atype == ActionType.LIST:
-            self.store.list(cast(ActionList, action))
+            if cast(ActionList, action).watch:
+                self.watch_list(cast(ActionList, action))
+            else:
+                self.store.list(cast(ActionList, action))
         elif action.atype == ActionType.MARK:
             self.store.mark(cast(ActionMark, action))
+        elif action.atype == ActionType.STATS:
+            self.store.stats(cast(ActionStats, action))
+        elif action.atype == ActionType.SYNC_EXPORT:
+            self.store.sync_export(cast(ActionSyncExport, action))
+        elif action.atype == ActionType.SYNC_IMPORT:
+            self.store.sync_import(cast(ActionSyncImport, action))
+        elif action.atype == ActionType.NEXT:
+            self.store.next(cast(ActionNext, action))
+        elif action.atype == ActionType.BLOCK:
+            self.store.block(cast(ActionBlock, action))
+        elif action.atype == ActionType.UNBLOCK:
+            self.store.unblock(cast(ActionUnblock, action))
+        elif action.atype == ActionType.SERVE:
+            self.serve(cast(ActionServe, action))
+
+    def watch_list(self, action: ActionList, **kwargs):
+        """
+        Shows the table of tasks like list and keeps it up to date until
+        interrupted. The data file is checked for changes every
+        action.interval seconds with a stat() call and only the changed tasks
+        are reloaded if it was written(see TaskStore.refresh()). Only the
+        lines of the table that changed are redrawn. The keyword arguments
+        are passed to watch.watch().
+        """
+
+        store = self.store
+        watch(lambda: store.list_lines(action.status, ready=action.ready,
+                                       query=action.query),
+              store.refresh, action.interval, **kwargs)
+
+    def stream(self, action: ActionList | ActionStats):
+        """
+        Serves list and stats by reading the data file incrementally(see
+        streaming.py) instead of loading the store, so that the memory used
+        does not grow with the number of tasks. The status filter and the
+        top-N selection(--limit) are applied while the tasks are read. The
+        statistics keep only a few numbers per task(see TaskArrays).
+        """
+
+        try:
+            with open(self.file, "r") as fp:
+                if isinstance(action, ActionStats):
+                    _show_stats(TaskArrays.from_tasks(iter_tasks(fp)),
+                                action.days)
+                    return
+                tasks: Iterable[Task] = iter_tasks(fp, action.status)
+                if action.limit:
+                    tasks = top_tasks(tasks, action.limit)
+                fmt = resolve_format(action.output_format, sys.stdout)
+                if fmt != "table":
+                    write_records((task.to_record() for task in tasks), fmt)
+                elif not action.limit:
+                    print("[ERROR] The table format needs --limit with"
+                          " --stream, use --format for all the tasks.")
+                elif tasks:
+                    print(TaskStore._list_title(action.status))
+                    show_table([task.to_dict() for task in tasks],
+                               Task.column_names(), {"Description": 60})
+                else:
+                    print("There are no {}tasks.".
+                          format("" if action.status == Status.UNKNOWN
+                                 else action.status.name.lower() + " "))
+        except (OSError, ValueError):
+            print("[ERROR] cannot read data file {}"
+                  " due to possible corruption.".format(self.file))
+
+    def migrate(self, action: ActionMigrate):
+        """
+        Converts the data file to the layout version given by the action
+        parameter one task at a time, with checkpoints to resume an
+        interrupted migration and a final verification(see migration.py).
+        """
+
+        def progress(count: int):
+            print("{} tasks converted...".format(count))
+
+        try:
+            result = migrate(str(self.file), action.version, progress=progress)
+        except (OSError, ValueError) as e:
+            print("[ERROR] cannot migrate {}: {}".format(self.file, e))
+            return
+        if result["resumed"]:
+            print("Resumed an interrupted migration after {} tasks".format(
+                result["resumed"]))
+        print("Migrated {} tasks of {} from version {} to version {}".format(
+            result["tasks"], self.file, result["from"], result["to"]))
+        print("Verified the number of tasks and their checksum {:016x}".format(
+            result["checksum"]))
+
+    def verify(self, action: ActionVerify):
+        """
+        Checks every record of the data file without loading the store and
+        lists the damaged ones(see recovery.py).
+        """
+
+        try:
+            result = verify(str(self.file))
+        except OSError as e:
+            print("[ERROR] cannot read data file {}: {}".format(self.file, e))
+            return
+        for location, reason in result["damaged"]:
+            print("Damaged record at {}: {}".format(location, reason))
+        print("Checked {} records of {}(layout version {}), {} damaged".format(
+            result["records"], self.file, result["version"],
+            len(result["damaged"])))
+        if result["damaged"]:
+            print("Run the salvage sub-command to recover the intact tasks.")
+
+    def salvage(self, action: ActionSalvage):
+        """
+        Recovers the intact tasks of a damaged data file in one pass, the
+        damaged records are moved to the quarantine file(see recovery.py).
+        """
+
+        try:
+            result = salvage(str(self.file))
+        except (OSError, ValueError) as e:
+            print("[ERROR] cannot salvage {}: {}".format(self.file, e))
+            return
+        if not result["written"]:
+            print("No damaged records in {}, {} tasks".format(
+                self.file, result["recovered"]))
+            return
+        for location, reason in result["quarantined"]:
+            print("Quarantined the record at {}: {}".format(location, reason))
+        if not result["header"]:
+            print("The bookkeeping entries were damaged and rebuilt")
+        print("Recovered {} tasks of {}, the next task id is {}".format(
+            result["recovered"], self.file, result["next_tid"]))
+        if result["quarantined"]:
+            print("The damaged records were appended to {}".format(
+                quarantine_file(str(self.file))))
+
+    def show_metrics(self, action: ActionMetrics):
+        """
+        Writes the metrics recorded for the data file to the standard output
+        in the text format requested by the action parameter.
+        """
+
+        metrics = load_metrics(metrics_file(str(self.file)))
+        sys.stdout.write(render(metrics, Path(self.file).stem,
+                                action.output_format))
+
+    def serve(self, action: ActionServe):
+        """
+        Serves the tasks over a local HTTP API(see server.py) until
+        interrupted.
+        """
+
+        # Imported here as the server module depends on this module.
+        from tasktracker.server import serve
+        # The server reports errors in its responses, not on the console.
+        self.store.test_mode = True
+        try:
+            serve(self.store, action.port, action.verbose)
+        except OSError as e:
+            print("[ERROR] cannot serve on port {}: {}".format(action.port, e))
+
+    def query(self, action: ActionQuery):
+        """
+        Lists the tasks of many task lists at once. The lists are the data
+        files next to the data file of this manager. They are loaded and
+        filtered in parallel and the tasks are shown merged in the list order
+        with the name of the list of each task.
+        """
+
+        data_dir = Path(self.file).parent
+        names = action.list_names or list_names(data_dir)
+        missing = [name for name in names
+                   if not list_file(data_dir, name).is_file()]
+        if missing:
+            print("[ERROR] No such task list(s): {}".format(
+                fmt_list_of_strings(missing)))
+            return
+        files = {name: list_file(data_dir, name) for name in names}
+        merged, failed = query_lists(files, action.status,
+                                     action.max_workers, action.use_threads)
+        if failed:
+            print("[ERROR] cannot load task list(s) {} due to possible"
+                  " corruption.".format(fmt_list_of_strings(failed)))
+
+        fmt = resolve_format(action.output_format, sys.stdout)
+        if fmt != "table":
+            records = (dict(list=name, **task.to_record())
+                       for name, task in merged)
+            write_records(records, fmt, fields=["list"] + record_fields)
+            return
+
+        data = [dict(List=name, **task.to_dict()) for name, task in merged]
+        if len(data):
+            print("\nList of {}tasks in {}:".format(
+                "" if action.status == Status.UNKNOWN
+                else action.status.name.lower() + " ",
+                fmt_list_of_strings(list(files.keys()))))
+            show_table(data, ["List"] + Task.column_names(),
+                       {"Description": 60})
+        else:
+            print("There are no {}tasks.".
+                  format("" if action.status == Status.UNKNOWN
+                         else action.status.name.lower() + " "))
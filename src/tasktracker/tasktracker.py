@@ -13,17 +13,22 @@ __email__ = "dennisfrancis.in@gmail.com"
 
 
 import sys
-from tasktracker.cmdline import get_action, show_usage
+from tasktracker.cmdline import get_action, show_usage, split_list_option
 from tasktracker.tasks import TasksManager
 
 
 def main():
-    action = get_action(sys.argv, show_help=True)
+    parsed = split_list_option(sys.argv)
+    if parsed is None:
+        show_usage()
+        sys.exit(1)
+    list_name, args = parsed
+    action = get_action(args, show_help=True)
     if action is None:
         show_usage()
         sys.exit(1)
 
-    tm = TasksManager()
+    tm = TasksManager(list_name=list_name, metrics=True)
     tm.execute(action=action)
 
 
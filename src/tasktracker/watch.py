@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+
+"""\
+Watch mode support: cheap detection of changes of a data file and incremental
+redrawing of a screen of lines on a terminal.
+
+A data file is checked in two steps. First its stat signature(modification
+time, size and inode) is compared, which costs a single stat() call and no
+reads. Only if the signature differs, the "generation" counter and the random
+"write_id" that TaskStore writes at the very beginning of the file are read
+and compared, so that a file that was only touched or rewritten with the same
+content is not reloaded. The write id tells apart the writes of two
+processes that loaded the same generation and wrote the same next one.
+"""
+
+import os
+import re
+import shutil
+import sys
+import time
+from typing import Callable, List, TextIO, Tuple
+
+# The generation and write id entries are written first in the data file,
+# only preceded by the format name and the version in the layouts after
+# version 1, see formats.header(). Older files have no write id.
+_generation_re = re.compile(
+    rb'^\{(?:"format": "[^"]*", "version": \d+, )?"generation": (\d+)'
+    rb'(?:, "write_id": "([0-9a-f]*)")?')
+
+# Number of bytes read from the start of the data file to find the generation.
+_header_size = 128
+
+
+def file_signature(fname: str) -> Tuple[int, int, int] | None:
+    """Returns the (modification time in ns, size, inode) of the file or None
+    if it does not exist."""
+    try:
+        st = os.stat(fname)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+def read_stamp(fname: str) -> Tuple[int, str | None] | None:
+    """Returns the (generation, write id or None) stored at the beginning of a
+    data file or None if the file cannot be read or has no generation."""
+    try:
+        with open(fname, "rb") as fp:
+            header = fp.read(_header_size)
+    except OSError:
+        return None
+    match = _generation_re.match(header)
+    if match is None:
+        return None
+    write_id = match.group(2)
+    return int(match.group(1)), \
+        write_id.decode() if write_id is not None else None
+
+
+def read_generation(fname: str) -> int | None:
+    """Returns the generation stored at the beginning of a data file or None
+    if the file cannot be read or has no generation."""
+    stamp = read_stamp(fname)
+    return stamp[0] if stamp is not None else None
+
+
+class FileWatcher:
+    """
+    FileWatcher tells whether a data file has changed since the last call of
+    changed() (or since the watcher was created).
+    """
+
+    def __init__(self, fname: str) -> None:
+        self.fname = fname
+        self.reset()
+
+    def reset(self):
+        """Takes the current state of the data file as the unchanged state,
+        for example after the watching process wrote the file itself."""
+        self.signature = file_signature(self.fname)
+        self.stamp = read_stamp(self.fname)
+
+    def changed(self) -> bool:
+        """Returns True if the data file has changed. Costs one stat() call if
+        the file was not written and one small read if it was written."""
+        signature = file_signature(self.fname)
+        if signature == self.signature:
+            return False
+        self.signature = signature
+        stamp = read_stamp(self.fname)
+        if stamp is not None and stamp == self.stamp:
+            return False
+        self.stamp = stamp
+        return True
+
+
+class ScreenUpdater:
+    """
+    ScreenUpdater shows a screen of lines on a terminal and on updates
+    rewrites only the lines that differ from the ones shown, using ANSI
+    cursor positioning. The whole screen is redrawn on the first update and
+    when the terminal is resized.
+    """
+
+    def __init__(self, stream: TextIO | None = None) -> None:
+        self.stream = stream if stream is not None else sys.stdout
+        self.lines: List[str] = []
+        self.size = None
+        self.first = True
+
+    def resized(self) -> bool:
+        """Returns True if the terminal was resized since the last update."""
+        return not self.first and shutil.get_terminal_size() != self.size
+
+    def update(self, lines: List[str]) -> int:
+        """Shows the given lines and returns the number of lines written."""
+        out = []
+        size = shutil.get_terminal_size()
+        if self.first or size != self.size:
+            out.append("\033[2J\033[H")  # clear the screen
+            self.lines = []
+            self.first = False
+            self.size = size
+        written = 0
+        for idx, line in enumerate(lines):
+            if idx < len(self.lines) and self.lines[idx] == line:
+                continue
+            # Move to the start of the line, write it and clear the rest.
+            out.append("\033[{};1H{}\033[K".format(idx + 1, line))
+            written += 1
+        if len(lines) < len(self.lines):
+            # Clear the lines left from a longer screen.
+            out.append("\033[{};1H\033[J".format(len(lines) + 1))
+        # Park the cursor below the screen.
+        out.append("\033[{};1H".format(len(lines) + 1))
+        self.lines = list(lines)
+        self.stream.write("".join(out))
+        self.stream.flush()
+        return written
+
+
+def watch(render: Callable[[], List[str]], changed: Callable[[], bool],
+          interval: float, stream: TextIO | None = None,
+          sleep: Callable[[float], None] = time.sleep,
+          max_checks: int = 0):
+    """
+    Shows the lines produced by render and re-renders them whenever changed()
+    returns True. The checks are done every interval seconds until the user
+    interrupts(Ctrl+C).
+
+    Keyword arguments:
+    render     : function returning the lines to be shown.
+    changed    : function telling whether the shown data may have changed.
+    interval   : seconds to sleep between the checks.
+    stream     : (Optional) the output stream (default stdout).
+    sleep      : (Optional) function used to wait between the checks.
+    max_checks : (Optional) stop after this many checks, 0 means never.
+    """
+    screen = ScreenUpdater(stream)
+    screen.update(render())
+    checks = 0
+    try:
+        while max_checks <= 0 or checks < max_checks:
+            sleep(interval)
+            checks += 1
+            if changed() or screen.resized():
+                screen.update(render())
+    except KeyboardInterrupt:
+        screen.stream.write("\n")
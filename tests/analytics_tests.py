@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+
+"""Unit tests for the task statistics functions"""
+
+import unittest
+import sys
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+
+source_dir = Path(__file__).parent.parent.resolve() / "src"
+sys.path.append(str(source_dir))
+
+from tasktracker import analytics
+from tasktracker.analytics import TaskArrays
+from tasktracker.status import Status
+from tasktracker.tasks import Task
+
+class TestAnalytics(unittest.TestCase):
+
+    def setUp(self):
+        now = datetime.now(tz=timezone.utc)
+        self.tasks = []
+        # Task i is done after i and a half hours, tasks with even ids are still todo.
+        for tid in range(1, 11):
+            task = Task()
+            task.tid = tid
+            task.description = "Task {}".format(tid)
+            task.status = Status.TODO if tid % 2 == 0 else Status.DONE
+            task.created_at = now - timedelta(hours=tid, minutes=30)
+            task.updated_at = now
+            self.tasks.append(task)
+        self.arrays = TaskArrays.from_tasks(self.tasks)
+
+    def _check_all_paths(self, func, *args):
+        """Runs func with and without the NumPy fast path and checks that
+        both agree."""
+        result = func(*args)
+        numpy = analytics.np
+        analytics.np = None
+        try:
+            self.assertEqual(func(*args), result, "NumPy and stdlib paths disagree")
+        finally:
+            analytics.np = numpy
+        return result
+
+    def test_status_counts(self):
+        counts = self._check_all_paths(analytics.status_counts, self.arrays)
+        self.assertEqual(counts, {Status.TODO: 5, Status.IN_PROGRESS: 0, Status.DONE: 5})
+
+    def test_throughput_per_day(self):
+        days = self._check_all_paths(analytics.throughput_per_day, self.arrays, 3)
+        self.assertEqual(len(days), 3)
+        self.assertEqual(sum(added for _, added, _ in days), 10)
+        self.assertEqual(days[-1][2], 5, "all done tasks were updated today")
+
+    def test_lead_times(self):
+        summary = self._check_all_paths(analytics.lead_time_summary, self.arrays)
+        self.assertAlmostEqual(summary["min"], 1.5 * 3600, delta=1)
+        self.assertAlmostEqual(summary["max"], 9.5 * 3600, delta=1)
+        self.assertAlmostEqual(summary["p50"], 5.5 * 3600, delta=1)
+        histogram = self._check_all_paths(analytics.lead_time_histogram, self.arrays)
+        self.assertEqual(dict(histogram)["< 1 day"], 5)
+        self.assertEqual(dict(histogram)["< 1 hour"], 0)
+
+    def test_empty(self):
+        arrays = TaskArrays.from_tasks([])
+        self.assertEqual(analytics.lead_time_summary(arrays), {})
+        self.assertEqual(sum(analytics.status_counts(arrays).values()), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
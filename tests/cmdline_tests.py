@@ -9,8 +9,10 @@ sys.path.append(str(source_dir))
 
 print(str(source_dir))
 
-from tasktracker.actions import ActionAdd, ActionDelete, ActionList, ActionMark, ActionUpdate
-from tasktracker.cmdline import get_action
+from tasktracker.actions import ActionAdd, ActionDelete, ActionList, ActionMark, ActionUpdate, ActionStats, ActionQuery
+from tasktracker.actions import ActionSyncExport, ActionSyncImport, ActionServe, ActionNext
+from tasktracker.actions import ActionBlock, ActionUnblock, ActionMigrate, ActionMetrics
+from tasktracker.cmdline import get_action, split_list_option
 from tasktracker.status import Status
 
 program_name = "task-tracker"
@@ -43,6 +45,20 @@ class TestAddParser(unittest.TestCase):
         self.assertIsInstance(action, ActionAdd, "must return an instance of ActionAdd")
         self.assertEqual(action.task_description, "Task1", "incorrect task description parsed")
 
+    def test_add_task_fields(self):
+        action = get_action([program_name, "add", "TaskDesc", "--priority=9", "--due", "2026-01-31"])
+        self.assertIsInstance(action, ActionAdd, "must return an instance of ActionAdd")
+        self.assertEqual(action.priority, 9)
+        self.assertEqual((action.due.year, action.due.month, action.due.day), (2026, 1, 31))
+        self.assertIsNone(get_action([program_name, "add", "TaskDesc", "--due", "none"]),
+                          "the due date cannot be cleared when adding a task")
+
+    def test_add_end_of_options(self):
+        self.assertIsNone(get_action([program_name, "add", "--foo"]), "unknown options must be rejected")
+        action = get_action([program_name, "add", "--priority", "2", "--", "--fix the --verbose flag"])
+        self.assertIsInstance(action, ActionAdd, "the arguments after -- must be positional")
+        self.assertEqual((action.task_description, action.priority), ("--fix the --verbose flag", 2))
+
 
 class TestUpdateParser(unittest.TestCase):
 
@@ -64,6 +80,18 @@ class TestUpdateParser(unittest.TestCase):
         self.assertEqual(action.task_id, 1, "incorrect task_id parsed")
         self.assertEqual(action.task_description, "TaskDesc", "incorrect task_description parsed")
 
+    def test_update_task_fields(self):
+        action = get_action([program_name, "update", "1", "--priority", "3"])
+        self.assertIsInstance(action, ActionUpdate, "must return an instance of ActionUpdate")
+        self.assertIsNone(action.task_description, "the description must be kept")
+        self.assertEqual(action.priority, 3)
+        action = get_action([program_name, "update", "1", "TaskDesc", "--due", "none"])
+        self.assertEqual((action.task_description, action.due, action.clear_due), ("TaskDesc", None, True))
+        self.assertIsNone(get_action([program_name, "update", "1", "--priority", "10"]),
+                          "must return None for a priority out of range")
+        self.assertIsNone(get_action([program_name, "update", "1", "--due", "tomorrow"]),
+                          "must return None for an invalid due date")
+
 
 class TestDeleteParser(unittest.TestCase):
 
@@ -84,6 +112,25 @@ class TestDeleteParser(unittest.TestCase):
         self.assertIsInstance(action, ActionDelete, "must return an instance of ActionDelete")
         self.assertEqual(action.task_id, 45, "incorrect task_id parsed")
 
+    def test_delete_id_ranges(self):
+        action = get_action([program_name, "delete", "1-3,7,2"])
+        self.assertIsInstance(action, ActionDelete, "must return an instance of ActionDelete")
+        self.assertEqual(list(action.task_ids), [1, 2, 3, 7], "incorrect task_ids parsed")
+        self.assertIsNone(get_action([program_name, "delete", "3-1"]),
+                          "must return None for a reversed range")
+        self.assertIsNone(get_action([program_name, "delete", "1-"]),
+                          "must return None for an incomplete range")
+
+    def test_delete_filters(self):
+        action = get_action([program_name, "delete", "--status", "done", "--updated-before", "2026-09-01"])
+        self.assertIsInstance(action, ActionDelete, "must return an instance of ActionDelete")
+        self.assertEqual(action.task_filter.status, Status.DONE, "incorrect status filter parsed")
+        self.assertEqual(action.task_filter.updated_before.day, 1, "incorrect date filter parsed")
+        self.assertIsNone(get_action([program_name, "delete", "1", "--status", "done"]),
+                          "must return None if both task ids and filters are passed")
+        self.assertIsNone(get_action([program_name, "delete", "--updated-before", "yesterday"]),
+                          "must return None for an invalid date")
+
 
 class TestMarkParser(unittest.TestCase):
 
@@ -121,6 +168,25 @@ class TestMarkParser(unittest.TestCase):
         self.assertEqual(action.task_id, 1, "incorrect task_id parsed")
         self.assertEqual(action.new_status, Status.DONE, "incorrect status parsed")
 
+    def test_mark_id_ranges(self):
+        action = get_action([program_name, "mark", "1-500,612", "done"])
+        self.assertIsInstance(action, ActionMark, "must return instance of ActionMark")
+        self.assertEqual(len(action.task_ids), 501, "incorrect task_ids parsed")
+        self.assertEqual(action.task_ids[-1], 612, "incorrect task_ids parsed")
+        self.assertEqual(action.new_status, Status.DONE, "incorrect status parsed")
+
+    def test_mark_filters(self):
+        action = get_action([program_name, "mark", "--status", "in_progress",
+                             "--updated-after=2026-09-01T10:30", "done"])
+        self.assertIsInstance(action, ActionMark, "must return instance of ActionMark")
+        self.assertEqual(action.task_filter.status, Status.IN_PROGRESS, "incorrect status filter parsed")
+        self.assertEqual(action.task_filter.updated_after.minute, 30, "incorrect date filter parsed")
+        self.assertEqual(action.new_status, Status.DONE, "incorrect status parsed")
+        self.assertIsNone(get_action([program_name, "mark", "--status", "todo"]),
+                          "must return None if the new status is missing")
+        self.assertIsNone(get_action([program_name, "mark", "--status", "blocked", "done"]),
+                          "must return None for an invalid status filter")
+
 
 class TestListParser(unittest.TestCase):
 
@@ -148,6 +214,218 @@ class TestListParser(unittest.TestCase):
         self.assertIsInstance(action, ActionList, "must return an instance of ActionList")
         self.assertEqual(action.status, Status.DONE, "incorrect status parsed")
 
+    def test_list_format(self):
+        action = get_action([program_name, "list", "--format", "jsonl"])
+        self.assertIsInstance(action, ActionList, "must return an instance of ActionList")
+        self.assertEqual(action.status, Status.UNKNOWN, "incorrect status parsed")
+        self.assertEqual(action.output_format, "jsonl", "incorrect format parsed")
+        action = get_action([program_name, "list", "todo", "--format=csv"])
+        self.assertEqual(action.status, Status.TODO, "incorrect status parsed")
+        self.assertEqual(action.output_format, "csv", "incorrect format parsed")
+        action = get_action([program_name, "list", "done"])
+        self.assertIsNone(action.output_format, "format must be None when not specified")
+
+    def test_list_page(self):
+        action = get_action([program_name, "list", "todo", "--page"])
+        self.assertIsInstance(action, ActionList, "must return an instance of ActionList")
+        self.assertTrue(action.paged, "--page must enable paging")
+        self.assertFalse(get_action([program_name, "list"]).paged, "paging must be off by default")
+        action = get_action([program_name, "list", "--page", "--format", "json"])
+        self.assertIsNone(action, "must return None if --page is used with a machine-readable format")
+
+    def test_list_watch(self):
+        action = get_action([program_name, "list", "in_progress", "--watch", "--interval", "0.5"])
+        self.assertIsInstance(action, ActionList, "must return an instance of ActionList")
+        self.assertTrue(action.watch, "--watch not parsed")
+        self.assertEqual(action.interval, 0.5, "incorrect interval parsed")
+        self.assertIsNone(get_action([program_name, "list", "--interval", "2"]),
+                          "must return None if --interval is passed without --watch")
+        self.assertIsNone(get_action([program_name, "list", "--watch", "--page"]),
+                          "must return None if --watch is combined with --page")
+        self.assertIsNone(get_action([program_name, "list", "--watch", "--interval", "0"]),
+                          "must return None if --interval is not positive")
+
+    def test_list_stream(self):
+        action = get_action([program_name, "list", "todo", "--stream", "--limit", "10"])
+        self.assertIsInstance(action, ActionList, "must return an instance of ActionList")
+        self.assertEqual((action.stream, action.limit), (True, 10))
+        self.assertIsNone(get_action([program_name, "list", "--stream", "--page"]),
+                          "must return None if --stream is combined with --page")
+        self.assertIsNone(get_action([program_name, "list", "--limit", "0"]),
+                          "must return None if --limit is not positive")
+        self.assertTrue(get_action([program_name, "stats", "--stream"]).stream)
+
+    def test_list_ready(self):
+        action = get_action([program_name, "list", "todo", "--ready"])
+        self.assertIsInstance(action, ActionList, "must return an instance of ActionList")
+        self.assertTrue(action.ready)
+        self.assertEqual(action.status, Status.TODO)
+        self.assertIsNone(get_action([program_name, "list", "--ready", "--stream"]),
+                          "must return None if --ready is used with --stream")
+
+    def test_list_query(self):
+        action = get_action([program_name, "list", "todo", "--where", "updated>2026-09-01 and description~deploy",
+                             "--sort=priority desc, due", "--explain"])
+        self.assertIsInstance(action, ActionList, "must return an instance of ActionList")
+        self.assertEqual(str(action.query), "updated > 2026-09-01 and description ~ deploy")
+        self.assertEqual(action.query.sort, [("priority", True), ("due", False)])
+        self.assertTrue(action.explain)
+        self.assertIsNone(get_action([program_name, "list"]).query, "no query must be compiled without --where")
+        for where in ["status=late", "priority>high", "size=1", "status<todo", "(id=1", "id=1 and", "due>none"]:
+            action = ActionList(["--where", where])
+            self.assertFalse(action.valid, "must be invalid for --where " + where)
+            self.assertTrue(action.error, "must tell why --where {} is invalid".format(where))
+        self.assertIsNone(get_action([program_name, "list", "--sort", "priority up"]))
+        self.assertIsNone(get_action([program_name, "list", "--where", "id=1", "--stream"]),
+                          "must return None if --where is used with --stream")
+        self.assertIsNone(get_action([program_name, "list", "--explain", "--watch"]),
+                          "must return None if --explain is used with --watch")
+
+    def test_list_invalid_format(self):
+        action = get_action([program_name, "list", "--format", "xml"])
+        self.assertIsNone(action, "must return None for an unsupported format")
+        action = get_action([program_name, "list", "--format"])
+        self.assertIsNone(action, "must return None if --format has no value")
+
+
+class TestStatsParser(unittest.TestCase):
+
+    def test_stats_no_arg(self):
+        action = get_action([program_name, "stats"])
+        self.assertIsInstance(action, ActionStats, "must return an instance of ActionStats")
+        self.assertEqual(action.days, 14, "default number of days must be 14")
+
+    def test_stats_days(self):
+        action = get_action([program_name, "stats", "--days", "7"])
+        self.assertIsInstance(action, ActionStats, "must return an instance of ActionStats")
+        self.assertEqual(action.days, 7, "incorrect days parsed")
+        action = get_action([program_name, "stats", "--days=30"])
+        self.assertEqual(action.days, 30, "incorrect days parsed")
+
+    def test_stats_invalid_args(self):
+        self.assertIsNone(get_action([program_name, "stats", "todo"]),
+                          "must return None if a positional argument was passed")
+        self.assertIsNone(get_action([program_name, "stats", "--days"]),
+                          "must return None if --days has no value")
+        self.assertIsNone(get_action([program_name, "stats", "--days", "0"]),
+                          "must return None if --days is not positive")
+        self.assertIsNone(get_action([program_name, "stats", "--weeks", "2"]),
+                          "must return None if an unknown option was passed")
+
+
+class TestQueryParser(unittest.TestCase):
+
+    def test_query_no_arg(self):
+        action = get_action([program_name, "query"])
+        self.assertIsInstance(action, ActionQuery, "must return an instance of ActionQuery")
+        self.assertEqual(action.status, Status.UNKNOWN, "status must be UNKNOWN by default")
+        self.assertEqual(action.list_names, [], "all lists must be queried by default")
+        self.assertFalse(action.use_threads, "processes must be used by default")
+
+    def test_query_options(self):
+        action = get_action([program_name, "query", "todo", "--lists", "team-a,team_b",
+                             "--workers=2", "--threads", "--format", "csv"])
+        self.assertIsInstance(action, ActionQuery, "must return an instance of ActionQuery")
+        self.assertEqual(action.status, Status.TODO, "incorrect status parsed")
+        self.assertEqual(action.list_names, ["team-a", "team_b"], "incorrect list names parsed")
+        self.assertEqual(action.max_workers, 2, "incorrect number of workers parsed")
+        self.assertTrue(action.use_threads, "--threads not parsed")
+        self.assertEqual(action.output_format, "csv", "incorrect format parsed")
+
+    def test_query_invalid_args(self):
+        self.assertIsNone(get_action([program_name, "query", "--lists", "../etc"]),
+                          "must return None for an invalid list name")
+        self.assertIsNone(get_action([program_name, "query", "--workers", "0"]),
+                          "must return None if --workers is not positive")
+        self.assertIsNone(get_action([program_name, "query", "todo", "done"]),
+                          "must return None if more than one status is passed")
+
+    def test_split_list_option(self):
+        self.assertEqual(split_list_option([program_name, "list"]), (None, [program_name, "list"]))
+        self.assertEqual(split_list_option([program_name, "--list", "work", "list", "todo"]),
+                         ("work", [program_name, "list", "todo"]))
+        self.assertEqual(split_list_option([program_name, "-l=work", "list"]),
+                         ("work", [program_name, "list"]))
+        self.assertIsNone(split_list_option([program_name, "--list"]),
+                          "must return None if the list name is missing")
+        self.assertIsNone(split_list_option([program_name, "--list", "a/b", "list"]),
+                          "must return None for an invalid list name")
+
+
+class TestSyncParser(unittest.TestCase):
+
+    def test_sync_export(self):
+        action = get_action([program_name, "sync-export"])
+        self.assertIsInstance(action, ActionSyncExport, "must return an instance of ActionSyncExport")
+        self.assertEqual(action.since, 0, "all changes must be exported by default")
+        self.assertEqual(get_action([program_name, "sync-export", "--since", "42"]).since, 42)
+        self.assertIsNone(get_action([program_name, "sync-export", "--since", "-1"]),
+                          "must return None if --since is negative")
+
+    def test_sync_import(self):
+        action = get_action([program_name, "sync-import"])
+        self.assertIsInstance(action, ActionSyncImport, "must return an instance of ActionSyncImport")
+        self.assertEqual(action.fname, "-", "standard input must be read by default")
+        self.assertEqual(get_action([program_name, "sync-import", "changes.json"]).fname, "changes.json")
+        self.assertIsNone(get_action([program_name, "sync-import", "a.json", "b.json"]),
+                          "must return None if more than one file is passed")
+
+    def test_serve(self):
+        action = get_action([program_name, "serve"])
+        self.assertIsInstance(action, ActionServe, "must return an instance of ActionServe")
+        self.assertEqual(action.port, 8765, "incorrect default port")
+        action = get_action([program_name, "serve", "--port=9000", "--verbose"])
+        self.assertEqual((action.port, action.verbose), (9000, True))
+        self.assertIsNone(get_action([program_name, "serve", "--port", "70000"]),
+                          "must return None for an invalid port")
+
+
+class TestNextParser(unittest.TestCase):
+
+    def test_next(self):
+        action = get_action([program_name, "next"])
+        self.assertIsInstance(action, ActionNext, "must return an instance of ActionNext")
+        self.assertEqual(action.count, 1, "one task must be shown by default")
+        self.assertEqual(get_action([program_name, "next", "5"]).count, 5)
+        self.assertIsNone(get_action([program_name, "next", "0"]), "must return None if n < 1")
+        self.assertIsNone(get_action([program_name, "next", "1", "2"]))
+
+
+class TestBlockParser(unittest.TestCase):
+
+    def test_block(self):
+        action = get_action([program_name, "block", "5", "1-3,7"])
+        self.assertIsInstance(action, ActionBlock, "must return an instance of ActionBlock")
+        self.assertEqual((action.task_id, list(action.blocker_ids)), (5, [1, 2, 3, 7]))
+        action = get_action([program_name, "unblock", "5", "2"])
+        self.assertIsInstance(action, ActionUnblock, "must return an instance of ActionUnblock")
+        self.assertEqual((action.task_id, list(action.blocker_ids)), (5, [2]))
+
+    def test_block_invalid_args(self):
+        self.assertIsNone(get_action([program_name, "block", "5"]), "must return None without blockers")
+        self.assertIsNone(get_action([program_name, "block", "x", "1"]), "must return None for an invalid id")
+        self.assertIsNone(get_action([program_name, "unblock", "5", "3-1"]),
+                          "must return None for invalid blocker ids")
+
+
+class TestMaintenanceParser(unittest.TestCase):
+
+    def test_migrate(self):
+        action = get_action([program_name, "migrate"])
+        self.assertIsInstance(action, ActionMigrate, "must return an instance of ActionMigrate")
+        self.assertEqual(action.version, 3, "must migrate to the latest version by default")
+        self.assertEqual(get_action([program_name, "migrate", "--to", "1"]).version, 1)
+        self.assertIsNone(get_action([program_name, "migrate", "--to", "7"]),
+                          "must return None for an unknown version")
+
+    def test_metrics(self):
+        action = get_action([program_name, "metrics"])
+        self.assertIsInstance(action, ActionMetrics, "must return an instance of ActionMetrics")
+        self.assertEqual(action.output_format, "openmetrics")
+        self.assertEqual(get_action([program_name, "metrics", "--format=prometheus"]).output_format,
+                         "prometheus")
+        self.assertIsNone(get_action([program_name, "metrics", "--format", "xml"]))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+
+"""Unit tests for the columnar task engine"""
+
+import unittest
+import sys
+import io
+import json
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+
+source_dir = Path(__file__).parent.parent.resolve() / "src"
+sys.path.append(str(source_dir))
+
+from tasktracker.columnar import TaskColumns
+from tasktracker.model import Task, TaskDecoder, TaskEncoder
+from tasktracker.status import Status
+
+class TestTaskColumns(unittest.TestCase):
+
+    def setUp(self):
+        now = datetime.now(tz=timezone.utc)
+        statuses = [Status.TODO, Status.IN_PROGRESS, Status.DONE]
+        self.tasks = []
+        for tid in range(1, 21):
+            task = Task()
+            task.tid = tid
+            task.description = "Task {}".format(tid)
+            task.status = statuses[tid % 3]
+            task.created_at = now - timedelta(days=tid, microseconds=tid)
+            task.updated_at = now - timedelta(hours=(tid * 7) % 13, microseconds=tid)
+            self.tasks.append(task)
+        self.columns = TaskColumns()
+        for task in self.tasks:
+            self.columns.put(task)
+        self.columns.meta["next_tid"] = 21
+
+    def assertSameTask(self, actual: Task, expected: Task):
+        self.assertEqual((actual.tid, actual.description, actual.status, actual.created_at, actual.updated_at),
+                         (expected.tid, expected.description, expected.status, expected.created_at,
+                          expected.updated_at))
+
+    def test_put_get_remove(self):
+        self.assertEqual(len(self.columns), 20)
+        self.assertSameTask(self.columns.get(7), self.tasks[6])
+        self.assertIsNone(self.columns.get(0))
+        self.assertIsNone(self.columns.get(100))
+        self.assertTrue(self.columns.remove(7))
+        self.assertFalse(self.columns.remove(7), "a deleted task cannot be deleted again")
+        self.assertIsNone(self.columns.get(7))
+        self.assertNotIn(7, self.columns)
+        self.assertEqual(len(self.columns), 19)
+        self.assertNotIn(7, self.columns.rows())
+        self.assertNotIn(7, self.columns.rows(self.tasks[6].status))
+
+    def test_sort_matches_task_order(self):
+        self.columns.remove(3)
+        for status in (Status.UNKNOWN, Status.TODO, Status.DONE):
+            rows = self.columns.sort_rows(self.columns.rows(status))
+            expected = sorted(task for task in self.tasks
+                              if task.tid != 3 and status in (Status.UNKNOWN, task.status))
+            self.assertEqual(rows, [task.tid for task in expected])
+            self.assertEqual(list(self.columns.iter_sorted_rows(self.columns.rows(status))), rows,
+                             "the lazy order must be the one of sort_rows")
+
+    def test_dump_and_load(self):
+        self.columns.remove(4)
+        self.columns.meta["extra_key"] = [1, 2]
+        fp = io.StringIO()
+        self.columns.dump(fp)
+        # The dump must be readable by the plain JSON decoder.
+        store = json.loads(fp.getvalue(), cls=TaskDecoder)
+        self.assertEqual(store["next_tid"], 21)
+        self.assertNotIn("4", store)
+        self.assertSameTask(store["5"], self.tasks[4])
+        self.assertEqual(json.loads(fp.getvalue()), json.loads(json.dumps(store, cls=TaskEncoder)))
+
+        fp.seek(0)
+        columns = TaskColumns.load(fp)
+        self.assertEqual(len(columns), 19)
+        self.assertEqual(columns.meta, {"next_tid": 21, "extra_key": [1, 2]})
+        for task in self.tasks:
+            if task.tid != 4:
+                self.assertSameTask(columns.get(task.tid), task)
+        self.assertIsNone(columns.get(4))
+
+    def test_extra_fields_round_trip(self):
+        task = self.columns.get(2)
+        task.note = "kept"
+        self.columns.put(task)
+        self.assertEqual(self.columns.get(2).note, "kept")
+        self.assertFalse(hasattr(self.columns.get(1), "note"))
+
+    def test_copy_is_independent(self):
+        copied = self.columns.copy()
+        task = self.columns.get(1)
+        task.description = "changed"
+        self.columns.put(task)
+        self.columns.remove(2)
+        self.assertEqual(copied.get(1).description, "Task 1")
+        self.assertIsNotNone(copied.get(2))
+        self.assertEqual(len(copied), 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+
+"""Unit tests for the persistent operation metrics"""
+
+import unittest
+import sys
+import io
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from pathlib import Path
+
+current_dir = Path(__file__).parent
+source_dir = current_dir.parent.resolve() / "src"
+test_write_dir = current_dir / "write"
+sys.path.append(str(source_dir))
+
+from tasktracker.actions import ActionAdd, ActionList, ActionMetrics
+from tasktracker.metrics import load_metrics, lock_file, metrics_file, record
+from tasktracker.tasks import TasksManager
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = test_write_dir
+        if not self.tmpdir.is_dir():
+            self.tmpdir.mkdir()
+        self.data_file = self.tmpdir / "tasks.json"
+        self.files = [self.data_file, metrics_file(str(self.data_file)),
+                      lock_file(metrics_file(str(self.data_file)))]
+        self._cleanup()
+
+    def tearDown(self):
+        self._cleanup()
+        self.tmpdir.rmdir()
+
+    def _cleanup(self):
+        for data_file in self.files:
+            if data_file.is_file():
+                data_file.unlink()
+
+    def _execute(self, action, metrics: bool = True) -> str:
+        output = io.StringIO()
+        with redirect_stdout(output):
+            TasksManager(str(self.data_file), metrics = metrics).execute(action)
+        return output.getvalue()
+
+    def _samples(self, text: str):
+        return dict(line.rsplit(" ", 1) for line in text.splitlines()
+                    if not line.startswith("#"))
+
+    def test_record_and_render(self):
+        for idx in range(3):
+            self._execute(ActionAdd(["Task {}".format(idx)]))
+        self._execute(ActionList(["--format", "jsonl"]))
+        self._execute(ActionList([]), metrics = False)
+        metrics = load_metrics(self.files[1])
+        self.assertEqual(metrics["tasks"], 3)
+        self.assertEqual(metrics["store_bytes"], self.data_file.stat().st_size)
+        self.assertGreater(metrics["written_bytes"], metrics["store_bytes"],
+                           "every write must be counted")
+
+        text = self._execute(ActionMetrics([]))
+        self.assertTrue(text.endswith("# EOF\n"))
+        samples = self._samples(text)
+        self.assertEqual(samples['tasktracker_action_duration_seconds_count{list="tasks",action="add"}'], "3")
+        self.assertEqual(samples['tasktracker_action_duration_seconds_bucket{list="tasks",action="add",le="+Inf"}'], "3")
+        self.assertEqual(samples['tasktracker_action_duration_seconds_count{list="tasks",action="list"}'], "1",
+                         "actions must not be recorded if metrics are disabled")
+        self.assertEqual(samples['tasktracker_store_load_duration_seconds_count{list="tasks"}'], "4")
+        self.assertIn("# TYPE tasktracker_action_errors counter", text)
+        buckets = [int(value) for key, value in samples.items()
+                   if key.startswith('tasktracker_action_duration_seconds_bucket{list="tasks",action="add"')]
+        self.assertEqual(buckets, sorted(buckets), "buckets must be cumulative")
+
+        text = self._execute(ActionMetrics(["--format", "prometheus"]))
+        self.assertIn("# TYPE tasktracker_action_errors_total counter", text)
+        self.assertNotIn("# EOF", text)
+
+    def test_record_errors(self):
+        self.data_file.write_text("{not json")
+        self._execute(ActionAdd(["Task"]))
+        samples = self._samples(self._execute(ActionMetrics([])))
+        self.assertEqual(samples['tasktracker_action_errors_total{list="tasks",action="add"}'], "1")
+        self.assertFalse(any(key.startswith("tasktracker_store_tasks") for key in samples),
+                         "there is no number of tasks if the store cannot be loaded")
+
+    def test_concurrent_record(self):
+        def record_many(_):
+            for _ in range(25):
+                record(self.files[1], "add", 0.001, False)
+
+        with ThreadPoolExecutor(8) as executor:
+            list(executor.map(record_many, range(8)))
+        metrics = load_metrics(self.files[1])
+        self.assertEqual(metrics["actions"]["add"]["duration"]["count"], 200,
+                         "concurrent updates must not lose counts")
+
+
+if __name__ == '__main__':
+    unittest.main()
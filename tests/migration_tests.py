@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+
+"""Unit tests for the migration between data file layouts"""
+
+import unittest
+import sys
+import io
+from contextlib import redirect_stdout
+from pathlib import Path
+
+current_dir = Path(__file__).parent
+source_dir = current_dir.parent.resolve() / "src"
+test_write_dir = current_dir / "write"
+sys.path.append(str(source_dir))
+
+from tasktracker.actions import ActionAdd, ActionBlock, ActionDelete, ActionMark, ActionMigrate
+from tasktracker.formats import detect_version
+from tasktracker.migration import migrate
+from tasktracker.streaming import iter_tasks
+from tasktracker.tasks import TaskStore, TasksManager
+from tasktracker.watch import read_generation
+
+class Interrupted(Exception):
+    pass
+
+class TestMigration(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = test_write_dir
+        if not self.tmpdir.is_dir():
+            self.tmpdir.mkdir()
+        self.data_file = self.tmpdir / "tasks.json"
+        self.files = [self.data_file, self.tmpdir / "tasks.json.migrating",
+                      self.tmpdir / "tasks.json.checkpoint"]
+        self._cleanup()
+
+    def tearDown(self):
+        self._cleanup()
+        self.tmpdir.rmdir()
+
+    def _cleanup(self):
+        for data_file in self.files:
+            if data_file.is_file():
+                data_file.unlink()
+
+    def _store(self, count: int) -> TaskStore:
+        store = TaskStore(str(self.data_file), test_mode = True)
+        with store.transaction():
+            for idx in range(count):
+                store.add(ActionAdd(["Task {}".format(idx + 1), "--priority", str(idx % 3)]))
+            store.block(ActionBlock(["2", "1"]))
+            store.mark(ActionMark(["3-9", "done"]))
+            store.delete(ActionDelete(["5"]))
+        return TaskStore(str(self.data_file), test_mode = True)
+
+    def _version(self) -> int:
+        with open(self.data_file) as fp:
+            return detect_version(fp)
+
+    def _state(self, store: TaskStore):
+        meta = dict(store.columns().meta)
+        meta.pop("generation")
+        meta.pop("write_id")
+        meta.pop("version", None)
+        return [task.__dict__ for task in store._sorted_tasks()], meta, store.columns().ready_rows()
+
+    def test_round_trip(self):
+        expected = self._state(self._store(30))
+        generation = read_generation(str(self.data_file))
+        result = migrate(str(self.data_file), 2, interval=7)
+        self.assertEqual((result["tasks"], result["resumed"]), (29, 0))
+        self.assertEqual(self._version(), 2)
+        self.assertEqual(read_generation(str(self.data_file)), generation + 1,
+                         "the generation must be incremented and readable in the new layout")
+        store = TaskStore(str(self.data_file), test_mode = True)
+        self.assertFalse(store.error)
+        self.assertEqual(self._state(store), expected, "the tasks must be the same after migration")
+        with open(self.data_file) as fp:
+            self.assertEqual(len(list(iter_tasks(fp))), 29, "the new layout must be streamable")
+
+        store.add(ActionAdd(["Task 31"]))
+        self.assertEqual(self._version(), 2, "the layout must be kept when writing")
+        expected = self._state(TaskStore(str(self.data_file), test_mode = True))
+        self.assertEqual(migrate(str(self.data_file), 1)["tasks"], 30)
+        self.assertEqual(self._version(), 1)
+        self.assertEqual(self._state(TaskStore(str(self.data_file), test_mode = True)), expected)
+        with self.assertRaises(ValueError):
+            migrate(str(self.data_file), 1)
+        self.assertEqual(migrate(str(self.data_file), 3)["tasks"], 30)
+        self.assertEqual(self._version(), 3)
+        self.assertEqual(self._state(TaskStore(str(self.data_file), test_mode = True)), expected)
+
+    def test_resume(self):
+        expected = self._state(self._store(40))
+        original = self.data_file.read_bytes()
+
+        def interrupt(count: int):
+            if count == 14:
+                raise Interrupted()
+
+        with self.assertRaises(Interrupted):
+            migrate(str(self.data_file), 2, interval=7, progress=interrupt)
+        self.assertEqual(self.data_file.read_bytes(), original,
+                         "the data file must be unchanged by an interrupted migration")
+        result = migrate(str(self.data_file), 2, interval=7)
+        self.assertEqual((result["tasks"], result["resumed"]), (39, 14))
+        self.assertEqual(self._state(TaskStore(str(self.data_file), test_mode = True)), expected)
+        self.assertFalse(self.files[1].is_file() or self.files[2].is_file(),
+                         "the converted file and the checkpoint must be removed")
+
+        # A checkpoint of a data file that changed since is not used.
+        with self.assertRaises(Interrupted):
+            migrate(str(self.data_file), 1, interval=7, progress=interrupt)
+        TaskStore(str(self.data_file), test_mode = True).add(ActionAdd(["Task 41"]))
+        result = migrate(str(self.data_file), 1, interval=7)
+        self.assertEqual((result["tasks"], result["resumed"]), (40, 0))
+
+    def test_truncated(self):
+        self._store(10)
+        lines = self.data_file.read_text().splitlines(keepends = True)
+        self.data_file.write_text("".join(lines[:-2]))
+        original = self.data_file.read_bytes()
+        with self.assertRaises(ValueError):
+            migrate(str(self.data_file), 2)
+        self.assertEqual(self.data_file.read_bytes(), original,
+                         "a truncated data file must not be migrated")
+        self.assertFalse(self.files[1].is_file() or self.files[2].is_file())
+
+    def test_migrate_action(self):
+        self._store(5)
+        output = io.StringIO()
+        with redirect_stdout(output):
+            TasksManager(str(self.data_file)).execute(ActionMigrate(["--to", "2"]))
+        self.assertIn("Migrated 4 tasks", output.getvalue())
+        self.assertEqual(self._version(), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+
+"""Unit tests for the filter and sort expressions of list and their planner"""
+
+import unittest
+import sys
+import io
+import random
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+current_dir = Path(__file__).parent
+source_dir = current_dir.parent.resolve() / "src"
+test_write_dir = current_dir / "write"
+sys.path.append(str(source_dir))
+
+from tasktracker.actions import ActionAdd, ActionList, ActionMark
+from tasktracker.columnar import TaskColumns
+from tasktracker.model import Task
+from tasktracker.query import parse_query
+from tasktracker.selection import parse_date
+from tasktracker.status import Status
+from tasktracker.tasks import TaskStore
+
+class TestQuery(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(42)
+        start = datetime(2026, 8, 1, tzinfo=timezone.utc)
+        self.columns = TaskColumns()
+        for tid in range(1, 301):
+            task = Task()
+            task.tid = tid
+            task.description = rng.choice(["Deploy the app", "Write docs", "fix deploy script", "Review"])
+            task.status = rng.choice([Status.TODO, Status.TODO, Status.IN_PROGRESS, Status.DONE])
+            task.created_at = start + timedelta(hours=rng.randrange(24 * 60))
+            task.updated_at = task.created_at + timedelta(hours=rng.randrange(24 * 30))
+            task.priority = rng.randrange(10)
+            task.due = start + timedelta(days=rng.randrange(90)) if rng.random() < 0.5 else None
+            self.columns.put(task)
+        for tid in range(1, 301, 7):
+            self.columns.remove(tid)
+        self.tasks = list(self.columns.tasks(self.columns.rows()))
+
+    def _rows(self, where=None, sort=None, **kwargs):
+        return self.columns.tasks(parse_query(where, sort).plan(self.columns, **kwargs).rows())
+
+    def _tids(self, where=None, sort=None, **kwargs):
+        return [task.tid for task in self._rows(where, sort, **kwargs)]
+
+    def test_filters(self):
+        after = parse_date("2026-09-01") + timedelta(days=1)
+        due_day = parse_date("2026-09-10")
+        cases = {
+            "status=todo and updated>2026-09-01 and description~DEPLOY":
+                lambda task: task.status == Status.TODO and task.updated_at >= after
+                and "deploy" in task.description.lower(),
+            "id>=20 and id<=80 and priority!=3":
+                lambda task: 20 <= task.tid <= 80 and task.priority != 3,
+            "not (status=done or priority<5) and due!=none":
+                lambda task: not (task.status == Status.DONE or task.priority < 5) and task.due is not None,
+            "due=2026-09-10 or description='Write docs'":
+                lambda task: (task.due is not None and due_day <= task.due < due_day + timedelta(days=1))
+                or task.description == "Write docs",
+            "due=none and id=12": lambda task: task.due is None and task.tid == 12,
+            "id<0": lambda task: False,
+        }
+        for where, matches in cases.items():
+            expected = sorted(task.tid for task in self.tasks if matches(task))
+            self.assertEqual(sorted(self._tids(where)), expected, where)
+
+    def test_sort(self):
+        expected = [task.tid for task in sorted(self.tasks, key=lambda task: (-task.priority, task.tid))]
+        self.assertEqual(self._tids(sort="priority desc, id"), expected)
+        expected = [task.tid for task in sorted(self.tasks, key=lambda task: (task.due is None, task.due or 0,
+                                                                              task.tid))]
+        self.assertEqual(self._tids(sort="due"), expected, "tasks without a due date must be last")
+        self.assertEqual(self._tids(sort="id desc"), sorted((task.tid for task in self.tasks), reverse=True))
+        self.assertEqual(self._tids(), self.columns.sort_rows(self.columns.rows()),
+                         "the default order must be the one of list")
+
+    def test_plan(self):
+        query = parse_query("description~deploy and id>100 and id<=120 and status=done")
+        plan = query.plan(self.columns)
+        self.assertEqual(plan.access.name, "id range", "the cheapest access path must be chosen")
+        self.assertEqual([str(term) for term in plan.filters], ["status = done", "description ~ deploy"],
+                         "the cheaper filters must run first")
+        rows = plan.rows()
+        self.assertEqual(plan.examined, 20)
+        lines = plan.explain()
+        self.assertIn("access id range: id > 100 and id <= 120 (20 rows scanned, {} read)".format(plan.read),
+                      lines[1])
+        self.assertEqual(lines[-1], "Rows examined: 20, rows returned: {}".format(len(rows)))
+
+        plan = parse_query("status=in_progress").plan(self.columns, ready=True)
+        self.assertEqual(plan.access.name, "status column")
+        self.assertEqual(plan.examined, 0, "examined rows must be counted when the plan runs")
+        plan.rows()
+        self.assertEqual(plan.examined, len(self.columns.tombstones) - 1,
+                         "a column scan must examine every row of the store")
+        self.assertEqual(plan.read, self.columns.status.count(Status.IN_PROGRESS.value))
+        self.assertEqual(parse_query("priority=1 or id=5").plan(self.columns).access.name, "full scan")
+
+
+class TestQueryStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = test_write_dir
+        if not self.tmpdir.is_dir():
+            self.tmpdir.mkdir()
+        self.data_file = self.tmpdir / "tasks.json"
+        if self.data_file.is_file():
+            self.data_file.unlink()
+
+    def tearDown(self):
+        if self.data_file.is_file():
+            self.data_file.unlink()
+        self.tmpdir.rmdir()
+
+    def test_list_query(self):
+        store = TaskStore(str(self.data_file), test_mode = True)
+        for args in [["Deploy api", "--priority", "2"], ["Write docs"], ["Deploy web", "--priority", "5"]]:
+            store.add(ActionAdd(args))
+        store.mark(ActionMark(["2", "done"]))
+        self.assertEqual([row["ID"] for row in store.get_task_list(
+            query=parse_query("description~deploy", "priority desc"))], ["3", "1"])
+        self.assertEqual(store.list_lines(Status.DONE, query=parse_query("priority>0")),
+                         ["There are no done tasks matching priority > 0."])
+
+        output = io.StringIO()
+        with redirect_stdout(output):
+            store.list(ActionList(["todo", "--where", "description~deploy", "--explain", "--limit", "1"]))
+        lines = output.getvalue().splitlines()
+        self.assertEqual(lines[1], "  1. access status column: status = todo (3 rows scanned, 2 read)")
+        self.assertEqual(lines[-1], "Rows examined: 3, rows returned: 1")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+
+"""Unit tests for the verification and salvage of damaged data files"""
+
+import unittest
+import sys
+import io
+import json
+from contextlib import redirect_stdout
+from pathlib import Path
+
+current_dir = Path(__file__).parent
+source_dir = current_dir.parent.resolve() / "src"
+test_write_dir = current_dir / "write"
+sys.path.append(str(source_dir))
+
+from tasktracker.actions import ActionAdd, ActionSalvage, ActionVerify
+from tasktracker.formats import detect_version
+from tasktracker.migration import migrate
+from tasktracker.recovery import quarantine_file, salvage, verify
+from tasktracker.tasks import TaskStore, TasksManager
+
+class TestRecovery(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = test_write_dir
+        if not self.tmpdir.is_dir():
+            self.tmpdir.mkdir()
+        self.data_file = self.tmpdir / "tasks.json"
+        self.data_fname = str(self.data_file)
+        self.files = [self.data_file, Path(quarantine_file(self.data_fname)),
+                      self.tmpdir / "tasks.json.salvaged"]
+        self._cleanup()
+
+    def tearDown(self):
+        self._cleanup()
+        self.tmpdir.rmdir()
+
+    def _cleanup(self):
+        for data_file in self.files:
+            if data_file.is_file():
+                data_file.unlink()
+
+    def _store(self, count: int) -> TaskStore:
+        store = TaskStore(self.data_fname, test_mode = True)
+        with store.transaction():
+            for idx in range(count):
+                store.add(ActionAdd(["Task {}".format(idx + 1)]))
+        return store
+
+    def _damage(self, old: str, new: str):
+        text = self.data_file.read_text()
+        self.assertIn(old, text)
+        self.data_file.write_text(text.replace(old, new, 1))
+
+    def _load(self) -> TaskStore:
+        with redirect_stdout(io.StringIO()):
+            return TaskStore(self.data_fname, test_mode = True)
+
+    def _descriptions(self):
+        columns = self._load().columns()
+        return sorted(columns.descriptions[row] for row in columns.rows())
+
+    def test_checksums(self):
+        self._store(10)
+        with open(self.data_file) as fp:
+            self.assertEqual(detect_version(fp), 3, "new data files must have checksums")
+        self.assertEqual(verify(self.data_fname), {"version": 3, "records": 11, "damaged": []})
+        self.assertFalse(salvage(self.data_fname)["written"], "an intact data file must not be rewritten")
+
+        # One bad byte that is still valid JSON is caught by the checksum.
+        self._damage('"Task 4"', '"Task 5"')
+        self.assertTrue(self._load().error)
+        self.assertEqual(verify(self.data_fname)["damaged"], [("line 5", "checksum mismatch")])
+        result = salvage(self.data_fname)
+        self.assertEqual((result["recovered"], result["header"], result["next_tid"]), (9, True, 11))
+        store = self._load()
+        self.assertFalse(store.error)
+        self.assertEqual(len(store.columns()), 9)
+        self.assertNotIn(4, store.columns(), "the damaged task must be quarantined")
+        records = [json.loads(line) for line in self.files[1].read_text().splitlines()]
+        self.assertEqual([(record["location"], record["reason"]) for record in records],
+                         [("line 5", "checksum mismatch")])
+        self.assertIn('"Task 5"', records[0]["text"], "the damaged record must be kept verbatim")
+
+    def test_damaged_header(self):
+        self._store(6)
+        self._damage('"next_tid": 7', '"next_tid": 7x')
+        result = salvage(self.data_fname)
+        self.assertEqual((result["recovered"], result["header"], result["next_tid"]), (6, False, 7),
+                         "next_tid must be rebuilt from the recovered tasks")
+        store = self._load()
+        self.assertEqual(store.add(ActionAdd(["Task 7"])).tid, 7)
+
+    def test_salvage_version_1(self):
+        self._store(8)
+        migrate(self.data_fname, 1)
+        self._damage('"description": "Task 3"', '"description": "Task 3')
+        self._damage('"description": "Task 6"', '"description": "Task 6", "tid": 60')
+        self.assertTrue(self._load().error)
+        result = verify(self.data_fname)
+        self.assertEqual(result["version"], 1)
+        self.assertEqual([reason for _, reason in result["damaged"]], ["invalid JSON", "invalid task id"])
+
+        output = io.StringIO()
+        with redirect_stdout(output):
+            TasksManager(self.data_fname).execute(ActionSalvage([]))
+        self.assertIn("Recovered 6 tasks", output.getvalue())
+        self.assertEqual(self._descriptions(), ["Task 1", "Task 2", "Task 4", "Task 5", "Task 7", "Task 8"])
+        with open(self.data_file) as fp:
+            self.assertEqual(detect_version(fp), 3, "the salvaged store must be written with checksums")
+        output = io.StringIO()
+        with redirect_stdout(output):
+            TasksManager(self.data_fname).execute(ActionVerify([]))
+        self.assertIn("Checked 7 records", output.getvalue())
+        self.assertIn("0 damaged", output.getvalue())
+
+    def test_salvage_pretty_printed(self):
+        self._store(5)
+        migrate(self.data_fname, 1)
+        self.data_file.write_text(json.dumps(json.loads(self.data_file.read_text()), indent = 2))
+        self._damage('"description": "Task 3"', '"description": "Task 3')
+        self.assertEqual(verify(self.data_fname)["version"], 1, "a pretty-printed file must be read as version 1")
+        result = salvage(self.data_fname)
+        self.assertEqual((result["recovered"], result["header"], result["next_tid"]), (4, True, 6))
+        self.assertEqual(self._descriptions(), ["Task 1", "Task 2", "Task 4", "Task 5"])
+
+    def test_salvage_nothing_recovered(self):
+        text = "[not a task list]\n{\n"
+        self.data_file.write_text(text)
+        output = io.StringIO()
+        with redirect_stdout(output):
+            TasksManager(self.data_fname).execute(ActionSalvage([]))
+        self.assertIn("[ERROR] cannot salvage", output.getvalue())
+        self.assertEqual(self.data_file.read_text(), text, "the data file must be left unchanged")
+        self.assertFalse(self.files[1].is_file())
+
+    def test_truncated(self):
+        self._store(5)
+        lines = self.data_file.read_text().splitlines(keepends = True)
+        # Cut at a line boundary, every remaining line is intact.
+        self.data_file.write_text("".join(lines[:4]))
+        self.assertTrue(self._load().error, "a truncated data file must not load")
+        self.assertEqual(verify(self.data_fname)["damaged"],
+                         [("line 5", "3 task records instead of 5")])
+        result = salvage(self.data_fname)
+        self.assertEqual((result["recovered"], result["next_tid"], result["written"]), (3, 6, True))
+        self.assertEqual(verify(self.data_fname)["damaged"], [])
+        self.assertEqual(self._descriptions(), ["Task 1", "Task 2", "Task 3"])
+
+    def test_duplicates(self):
+        self._store(3)
+        migrate(self.data_fname, 2)
+        lines = self.data_file.read_text().splitlines()
+        stale = json.loads(lines[2])
+        stale["description"] = "Old task 2"
+        stale["updated_at"] = str(float(stale["updated_at"]) - 60)
+        lines.append(json.dumps(stale))
+        meta = json.loads(lines[0])
+        meta["records"] += 1
+        lines[0] = json.dumps(meta)
+        self.data_file.write_text("\n".join(lines) + "\n")
+        result = salvage(self.data_fname)
+        self.assertEqual(result["quarantined"], [("line 5", "duplicate task id")])
+        self.assertEqual(self._descriptions(), ["Task 1", "Task 2", "Task 3"], "the latest change must be kept")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+
+"""Unit tests for the change-aware refresh of long-lived task stores"""
+
+import unittest
+import sys
+from pathlib import Path
+
+current_dir = Path(__file__).parent
+source_dir = current_dir.parent.resolve() / "src"
+test_write_dir = current_dir / "write"
+sys.path.append(str(source_dir))
+
+from tasktracker.actions import ActionAdd, ActionBlock, ActionDelete, ActionMark, ActionMigrate, ActionUpdate
+from tasktracker.columnar import TaskColumns
+from tasktracker.tasks import TaskStore, TasksManager
+
+class TestRefresh(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = test_write_dir
+        if not self.tmpdir.is_dir():
+            self.tmpdir.mkdir()
+        self.data_file = self.tmpdir / "tasks.json"
+        if self.data_file.is_file():
+            self.data_file.unlink()
+
+    def tearDown(self):
+        if self.data_file.is_file():
+            self.data_file.unlink()
+        self.tmpdir.rmdir()
+
+    def _tasks(self, store: TaskStore):
+        columns = store.columns()
+        return [(task.tid, task.description, task.status) for task in columns.tasks(columns.rows())]
+
+    def test_refresh_delta(self):
+        writer = TaskStore(str(self.data_file), test_mode = True)
+        for desc in ["Task 1", "Task 2", "Task 3"]:
+            writer.add(ActionAdd([desc]))
+        writer.block(ActionBlock(["3", "2"]))
+        reader = TaskStore(str(self.data_file), test_mode = True)
+        self.assertFalse(reader.refresh(), "an unchanged file must not be reloaded")
+
+        writer.mark(ActionMark(["1", "done"]))
+        self.assertTrue(reader.refresh(), "the first refresh must reload the whole file")
+        self.assertEqual(self._tasks(reader), self._tasks(writer))
+
+        writer.mark(ActionMark(["2", "done"]))
+        writer.delete(ActionDelete(["1"]))
+        writer.add(ActionAdd(["Task 4"]))
+        self.assertTrue(reader.refresh())
+        self.assertEqual(self._tasks(reader), self._tasks(writer), "the delta must be applied")
+        self.assertEqual(reader.columns().ready_rows(), [3, 4], "the ready index must follow the delta")
+        self.assertEqual(reader.columns().meta, writer.columns().meta)
+
+        reader.add(ActionAdd(["Task 5"]))
+        self.assertFalse(reader.refresh(), "the writes of the store itself must not be refreshed")
+        writer.reload()
+        writer.mark(ActionMark(["4", "in_progress"]))
+        self.assertTrue(reader.refresh(), "the delta must be applied after the writes of the store itself")
+        self.assertEqual(self._tasks(reader), self._tasks(writer))
+
+    def test_refresh_same_generation(self):
+        TaskStore(str(self.data_file), test_mode = True).add(ActionAdd(["seed"]))
+        writer_a = TaskStore(str(self.data_file), test_mode = True)
+        writer_b = TaskStore(str(self.data_file), test_mode = True)
+        reader = TaskStore(str(self.data_file), test_mode = True)
+        writer_a.update(ActionUpdate(["1", "from A"]))
+        self.assertTrue(reader.refresh())
+        writer_b.update(ActionUpdate(["1", "from B"]))
+        self.assertTrue(reader.refresh(), "writes of the same generation by two stores must be told apart")
+        self.assertEqual(self._tasks(reader), self._tasks(writer_b))
+
+    def test_apply_changes(self):
+        writer = TaskStore(str(self.data_file), test_mode = True)
+        for desc in ["Task 1", "Task 2", "Task 3"]:
+            writer.add(ActionAdd([desc]))
+        fingerprints = {}
+        with open(self.data_file, "r") as fp:
+            columns = TaskColumns.load(fp, fingerprints)
+        self.assertEqual(sorted(fingerprints), [1, 2, 3])
+        writer.mark(ActionMark(["2", "done"]))
+        with open(self.data_file, "r") as fp:
+            self.assertEqual(columns.apply_changes(fp, fingerprints), 1, "only the changed task must be applied")
+
+        with open(self.data_file, "r") as fp:
+            lines = fp.readlines()
+        lines[1] = lines[1].replace("Task", "Tusk")
+        with open(self.data_file, "w") as fp:
+            fp.writelines(lines)
+        with open(self.data_file, "r") as fp:
+            self.assertRaises(ValueError, columns.apply_changes, fp, fingerprints)
+        self.assertEqual(columns.get(1).description, "Task 1", "a damaged file must not change the columns")
+
+        # Cut at a line boundary: every line is intact but the last task is gone.
+        with open(self.data_file, "w") as fp:
+            fp.writelines(lines[:1] + lines[2:3])
+        with open(self.data_file, "r") as fp:
+            self.assertRaises(ValueError, columns.apply_changes, fp, fingerprints)
+        self.assertIn(3, columns, "a truncated file must not remove tasks")
+
+    def test_refresh_v1(self):
+        writer = TaskStore(str(self.data_file), test_mode = True)
+        writer.add(ActionAdd(["Task 1"]))
+        TasksManager(str(self.data_file)).execute(ActionMigrate(["--to", "1"]))
+        writer.reload()
+        reader = TaskStore(str(self.data_file), test_mode = True, auto_refresh = 0)
+        for expected in [2, 3]:
+            writer.add(ActionAdd(["Task {}".format(expected)]))
+            self.assertEqual(len(reader.columns()), expected, "version 1 files must be reloaded in full")
+
+    def test_auto_refresh(self):
+        writer = TaskStore(str(self.data_file), test_mode = True)
+        writer.add(ActionAdd(["Task 1"]))
+        reader = TaskStore(str(self.data_file), test_mode = True, auto_refresh = 3600)
+        manual = TaskStore(str(self.data_file), test_mode = True)
+        self.assertEqual(len(reader.get_task_list()), 1)
+        writer.add(ActionAdd(["Task 2"]))
+        self.assertEqual(len(reader.get_task_list()), 1, "reads between the checks must not refresh")
+        reader.auto_refresh = 0
+        self.assertEqual(len(reader.get_task_list()), 2, "the task added by the writer must be seen")
+        self.assertEqual([task.tid for task in reader.next_tasks(2)], [1, 2])
+        self.assertEqual(len(manual.get_task_list()), 1, "stores must not refresh by default")
+
+        with open(self.data_file, "a") as fp:
+            fp.write("{\n")
+        writer.add(ActionAdd(["Task 3"]))
+        with open(self.data_file, "a") as fp:
+            fp.write("{\n")
+        self.assertEqual(len(reader.get_task_list()), 2, "a damaged file must keep the loaded tasks")
+        writer.add(ActionAdd(["Task 4"]))
+        self.assertEqual(len(reader.get_task_list()), 4, "the refresh must be retried")
+
+    def test_mutation_refresh(self):
+        store = TaskStore(str(self.data_file), test_mode = True, auto_refresh = 3600)
+        store.add(ActionAdd(["Task 1"]))
+        other = TaskStore(str(self.data_file), test_mode = True)
+        other.add(ActionAdd(["Task 2"]))
+        store.update(ActionUpdate(["1", "Task 1, edited"]))
+        self.assertEqual([desc for _, desc, _ in self._tasks(TaskStore(str(self.data_file), test_mode = True))],
+                         ["Task 1, edited", "Task 2"], "a mutation must not erase the changes of other processes")
+
+        other.reload()
+        other.add(ActionAdd(["Task 3"]))
+        with open(self.data_file, "a") as fp:
+            fp.write("{\n")
+        for _ in range(2):
+            self.assertRaises(OSError, store.add, ActionAdd(["Task 4"]))
+        self.assertEqual(len(store.columns()), 2, "a refused mutation must not change the store")
+        other.add(ActionAdd(["Task 4"]))
+        store.mark(ActionMark(["3", "done"]))
+        self.assertEqual(self._tasks(TaskStore(str(self.data_file), test_mode = True)), self._tasks(store))
+        self.assertEqual(len(store.columns()), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+
+"""Unit tests for the local HTTP API"""
+
+import unittest
+import sys
+import json
+import threading
+from http.client import HTTPConnection
+from pathlib import Path
+
+current_dir = Path(__file__).parent
+source_dir = current_dir.parent.resolve() / "src"
+test_write_dir = current_dir / "write"
+sys.path.append(str(source_dir))
+
+from tasktracker.actions import ActionAdd
+from tasktracker.server import TaskServer
+from tasktracker.tasks import TaskStore
+
+class TestServer(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = test_write_dir
+        if not self.tmpdir.is_dir():
+            self.tmpdir.mkdir()
+        self.data_file = self.tmpdir / "tasks.json"
+        if self.data_file.is_file():
+            self.data_file.unlink()
+        self.store = TaskStore(str(self.data_file), test_mode = True)
+        self.server = TaskServer(self.store, port = 0)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.conn = HTTPConnection("127.0.0.1", self.server.server_address[1])
+
+    def tearDown(self):
+        self.conn.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        if self.data_file.is_file():
+            self.data_file.unlink()
+        self.tmpdir.rmdir()
+
+    def _request(self, method: str, path: str, body=None, headers={}):
+        payload = json.dumps(body) if body is not None else None
+        self.conn.request(method, path, payload, headers)
+        response = self.conn.getresponse()
+        data = response.read()
+        return response, json.loads(data) if data else None
+
+    def test_crud(self):
+        response, task = self._request("POST", "/tasks", {"description": "Task 1"})
+        self.assertEqual(response.status, 201)
+        self.assertEqual(task["description"], "Task 1")
+        response, task = self._request("PATCH", "/tasks/{}".format(task["id"]),
+                                       {"description": "Task one", "status": "done"})
+        self.assertEqual(response.status, 200)
+        self.assertEqual((task["description"], task["status"]), ("Task one", "done"))
+        response, tasks = self._request("GET", "/tasks?status=done")
+        self.assertEqual([task["description"] for task in tasks], ["Task one"])
+        response, _ = self._request("DELETE", "/tasks/1")
+        self.assertEqual(response.status, 204)
+        response, _ = self._request("GET", "/tasks/1")
+        self.assertEqual(response.status, 404)
+        response, _ = self._request("PATCH", "/tasks/1", {"status": "done"})
+        self.assertEqual(response.status, 404)
+        response, _ = self._request("POST", "/tasks", {"description": 42})
+        self.assertEqual(response.status, 400)
+        self.assertEqual(len(TaskStore(str(self.data_file), test_mode = True).get_task_list()), 0,
+                         "the changes must be written to the data file")
+
+    def test_conditional_get(self):
+        self._request("POST", "/tasks", {"description": "Task 1"})
+        response, _ = self._request("GET", "/tasks")
+        etag = response.getheader("ETag")
+        response, body = self._request("GET", "/tasks", headers={"If-None-Match": etag})
+        self.assertEqual(response.status, 304, "an unchanged store must not be sent again")
+        self.assertIsNone(body)
+
+        # A change made by another process invalidates the ETag.
+        TaskStore(str(self.data_file), test_mode = True).add(ActionAdd(["Task 2"]))
+        response, tasks = self._request("GET", "/tasks", headers={"If-None-Match": etag})
+        self.assertEqual(response.status, 200)
+        self.assertEqual(len(tasks), 2, "the store must be reloaded after an external change")
+        self.assertNotEqual(response.getheader("ETag"), etag)
+
+    def test_option_like_description(self):
+        response, task = self._request("POST", "/tasks", {"description": "--fix the --verbose flag"})
+        self.assertEqual((response.status, task["description"]), (201, "--fix the --verbose flag"),
+                         "a description must never be parsed as command line arguments")
+        response, task = self._request("PATCH", "/tasks/1", {"description": "--x", "status": "in_progress"})
+        self.assertEqual((response.status, task["description"], task["status"]), (200, "--x", "in_progress"))
+        response, _ = self._request("PATCH", "/tasks/1", {"status": "--x"})
+        self.assertEqual(response.status, 400)
+
+    def test_mutation_after_external_change(self):
+        self._request("POST", "/tasks", {"description": "API task 1"})
+        TaskStore(str(self.data_file), test_mode = True).add(ActionAdd(["CLI task"]))
+        response, task = self._request("POST", "/tasks", {"description": "API task 2"})
+        self.assertEqual((response.status, task["id"]), (201, 3), "the task id of the CLI task must not be reused")
+        TaskStore(str(self.data_file), test_mode = True).add(ActionAdd(["CLI task 2"]))
+        response, _ = self._request("DELETE", "/tasks/1")
+        self.assertEqual(response.status, 204)
+        descriptions = sorted(task["Description"] for task
+                              in TaskStore(str(self.data_file), test_mode = True).get_task_list())
+        self.assertEqual(descriptions, ["API task 2", "CLI task", "CLI task 2"],
+                         "the changes of other processes must not be overwritten")
+
+        TaskStore(str(self.data_file), test_mode = True).add(ActionAdd(["CLI task 3"]))
+        with open(self.data_file, "a") as fp:
+            fp.write("{\n")
+        response, _ = self._request("POST", "/tasks", {"description": "API task 3"})
+        self.assertEqual(response.status, 503, "a data file that cannot be reloaded must not be overwritten")
+
+    def test_mutation_after_seen_change(self):
+        self._request("POST", "/tasks", {"description": "API task 1"})
+        TaskStore(str(self.data_file), test_mode = True).add(ActionAdd(["CLI task"]))
+        # A read saw the change but the mutation takes the write lock first.
+        self.assertTrue(self.server.watcher.changed())
+        response, _ = self._request("POST", "/tasks", {"description": "API task 2"})
+        self.assertEqual(response.status, 201)
+        descriptions = sorted(task["Description"] for task
+                              in TaskStore(str(self.data_file), test_mode = True).get_task_list())
+        self.assertEqual(descriptions, ["API task 1", "API task 2", "CLI task"],
+                         "a change seen by a read must not be overwritten")
+
+
+if __name__ == '__main__':
+    unittest.main()
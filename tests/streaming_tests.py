@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+
+"""Unit tests for the streaming reader of data files"""
+
+import unittest
+import sys
+import io
+import json
+import tracemalloc
+from contextlib import redirect_stdout
+from pathlib import Path
+
+current_dir = Path(__file__).parent
+source_dir = current_dir.parent.resolve() / "src"
+test_write_dir = current_dir / "write"
+sys.path.append(str(source_dir))
+
+from tasktracker.actions import ActionAdd, ActionList, ActionMark
+from tasktracker.status import Status
+from tasktracker.streaming import iter_entries, iter_tasks, top_tasks
+from tasktracker.tasks import TaskStore, TasksManager, heap_file
+
+class TestStreaming(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = test_write_dir
+        if not self.tmpdir.is_dir():
+            self.tmpdir.mkdir()
+        self.data_file = self.tmpdir / "tasks.json"
+        if self.data_file.is_file():
+            self.data_file.unlink()
+
+    def tearDown(self):
+        for data_file in [self.data_file, Path(heap_file(str(self.data_file)))]:
+            if data_file.is_file():
+                data_file.unlink()
+        self.tmpdir.rmdir()
+
+    def _store(self, count: int) -> TaskStore:
+        store = TaskStore(str(self.data_file), test_mode = True)
+        with store.transaction():
+            for idx in range(count):
+                store.add(ActionAdd(["Task {}".format(idx + 1)]))
+            store.mark(ActionMark(["2-{}".format(count // 2), "in_progress"]))
+            # The heap of next is written along, it must not weigh on the
+            # streaming readers.
+            store.next_tasks()
+        return store
+
+    def test_entries_across_chunks(self):
+        doc = {"next_tid": 123456, "a": [1, {"b": "x y"}], "c": "é\\\"}[", "e": [["\\\\", "]"], {}], "d": 7.25}
+        text = json.dumps(doc, indent=1)
+        for size in (1, 2, 3, 5, 8, 1000):
+            self.assertEqual(dict(iter_entries(io.StringIO(text), size)), doc,
+                             "incorrect entries with chunk size {}".format(size))
+            self.assertEqual(dict(iter_entries(io.StringIO(text), size, lambda key: key == "d")),
+                             {"d": 7.25}, "incorrect skip with chunk size {}".format(size))
+        self.assertEqual(list(iter_entries(io.StringIO("{}"))), [])
+        with self.assertRaises(ValueError):
+            list(iter_entries(io.StringIO('{"a": 1, "b": ')))
+
+    def test_tasks_and_top(self):
+        store = self._store(50)
+        with open(self.data_file) as fp:
+            tasks = list(iter_tasks(fp, Status.IN_PROGRESS, size=64))
+        self.assertEqual([task.tid for task in tasks], list(range(2, 26)),
+                         "the tasks must be filtered in file order")
+        with open(self.data_file) as fp:
+            top = top_tasks(iter_tasks(fp), 10)
+        self.assertEqual([task.tid for task in top],
+                         [task.tid for task in store._sorted_tasks()[:10]],
+                         "the top tasks must be in list order")
+
+    def test_stream_list(self):
+        store = self._store(30)
+        manager = TasksManager(str(self.data_file))
+        outputs = []
+        for args in (["todo", "--format", "jsonl", "--limit", "5"],
+                     ["todo", "--format", "jsonl", "--limit", "5", "--stream"]):
+            output = io.StringIO()
+            with redirect_stdout(output):
+                manager.execute(ActionList(args))
+            outputs.append(output.getvalue())
+        self.assertEqual(outputs[0], outputs[1], "streaming must list the same tasks")
+        self.assertEqual(len(outputs[1].splitlines()), 5)
+
+    def test_bounded_memory(self):
+        self._store(20000)
+        tracemalloc.start()
+        try:
+            with open(self.data_file) as fp:
+                top = top_tasks(iter_tasks(fp), 5)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(len(top), 5)
+        self.assertLess(peak, self.data_file.stat().st_size // 4,
+                        "the memory used must not grow with the size of the file")
+
+
+if __name__ == '__main__':
+    unittest.main()
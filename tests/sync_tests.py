@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+
+"""Unit tests for the delta synchronization between store replicas"""
+
+import unittest
+import sys
+import json
+import shutil
+from pathlib import Path
+from time import sleep
+
+current_dir = Path(__file__).parent
+source_dir = current_dir.parent.resolve() / "src"
+test_write_dir = current_dir / "write"
+sys.path.append(str(source_dir))
+
+from tasktracker.actions import ActionAdd, ActionDelete, ActionMark, ActionUpdate, ActionBlock
+from tasktracker.status import Status
+from tasktracker.tasks import TaskStore
+
+class TestSync(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = test_write_dir
+        if not self.tmpdir.is_dir():
+            self.tmpdir.mkdir()
+        self.files = [self.tmpdir / "replica-a.json", self.tmpdir / "replica-b.json"]
+        self._cleanup()
+
+    def tearDown(self):
+        self._cleanup()
+        self.tmpdir.rmdir()
+
+    def _cleanup(self):
+        for data_file in self.files:
+            if data_file.is_file():
+                data_file.unlink()
+
+    def _replicas(self):
+        return [TaskStore(str(data_file), test_mode = True) for data_file in self.files]
+
+    def _sync(self, source: TaskStore, target: TaskStore, since: int = 0):
+        # Round trip through JSON like the sync-export and sync-import actions.
+        delta = json.loads(json.dumps(source.export_changes(since)))
+        return delta["seq"], target.import_changes(delta)
+
+    def _descriptions(self, store: TaskStore):
+        return sorted((task.description, task.status) for task in store._sorted_tasks())
+
+    def test_export_only_changes(self):
+        store_a, _ = self._replicas()
+        for idx in range(10):
+            store_a.add(ActionAdd(["Task {}".format(idx)]))
+        seq = store_a.export_changes()["seq"]
+        store_a.mark(ActionMark(["3", "done"]))
+        store_a.delete(ActionDelete(["4"]))
+        delta = store_a.export_changes(seq)
+        self.assertEqual([task["description"] for task in delta["tasks"]], ["Task 2"],
+                         "only the changed task must be exported")
+        self.assertEqual(len(delta["deleted"]), 1, "the deletion must be exported")
+        self.assertEqual(delta["seq"], seq + 2, "each change must get a sequence number")
+        store_a.update(ActionUpdate(["7", "Task 6, edited"]))
+        store_a.delete(ActionDelete(["3"]))
+        delta = store_a.export_changes(seq)
+        self.assertEqual([task["description"] for task in delta["tasks"]], ["Task 6, edited"],
+                         "the index of the changes must follow the later changes")
+
+    def test_sync_both_ways(self):
+        store_a, store_b = self._replicas()
+        store_a.add(ActionAdd(["Shared"]))
+        store_a.add(ActionAdd(["To be deleted"]))
+        seq_a, counts = self._sync(store_a, store_b)
+        self.assertEqual(counts["added"], 2)
+
+        sleep(0.01)
+        store_b.add(ActionAdd(["Added on b"]))
+        store_a.update(ActionUpdate(["1", "Shared, edited on a"]))
+        sleep(0.01)
+        store_b.mark(ActionMark(["1", "done"]))  # newer than the edit on a
+        store_a.delete(ActionDelete(["2"]))
+
+        seq_b, counts = self._sync(store_b, store_a)
+        self.assertEqual(counts["updated"], 1, "the newer change on b must win")
+        self.assertEqual(counts["added"], 1)
+        self.assertEqual(counts["skipped"], 1, "the task deleted on a must not come back")
+        _, counts = self._sync(store_a, store_b, seq_a)
+        self.assertEqual(counts["deleted"], 1)
+
+        self.assertEqual(self._descriptions(store_a), self._descriptions(store_b),
+                         "the replicas must converge")
+        self.assertEqual(self._descriptions(store_a),
+                         [("Added on b", Status.TODO), ("Shared", Status.DONE)])
+
+        # The stores survive a reload with the synchronization data.
+        store_a = TaskStore(str(self.files[0]), test_mode = True)
+        self.assertEqual(store_a.columns().meta["peers"][store_b.columns().meta["replica"]], seq_b)
+
+    def test_sync_blockers(self):
+        store_a, store_b = self._replicas()
+        store_b.add(ActionAdd(["Only in B"]))
+        for idx in range(3):
+            store_a.add(ActionAdd(["Task {}".format(idx)]))
+        store_a.block(ActionBlock(["1", "3"]))
+        self._sync(store_a, store_b)
+        tasks = {task.description: task for task in store_b._sorted_tasks()}
+        self.assertEqual(tasks["Task 0"].blocked_by, [tasks["Task 2"].tid],
+                         "the blockers must be mapped to the task ids of the replica")
+        self.assertEqual([task.description for task in store_b._sorted_tasks(ready=True)
+                          if task.description.startswith("Task")], ["Task 2", "Task 1"])
+
+    def test_sync_blocker_cycle(self):
+        store_a, store_b = self._replicas()
+        store_a.add(ActionAdd(["Task 1"]))
+        store_a.add(ActionAdd(["Task 2"]))
+        seq_a, _ = self._sync(store_a, store_b)
+        sleep(0.01)
+        store_a.block(ActionBlock(["1", "2"]))
+        store_b.block(ActionBlock(["2", "1"]))
+        _, counts = self._sync(store_b, store_a)
+        self.assertEqual(counts["cycles"], 1, "the link closing a cycle must be dropped")
+        _, counts = self._sync(store_a, store_b, seq_a)
+        self.assertEqual(counts["cycles"], 1)
+        for store in [store_a, store_b]:
+            columns = store.columns()
+            self.assertFalse(any(columns.depends_on(tid, tid) for tid in columns.rows()),
+                             "the imported links must not create a cycle")
+
+    def test_copied_replica(self):
+        store_a, _ = self._replicas()
+        store_a.add(ActionAdd(["Shared"]))
+        store_a.export_changes()
+        shutil.copyfile(self.files[0], self.files[1])
+        store_b = TaskStore(str(self.files[1]), test_mode = True)
+        store_b.add(ActionAdd(["Added on the copy"]))
+        self.assertNotEqual(store_b.columns().meta["replica"], store_a.columns().meta["replica"],
+                            "a copy of the data file must become a new replica")
+        _, counts = self._sync(store_b, store_a)
+        self.assertEqual((counts["added"], counts["skipped"]), (1, 1))
+        self.assertEqual(self._descriptions(store_a), self._descriptions(store_b))
+        self.assertEqual(TaskStore(str(self.files[0]), test_mode = True).columns().meta["replica"],
+                         store_a.columns().meta["replica"], "the original must keep its identifier")
+
+    def test_prune_deletions(self):
+        store_a, store_b = self._replicas()
+        for idx in range(3):
+            store_a.add(ActionAdd(["Task {}".format(idx)]))
+        self._sync(store_a, store_b)
+        store_a.delete(ActionDelete(["1-2"]))
+        self._sync(store_a, store_b)
+        self.assertEqual(len(store_a.columns().meta["deleted"]), 2)
+        self._sync(store_b, store_a)
+        self.assertEqual(store_a.columns().meta["deleted"], {},
+                         "the deletions imported by every peer must be pruned")
+        self._sync(store_a, store_b)
+        self.assertEqual(store_b.columns().meta["deleted"], {})
+        self.assertEqual(self._descriptions(store_a), [("Task 2", Status.TODO)])
+        self.assertEqual(self._descriptions(store_b), [("Task 2", Status.TODO)])
+
+    def test_import_own_changes(self):
+        store_a, _ = self._replicas()
+        store_a.add(ActionAdd(["Task"]))
+        with self.assertRaises(ValueError):
+            store_a.import_changes(store_a.export_changes())
+
+
+if __name__ == '__main__':
+    unittest.main()
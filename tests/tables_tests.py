@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+
+"""Unit tests for the table rendering functions"""
+
+import unittest
+import sys
+import io
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+source_dir = Path(__file__).parent.parent.resolve() / "src"
+sys.path.append(str(source_dir))
+
+from tasktracker.tables import page_table
+
+class TestPageTable(unittest.TestCase):
+
+    def setUp(self):
+        self.consumed = 0
+
+    def _rows(self, count: int) -> Iterator[Dict[str, str]]:
+        for idx in range(count):
+            self.consumed += 1
+            yield {"ID": str(idx + 1), "Name": "Row {}".format(idx + 1)}
+
+    def _page(self, count: int, keys: List[str], page_size: int = 3) -> str:
+        keys = keys.copy()
+        def read_key(prompt: str) -> str:
+            print(prompt)
+            if not keys:
+                raise EOFError
+            return keys.pop(0)
+        output = io.StringIO()
+        with redirect_stdout(output):
+            page_table(self._rows(count), ["ID", "Name"], page_size=page_size,
+                       read_key=read_key)
+        return output.getvalue()
+
+    def test_first_window_is_lazy(self):
+        output = self._page(10000, ["q"])
+        self.assertEqual(self.consumed, 4, "only the first window and one extra row must be fetched")
+        self.assertIn("Row 3 ", output)
+        self.assertNotIn("Row 4 ", output)
+        self.assertIn("Rows 1-3+", output)
+
+    def test_navigation(self):
+        output = self._page(7, ["n", "n", "p", "q"])
+        self.assertIn("Row 7 ", output)
+        self.assertIn("Rows 4-6", output)
+        self.assertIn("Rows 7-7 ", output)
+        self.assertEqual(output.count("Rows 4-6"), 2, "previous window must be shown again")
+        self.assertEqual(self.consumed, 7)
+
+    def test_single_window(self):
+        output = self._page(2, [])
+        self.assertIn("Row 2 ", output)
+        self.assertNotIn("Rows", output, "no prompt if everything fits in a window")
+
+
+if __name__ == '__main__':
+    unittest.main()
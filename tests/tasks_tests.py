@@ -4,6 +4,10 @@
 
 import unittest
 import sys
+import csv
+import io
+import json
+from contextlib import redirect_stdout
 from pathlib import Path
 from typing import List, Optional, Dict
 from time import sleep
@@ -14,7 +18,11 @@ test_write_dir = current_dir / "write"
 sys.path.append(str(source_dir))
 
 from tasktracker.actions import ActionAdd, ActionDelete, ActionList, ActionMark, ActionUpdate
-from tasktracker.tasks import TaskStore
+from tasktracker.actions import ActionQuery, ActionNext, ActionBlock, ActionUnblock
+from tasktracker.multilist import _load_list
+from tasktracker.selection import parse_id_ranges
+from tasktracker.status import Status
+from tasktracker.tasks import TaskStore, TasksManager, _next_key, heap_file
 
 class TestTaskStore(unittest.TestCase):
 
@@ -29,9 +37,9 @@ class TestTaskStore(unittest.TestCase):
 
     def tearDown(self):
         if self.tmpdir.is_dir():
-            self.data_file = Path(self.data_fname)
-            if self.data_file.is_file():
-                self.data_file.unlink()
+            for fname in [self.data_fname, heap_file(self.data_fname)]:
+                if Path(fname).is_file():
+                    Path(fname).unlink()
             self.tmpdir.rmdir()
 
     def _load_store(self):
@@ -113,6 +121,12 @@ class TestTaskStore(unittest.TestCase):
         self.assertHasTask(task1_expected, tasks)
         self.assertHasTask(task2_expected, tasks)
 
+        self.assertRaises(ValueError, store.add, ActionAdd(["--verbose"]))
+        task = store.add_task("--verbose", priority=3)
+        self.assertEqual((task.description, task.priority), ("--verbose", 3),
+                         "plain values must never be parsed as command line arguments")
+        self.assertEqual(len(self._load_store().get_task_list()), 3)
+
     def test_store_delete(self):
         task1_desc = "Task 1"
         task2_desc = "Task 2"
@@ -213,6 +227,273 @@ class TestTaskStore(unittest.TestCase):
         self.assertHasTask(task2, tasks)
         self.assertHasTask(task3, tasks)
 
+    def test_store_bulk_mark_and_delete(self):
+        store = self._add_tasks([ActionAdd(["Task {}".format(idx)]) for idx in range(1, 11)])
+        written = self._count_writes(store)
+        store.mark(ActionMark(["2-5,8,42", "in_progress"]))
+        self.assertEqual(len(written), 1, "a bulk mark must write the store once")
+
+        store = self._load_store()
+        tasks = store.get_task_list(Status.IN_PROGRESS)
+        self.assertEqual(sorted(int(task["ID"]) for task in tasks), [2, 3, 4, 5, 8])
+
+        store.mark(ActionMark(["--status", "in_progress", "--updated-after", "2000-01-01", "done"]))
+        self.assertEqual(len(store.get_task_list(Status.IN_PROGRESS)), 0)
+        self.assertEqual(len(store.get_task_list(Status.DONE)), 5)
+        store.mark(ActionMark(["--status", "todo", "--updated-before", "2000-01-01", "done"]))
+        self.assertEqual(len(store.get_task_list(Status.DONE)), 5, "no task was updated before 2000")
+
+        store.delete(ActionDelete(["--status", "done"]))
+        store.delete(ActionDelete(["1,9-10"]))
+        store = self._load_store()
+        tasks = store.get_task_list()
+        self.assertEqual(sorted(int(task["ID"]) for task in tasks), [6, 7])
+
+        rows, missing = parse_id_ranges("0-7,3,12-999999999").select_rows(store.columns())
+        self.assertEqual((rows, str(missing)), ([6, 7], "0-5, 12-999999999"),
+                         "id ranges must be intersected with the rows, not expanded")
+        store.mark(ActionMark(["1-999999999", "in_progress"]))
+        self.assertEqual(len(store.get_task_list(Status.IN_PROGRESS)), 2)
+
+    def _count_writes(self, store: TaskStore) -> List[bool]:
+        written: List[bool] = []
+        write = store._write
+        store._write = lambda: (written.append(True), write())
+        return written
+
+    def test_store_transaction(self):
+        store = self._load_store()
+        written = self._count_writes(store)
+        with store.transaction():
+            for idx in range(1, 101):
+                store.add(ActionAdd(["Task {}".format(idx)]))
+            store.mark(ActionMark(["1-10", "done"]))
+            self.assertEqual(len(written), 0, "nothing must be written inside a transaction")
+            self.assertEqual(len(store.get_task_list()), 100, "changes must be visible inside the transaction")
+        self.assertEqual(len(written), 1, "the store must be written once at the end of the transaction")
+        self.assertEqual(sorted(path.name for path in self.tmpdir.iterdir()), ["tasks.json"],
+                         "the data file must be replaced, not left next to a partial copy")
+
+        store = self._load_store()
+        self.assertEqual(len(store.get_task_list()), 100)
+        self.assertEqual(len(store.get_task_list(Status.DONE)), 10)
+        store.add(ActionAdd(["Task 101"]))
+        self.assertEqual(len(self._load_store().get_task_list()), 101, "outside transactions changes are written at once")
+
+    def test_store_transaction_rollback(self):
+        store = self._add_tasks([ActionAdd(["Task 1"])])
+        written = self._count_writes(store)
+        with self.assertRaises(RuntimeError):
+            with store.transaction():
+                store.add(ActionAdd(["Task 2"]))
+                store.update(ActionUpdate(["1", "Task 1 changed"]))
+                raise RuntimeError("abort")
+        self.assertEqual(len(written), 0, "a rolled back transaction must not write")
+        tasks = store.get_task_list()
+        self.assertEqual(len(tasks), 1)
+        self.assertEqual(tasks[0]["Description"], "Task 1", "in-place changes must be rolled back")
+        store.add(ActionAdd(["Task 2"]))
+        self.assertEqual(self._get_task_from_desc("Task 2", store.get_task_list())["ID"], "2",
+                         "next_tid must be rolled back too")
+
+    def test_store_nested_transaction(self):
+        store = self._load_store()
+        written = self._count_writes(store)
+        with store.transaction():
+            store.add(ActionAdd(["Outer"]))
+            with self.assertRaises(ValueError):
+                with store.transaction():
+                    store.add(ActionAdd(["Inner rolled back"]))
+                    raise ValueError("abort inner")
+            with store.transaction():
+                store.add(ActionAdd(["Inner committed"]))
+            self.assertEqual(len(written), 0, "inner transactions must not write")
+        self.assertEqual(len(written), 1)
+        tasks = self._load_store().get_task_list()
+        self.assertEqual(sorted(task["Description"] for task in tasks), ["Inner committed", "Outer"])
+
+    def test_store_iter_sorted_tasks(self):
+        store = self._add_tasks([ActionAdd(["Task {}".format(idx)]) for idx in range(1, 6)])
+        store.mark(ActionMark(["2", "done"]))
+        store.mark(ActionMark(["4", "in_progress"]))
+        expected = [task["ID"] for task in store.get_task_list()]
+        self.assertEqual([str(task.tid) for task in store.iter_sorted_tasks()], expected)
+        expected = [task["ID"] for task in store.get_task_list(Status.TODO)]
+        self.assertEqual([str(task.tid) for task in store.iter_sorted_tasks(Status.TODO)], expected)
+
+    def test_store_next_tasks(self):
+        store = self._add_tasks([ActionAdd(["Task 1"]), ActionAdd(["Task 2", "--priority", "2"]),
+                                 ActionAdd(["Task 3", "--due", "2030-01-01"]),
+                                 ActionAdd(["Task 4", "--priority", "2", "--due", "2030-06-01"])])
+        self.assertEqual([task.tid for task in store.next_tasks(10)], [4, 2, 3, 1],
+                         "tasks must be ordered by priority, due date and creation time")
+
+        # Changed, marked and deleted tasks leave outdated entries in the heap.
+        store.update(ActionUpdate(["1", "--priority", "5"]))
+        store.update(ActionUpdate(["4", "--due", "none"]))
+        store.mark(ActionMark(["2", "done"]))
+        store.delete(ActionDelete(["3"]))
+        store.add(ActionAdd(["Task 5", "--priority", "2"]))
+        self.assertEqual([task.tid for task in store.next_tasks(10)], [1, 4, 5])
+        self.assertEqual([task.tid for task in store.next_tasks(2)], [1, 4],
+                         "the heap must be unchanged by a read")
+
+        store = self._load_store()
+        self.assertIsNotNone(store._stored_heap(), "the heap must be persisted")
+        self.assertEqual([task.tid for task in store.next_tasks(10)], [1, 4, 5])
+        store.mark(ActionMark(["2", "todo"]))
+        self.assertEqual([task.tid for task in store.next_tasks(2)], [1, 2])
+
+        output = io.StringIO()
+        with redirect_stdout(output):
+            store.next(ActionNext([]))
+        self.assertIn("Task 1", output.getvalue())
+        self.assertNotIn("Task 2", output.getvalue())
+
+    def test_store_next_heap_persisted(self):
+        store = self._add_tasks([ActionAdd(["Task 1"])])
+        with redirect_stdout(io.StringIO()):
+            store.next(ActionNext([]))
+        self._add_tasks([ActionAdd(["Task 2", "--priority", "1"])], store)
+        store = self._load_store()
+        self.assertNotIn("next_heap", store.columns().meta, "the heap must not be in the header")
+        self.assertEqual(store._stored_heap(), [_next_key(store.columns(), 2), _next_key(store.columns(), 1)],
+                         "the heap must be kept up to date in the heap file")
+
+        # A write that does not update the heap makes the heap file outdated.
+        self._load_store().mark(ActionMark(["1", "done"]))
+        store = self._load_store()
+        self.assertIsNone(store._stored_heap(), "an outdated heap file must not be used")
+        with redirect_stdout(io.StringIO()):
+            store.next(ActionNext([]))
+        self.assertEqual(self._load_store()._stored_heap(), [_next_key(store.columns(), 2)],
+                         "the built heap must be persisted")
+
+    def _ready_tids(self, store: TaskStore) -> List[int]:
+        # The ready tasks computed from scratch, to check the maintained ones.
+        columns = store.columns()
+        is_open = lambda tid: tid in columns and columns.status[tid] != Status.DONE.value
+        expected = [row for row in columns.rows() if is_open(row) and
+                    not any(map(is_open, columns.blocked_by[row] or []))]
+        self.assertEqual(columns.ready_rows(), expected, "incorrect ready tasks")
+        return expected
+
+    def test_store_dependencies(self):
+        store = self._add_tasks([ActionAdd(["Task {}".format(idx)]) for idx in range(1, 6)])
+        store.block(ActionBlock(["2", "1"]))
+        store.block(ActionBlock(["3", "2"]))
+        store.block(ActionBlock(["4", "2-3"]))
+        self.assertEqual(self._ready_tids(store), [1, 5])
+
+        # Cycles are rejected, including through a chain of blockers.
+        for args in (["1", "4"], ["1", "3"], ["2", "2"], ["2", "4,5"]):
+            store.block(ActionBlock(args))
+            self.assertEqual(store.columns().blocked_by[int(args[0])] or [], [] if args[0] == "1" else [1],
+                             "block {} must be rejected".format(args))
+        store.block(ActionBlock(["1", "9"]))
+        self.assertEqual(self._ready_tids(store), [1, 5], "a missing blocker must be rejected")
+
+        store.mark(ActionMark(["1", "done"]))
+        self.assertEqual(self._ready_tids(store), [2, 5])
+        store.mark(ActionMark(["2", "in_progress"]))
+        store.delete(ActionDelete(["3"]))
+        self.assertEqual(self._ready_tids(store), [2, 5], "4 is still blocked by 2")
+        store.mark(ActionMark(["2", "done"]))
+        self.assertEqual(self._ready_tids(store), [4, 5], "a deleted blocker must not block")
+        store.mark(ActionMark(["1", "todo"]))
+        self.assertEqual(self._ready_tids(store), [1, 4, 5])
+
+        store = self._load_store()
+        self.assertEqual(self._ready_tids(store), [1, 4, 5], "the ready tasks must be the same after loading")
+        self.assertEqual([task.tid for task in store.next_tasks(5)], [1, 4, 5])
+        store.unblock(ActionUnblock(["2", "1"]))
+        store.mark(ActionMark(["2", "todo"]))
+        store.block(ActionBlock(["5", "2"]))
+        self.assertEqual(self._ready_tids(store), [1, 2])
+        self.assertEqual([task.tid for task in store.next_tasks(5)], [1, 2],
+                         "blocked tasks must not be shown by next")
+        store.mark(ActionMark(["2", "done"]))
+        self.assertEqual([task.tid for task in store.next_tasks(5)], [1, 4, 5],
+                         "a task must be shown by next once it is unblocked")
+        self.assertEqual([row["ID"] for row in store.get_task_list(Status.TODO, ready=True)], ["5", "1", "4"])
+
+    def _list_output(self, store: TaskStore, args: List[str]) -> str:
+        output = io.StringIO()
+        with redirect_stdout(output):
+            store.list(ActionList(args))
+        return output.getvalue()
+
+    def test_store_list_formats(self):
+        store = self._add_tasks([ActionAdd(["Task 1"]), ActionAdd(["Task, 2\twith tab"])])
+        store.mark(ActionMark(["1", "done"]))
+
+        lines = self._list_output(store, ["--format", "jsonl"]).splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual([record["id"] for record in records], [2, 1], "tasks must be in list order")
+        self.assertEqual(records[0]["description"], "Task, 2\twith tab")
+        self.assertEqual(records[1]["status"], "done")
+
+        records = json.loads(self._list_output(store, ["done", "--format", "json"]))
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]["id"], 1)
+        self.assertEqual(json.loads(self._list_output(store, ["in_progress", "--format", "json"])), [])
+
+        for fmt, delimiter in (("csv", ","), ("tsv", "\t")):
+            output = self._list_output(store, ["--format", fmt])
+            rows = list(csv.DictReader(io.StringIO(output), delimiter=delimiter))
+            self.assertEqual([row["id"] for row in rows], ["2", "1"])
+            self.assertEqual(rows[0]["description"], "Task, 2\twith tab")
+
+    def test_store_list_auto_format(self):
+        store = self._add_tasks([ActionAdd(["Task 1"])])
+        # stdout is redirected to a StringIO which is not a terminal.
+        output = self._list_output(store, [])
+        self.assertEqual(output.splitlines()[0].split("\t")[0], "id", "tsv must be used when not a terminal")
+
+    def test_query_lists(self):
+        team_file = self.tmpdir / "team.json"
+        try:
+            store = self._add_tasks([ActionAdd(["Mine 1"]), ActionAdd(["Mine 2"])])
+            sleep(0.01)
+            team = TaskStore(str(team_file), test_mode = True)
+            team.add(ActionAdd(["Team 1"]))
+            team.mark(ActionMark(["1", "done"]))
+            sleep(0.01)
+            action = ActionMark(["1", "in_progress"])
+            self.assertTrue(action.valid)
+            store.mark(action)
+
+            # The lists are loaded by a pool of worker processes by default.
+            manager = TasksManager(self.data_fname)
+            output = io.StringIO()
+            with redirect_stdout(output):
+                manager.execute(ActionQuery(["--format", "jsonl"]))
+            records = [json.loads(line) for line in output.getvalue().splitlines()]
+            self.assertEqual([(record["list"], record["description"], record["status"]) for record in records],
+                             [("tasks", "Mine 2", "todo"), ("tasks", "Mine 1", "in_progress"),
+                              ("team", "Team 1", "done")],
+                             "tasks of all lists must be merged in list order")
+            self.assertIsNone(manager._store, "query must not load the store of the manager")
+
+            output = io.StringIO()
+            with redirect_stdout(output):
+                manager.execute(ActionQuery(["--threads", "--format", "jsonl"]))
+            self.assertEqual([json.loads(line) for line in output.getvalue().splitlines()], records,
+                             "the threads must give the same result as the process pool")
+
+            output = io.StringIO()
+            with redirect_stdout(output):
+                manager.execute(ActionQuery(["done", "--lists", "team", "--format", "csv"]))
+            lines = output.getvalue().splitlines()
+            self.assertEqual(lines[0].split(",")[0], "list", "list must be the first column")
+            self.assertEqual(len(lines), 2, "only the done task of the team list must be listed")
+            _, selected = _load_list("tasks", self.data_fname, Status.TODO)
+            self.assertEqual([record["description"] for _, _, record in selected], ["Mine 2"],
+                             "the workers must send back only the selected tasks")
+        finally:
+            if team_file.is_file():
+                team_file.unlink()
+
 
 if __name__ == '__main__':
     unittest.main()
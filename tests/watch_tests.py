@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+
+"""Unit tests for the watch mode of list"""
+
+import unittest
+import sys
+import io
+import os
+from pathlib import Path
+
+current_dir = Path(__file__).parent
+source_dir = current_dir.parent.resolve() / "src"
+test_write_dir = current_dir / "write"
+sys.path.append(str(source_dir))
+
+from tasktracker.actions import ActionAdd, ActionList, ActionMark
+from tasktracker.tasks import TaskStore, TasksManager
+from tasktracker.watch import FileWatcher, ScreenUpdater, read_generation
+
+class TestWatch(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = test_write_dir
+        if not self.tmpdir.is_dir():
+            self.tmpdir.mkdir()
+        self.data_file = self.tmpdir / "tasks.json"
+        if self.data_file.is_file():
+            self.data_file.unlink()
+
+    def tearDown(self):
+        if self.data_file.is_file():
+            self.data_file.unlink()
+        self.tmpdir.rmdir()
+
+    def test_generation(self):
+        store = TaskStore(str(self.data_file), test_mode = True)
+        generation = read_generation(str(self.data_file))
+        self.assertIsNotNone(generation, "the generation must be written at the start of the file")
+        store.add(ActionAdd(["Task 1"]))
+        self.assertEqual(read_generation(str(self.data_file)), generation + 1,
+                         "each write must increment the generation")
+
+    def test_file_watcher(self):
+        store = TaskStore(str(self.data_file), test_mode = True)
+        watcher = FileWatcher(str(self.data_file))
+        self.assertFalse(watcher.changed(), "unchanged file must not be reported")
+        os.utime(self.data_file, ns=(0, 0))
+        self.assertFalse(watcher.changed(), "touching the file must not be reported")
+        store.add(ActionAdd(["Task 1"]))
+        self.assertTrue(watcher.changed(), "a write must be reported")
+        self.assertFalse(watcher.changed(), "a write must be reported only once")
+
+    def test_screen_updater(self):
+        output = io.StringIO()
+        screen = ScreenUpdater(output)
+        self.assertEqual(screen.update(["a", "b", "c"]), 3, "all lines must be drawn first")
+        self.assertEqual(screen.update(["a", "x", "c"]), 1, "only the changed line must be redrawn")
+        output.truncate(0)
+        self.assertEqual(screen.update(["a"]), 0)
+        self.assertIn("\033[2;1H\033[J", output.getvalue(), "the extra lines must be cleared")
+
+    def test_watch_list(self):
+        store = TaskStore(str(self.data_file), test_mode = True)
+        store.add(ActionAdd(["Task 1"]))
+        store.add(ActionAdd(["Task 2"]))
+        changes = [lambda: store.mark(ActionMark(["1", "in_progress"])),
+                   lambda: None,
+                   lambda: store.add(ActionAdd(["Task 3"]))]
+        def sleep(interval: float):
+            changes.pop(0)()
+
+        output = io.StringIO()
+        manager = TasksManager(str(self.data_file))
+        manager.watch_list(ActionList(["todo", "--watch"]), stream=output,
+                           sleep=sleep, max_checks=3)
+        screen = output.getvalue()
+        self.assertIn("Task 3", screen, "the added task must be shown")
+        self.assertEqual(screen.count("\033[2J"), 1, "the screen must be cleared only once")
+
+
+if __name__ == '__main__':
+    unittest.main()